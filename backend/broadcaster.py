@@ -0,0 +1,50 @@
+"""
+Broadcaster in-process untuk push perubahan ke display (Server-Sent Events)
+Setiap koneksi /api/display/stream mendapat antrian sendiri; publish()
+menaruh event ke semua antrian tanpa menunggu klien yang lambat.
+"""
+import asyncio
+import json
+from typing import Optional
+
+
+class Broadcaster:
+    """Fan out events to every subscribed queue; slow subscribers drop their oldest events"""
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self._subscribers: set = set()
+        self.published = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict, event_id: Optional[int] = None):
+        message = format_sse(event, data, event_id)
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(message)
+
+
+def format_sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
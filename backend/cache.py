@@ -0,0 +1,117 @@
+"""
+Cache in-process (TTL + LRU) untuk dokumen yang sering dibaca display
+Dipakai untuk dokumen singleton pengaturan (identitas masjid, pengaturan
+sholat, layout, QRIS) supaya polling TV tidak selalu sampai ke MongoDB.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """Bounded async cache with per-entry TTL, LRU eviction and hit/miss counters"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._locks: dict = {}  # key -> [lock, coroutines using it], only while a load is pending
+        # Bumped by every write (set/invalidate/clear): a load that started before it must not cache what it read
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Write-through: the value supersedes whatever an in-flight load is reading"""
+        self._generation += 1
+        self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: float = None):
+        self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._generation += 1
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._generation += 1
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value or load it once, even under concurrent misses"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        slot = self._locks.get(key)
+        if slot is None:
+            slot = self._locks[key] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                # Another coroutine may have filled the entry while we waited
+                entry = self._data.get(key)
+                if entry is not None and entry[0] >= time.monotonic():
+                    return entry[1]
+                generation = self._generation
+                value = await loader()
+                if generation == self._generation:
+                    self._store(key, value)
+                return value
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._locks[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class PrewarmedSlot:
+    """One value prepared ahead of time for a future key (e.g. tomorrow's display payload)
+
+    ``take`` hands the value out only for its own key and empties the slot; asking for any
+    other key leaves it in place, so rebuilds before the key comes due don't discard it.
+    """
+
+    def __init__(self):
+        self.key: Any = None
+        self.value: Any = None
+
+    def put(self, key: Hashable, value: Any):
+        self.key = key
+        self.value = value
+
+    def take(self, key: Hashable) -> Any:
+        if self.value is None or self.key != key:
+            return None
+        value = self.value
+        self.clear()
+        return value
+
+    def clear(self):
+        self.key = None
+        self.value = None
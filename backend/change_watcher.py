@@ -0,0 +1,85 @@
+"""
+Sinkronisasi antar replika backend lewat MongoDB change streams
+Setiap replika men-tail perubahan koleksi konten dan koleksi ``revisions``
+supaya cache lokal dan stream display tetap segar. Jika MongoDB tidak
+berjalan sebagai replica set, watcher beralih ke polling ``revisions``.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error code for "$changeStream is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+OnChange = Callable[[str, Optional[int]], Awaitable[None]]
+
+
+class ChangeWatcher:
+    """Calls ``on_change(collection, revision)`` for changes made by any replica"""
+
+    def __init__(self, db, collections: Iterable[str], on_change: OnChange,
+                 poll_interval: float = 5.0, revisions_collection: str = "revisions"):
+        self.db = db
+        self.collections = list(collections)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.revisions_collection = revisions_collection
+        self.mode = "idle"
+        self._resume_token = None
+
+    async def run(self):
+        backoff = 1.0
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.info(f"Change streams tidak tersedia ({e}), beralih ke polling revisions")
+                    await self._poll()
+                    return
+                if self.mode == "starting":
+                    # Token fell off the oplog (or was rejected): start fresh, the reconcile covers the gap
+                    self._resume_token = None
+                logger.warning(f"Change stream terputus: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream terputus: {e}")
+            if self.mode == "change_stream":
+                backoff = 1.0  # the stream was up: a fresh blip, not a reconnect that keeps failing
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _watch(self):
+        self.mode = "starting"
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections + [self.revisions_collection]}}}]
+        async with self.db.watch(pipeline, full_document="updateLookup", resume_after=self._resume_token) as stream:
+            self.mode = "change_stream"
+            # Writes made while the stream was down may be beyond the resume window; catch up
+            # from the revisions themselves once the stream is open so nothing slips in between
+            await self._reconcile()
+            async for change in stream:
+                collection = change["ns"]["coll"]
+                if collection == self.revisions_collection:
+                    doc = change.get("fullDocument") or {}
+                    if "collection" in doc:
+                        await self.on_change(doc["collection"], doc.get("revision"))
+                else:
+                    await self.on_change(collection, None)
+                self._resume_token = change["_id"]
+
+    async def _reconcile(self):
+        """Report every persisted revision; ``on_change`` ignores the ones already applied"""
+        async for doc in self.db[self.revisions_collection].find({}, {"_id": 0}):
+            await self.on_change(doc["collection"], doc["revision"])
+
+    async def _poll(self):
+        self.mode = "polling"
+        while True:
+            try:
+                await self._reconcile()
+            except PyMongoError as e:
+                logger.warning(f"Polling revisions gagal: {e}")
+            await asyncio.sleep(self.poll_interval)
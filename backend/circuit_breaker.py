@@ -0,0 +1,114 @@
+"""
+Circuit breaker dengan timeout adaptif untuk dependensi eksternal (hisabmu.com)
+Setelah beberapa kegagalan berturut-turut sirkuit terbuka dan panggilan langsung
+ditolak; setelah jeda, satu probe half-open menentukan apakah sirkuit ditutup lagi.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' terbuka, coba lagi dalam {retry_after:.0f} detik")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures -> half-open probe after ``reset_timeout``"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 min_timeout: float = 2.0, max_timeout: float = 15.0, timeout_multiplier: float = 2.0,
+                 latency_window: int = 50):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.last_error = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def p95_latency(self):
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    @property
+    def timeout(self) -> float:
+        """p95 of recent successful calls times the multiplier, clamped to [min, max]"""
+        p95 = self.p95_latency()
+        if p95 is None:
+            return self.max_timeout
+        return max(self.min_timeout, min(self.max_timeout, p95 * self.timeout_multiplier))
+
+    def _retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _on_success(self, latency: float):
+        self._latencies.append(latency)
+        self._failures = 0
+        self._state = CLOSED
+        self.last_error = None
+
+    def _on_failure(self, error: BaseException):
+        self._failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        state = self.state
+        if state == OPEN:
+            raise CircuitOpenError(self.name, self._retry_after())
+        if state == HALF_OPEN:
+            # Only one probe at a time; everyone else keeps getting the open-circuit answer
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._state = HALF_OPEN
+            self._probe_in_flight = True
+
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.timeout)
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+            return result
+        finally:
+            if state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        p95 = self.p95_latency()
+        state = self.state
+        return {
+            "state": state,
+            "failures": self._failures,
+            "timeout_seconds": round(self.timeout, 3),
+            "p95_latency_seconds": round(p95, 3) if p95 is not None else None,
+            "retry_after_seconds": round(self._retry_after(), 1) if state == OPEN else None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,99 @@
+"""
+Timeline fase display (menuju adzan, adzan, iqomah, sholat) untuk satu hari
+Dibangun sekali dari jadwal sholat dan kalibrasi PrayerSettings, berupa daftar
+transisi terurut dengan timestamp absolut. Klien cukup mencari transisi
+terakhir yang sudah lewat (binary search) atau memasang satu timer ke transisi berikutnya.
+"""
+from datetime import date as date_cls, datetime, time as time_cls, timedelta, timezone
+from typing import List, Optional
+
+MAIN_PRAYERS = ["subuh", "dzuhur", "ashar", "maghrib", "isya"]
+PRAYER_LABELS = {"subuh": "Subuh", "dzuhur": "Dzuhur", "ashar": "Ashar", "maghrib": "Maghrib", "isya": "Isya"}
+DEFAULT_CALIBRATION = {"pre_adzan": 1, "jeda_adzan": 3, "pre_iqamah": 10, "jeda_sholat": 10}
+
+# Seconds before iqamah at which the pre-iqamah sound plays
+PRE_IQAMAH_SOUND_SECONDS = 60
+
+
+def calibration_for(prayer: str, settings: dict) -> dict:
+    """Calibration of one prayer, falling back to the legacy iqomah_* minutes"""
+    calibration = settings.get(f"calibration_{prayer}")
+    if not calibration:
+        return {**DEFAULT_CALIBRATION, "pre_iqamah": settings.get(f"iqomah_{prayer}", DEFAULT_CALIBRATION["pre_iqamah"])}
+    return {**DEFAULT_CALIBRATION, **calibration}
+
+
+def _at(day: date_cls, hhmm: str, tz: timezone) -> datetime:
+    hour, minute = map(int, hhmm.split(":")[:2])
+    return datetime.combine(day, time_cls(hour, minute), tzinfo=tz)
+
+
+def _transition(at: datetime, phase: str, prayer: str, mode: str, label: str,
+                until: Optional[datetime] = None, sound: Optional[str] = None) -> dict:
+    return {
+        "at": at.isoformat(),
+        "ts": int(at.timestamp() * 1000),
+        "until_ts": int(until.timestamp() * 1000) if until else None,
+        "phase": phase,
+        "prayer": prayer,
+        "mode": mode,
+        "label": label,
+        "sound": sound,
+    }
+
+
+def _prayer_cycle(prayer: str, adzan: datetime, settings: dict) -> List[tuple]:
+    """(time, phase, mode, label, until, sound setting) for pre-adzan through the end of sholat"""
+    calibration = calibration_for(prayer, settings)
+    name = PRAYER_LABELS[prayer]
+    pre_adzan = adzan - timedelta(minutes=calibration["pre_adzan"])
+    adzan_end = adzan + timedelta(minutes=calibration["jeda_adzan"])
+    iqamah = adzan_end + timedelta(minutes=calibration["pre_iqamah"])
+    sholat_end = iqamah + timedelta(minutes=calibration["jeda_sholat"])
+
+    cycle = [
+        (pre_adzan, "pre_adzan", "adzan", f"⏰ {name} Sebentar Lagi", adzan, "sound_pre_adzan"),
+        (adzan, "adzan", "jeda_adzan", f"🔊 Adzan {name}", adzan_end, "sound_adzan"),
+        (adzan_end, "iqamah", "iqomah", f"Iqomah {name}", iqamah, None),
+    ]
+    pre_iqamah_sound = iqamah - timedelta(seconds=PRE_IQAMAH_SOUND_SECONDS)
+    if pre_iqamah_sound > adzan_end:
+        cycle.append((pre_iqamah_sound, "pre_iqamah", "iqomah", f"Iqomah {name}", iqamah, "sound_pre_iqamah"))
+    cycle.append((iqamah, "sholat", "adzan", "Sholat Berlangsung", sholat_end, "sound_iqamah"))
+    cycle.append((sholat_end, "menunggu", "adzan", None, None, None))
+    return cycle
+
+
+def build_timeline(day: date_cls, times: dict, next_times: dict, settings: dict, timezone_offset: float) -> List[dict]:
+    """Sorted transitions from local midnight of ``day`` through the end of the next subuh cycle"""
+    tz = timezone(timedelta(hours=timezone_offset))
+    next_day = day + timedelta(days=1)
+    adzans = [(prayer, _at(day, times[prayer], tz)) for prayer in MAIN_PRAYERS]
+    adzans.append(("subuh", _at(next_day, next_times["subuh"], tz)))
+
+    transitions = []
+    first_prayer, first_adzan = adzans[0]
+    midnight = datetime.combine(day, time_cls(0), tzinfo=tz)
+    transitions.append(_transition(midnight, "menunggu", first_prayer, "adzan",
+                                   f"Menuju {PRAYER_LABELS[first_prayer]}", first_adzan))
+
+    for i, (prayer, adzan) in enumerate(adzans):
+        following = adzans[i + 1] if i + 1 < len(adzans) else None
+        cycle = _prayer_cycle(prayer, adzan, settings)
+        # A long calibration must not run into the next prayer's pre-adzan warning
+        boundary = _prayer_cycle(*following, settings)[0][0] if following else None
+        for at, phase, mode, label, until, sound_setting in cycle:
+            if boundary and at >= boundary:
+                break
+            if phase == "menunggu":
+                if not following:
+                    continue
+                next_prayer, next_adzan = following
+                prayer_for, label, until = next_prayer, f"Menuju {PRAYER_LABELS[next_prayer]}", next_adzan
+            else:
+                prayer_for = prayer
+            sound = sound_setting[len("sound_"):] if sound_setting and settings.get(sound_setting, True) else None
+            transitions.append(_transition(at, phase, prayer_for, mode, label, until, sound))
+
+    transitions.sort(key=lambda t: t["ts"])
+    return transitions
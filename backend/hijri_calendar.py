@@ -0,0 +1,400 @@
+"""
+Kalender Hijriah Global Tunggal (KHGT) Muhammadiyah dihitung di server
+Awal bulan mengikuti kriteria KHGT: tinggi bulan >= 5 derajat dan elongasi
+>= 8 derajat (geosentris) saat matahari terbenam di mana pun sebelum 24:00 UTC,
+atau di daratan Amerika jika ijtimak terjadi sebelum fajar di Selandia Baru.
+Awal bulan disimpan sebagai array ordinal terurut, konversi cukup dengan bisect.
+"""
+import math
+from bisect import bisect_right
+from datetime import date as date_cls, timedelta
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from prayer_times import compute_raw_times, julian_day, sun_position_batch
+
+MONTH_NAMES = [
+    "Muharram", "Shafar", "Rabiul Awal", "Rabiul Akhir", "Jumadil Awal", "Jumadil Akhir",
+    "Rajab", "Syakban", "Ramadan", "Syawal", "Zulkaidah", "Zulhijah",
+]
+MONTH_NAMES_AR = [
+    "محرم", "صفر", "ربيع الأول", "ربيع الآخر", "جمادى الأولى", "جمادى الآخرة",
+    "رجب", "شعبان", "رمضان", "شوال", "ذو القعدة", "ذو الحجة",
+]
+RAMADAN = 9
+
+MIN_ALTITUDE = 5.0
+MIN_ELONGATION = 8.0
+
+# Month numbering is anchored on 1 Ramadan 1447 H = 18 Februari 2026 (Maklumat PP Muhammadiyah)
+ANCHOR = (1447, RAMADAN, date_cls(2026, 2, 18))
+FIRST_YEAR = 1440
+LAST_YEAR = 1500
+
+# Dawn in New Zealand (Auckland) for the conjunction clause of the American exception
+NEW_ZEALAND = (-36.85, 174.76)
+
+# Search grid for sunsets (degrees)
+GRID_STEP = 2.0
+GRID_LATITUDE_LIMIT = 70.0
+
+# Western coastline of the Americas (latitude, longitude); the mainland lies east of it
+_AMERICAS_WEST_COAST = np.array([
+    (-56, -72), (-45, -75), (-30, -71.5), (-18, -70.5), (-5, -81), (5, -78), (8, -80),
+    (15, -93), (20, -105.5), (23, -110), (32, -117), (40, -124), (48, -124.7), (54, -131),
+    (55, -163), (60, -165), (66, -168), (71, -157),
+])
+_AMERICAS_EAST_LIMIT = -34.8
+# Gulf of Alaska lies between the panhandle and the Alaska Peninsula
+_GULF_OF_ALASKA = (54.0, 59.5, -152.0, -133.0)
+
+# ==================== MOON & SUN ====================
+
+# Meeus, Astronomical Algorithms ch. 47: (D, M, M', F, sum_l [1e-6 deg], sum_r [1e-3 km])
+_MOON_LR = np.array([
+    (0, 0, 1, 0, 6288774, -20905355), (2, 0, -1, 0, 1274027, -3699111), (2, 0, 0, 0, 658314, -2955968),
+    (0, 0, 2, 0, 213618, -569925), (0, 1, 0, 0, -185116, 48888), (0, 0, 0, 2, -114332, -3149),
+    (2, 0, -2, 0, 58793, 246158), (2, -1, -1, 0, 57066, -152138), (2, 0, 1, 0, 53322, -170733),
+    (2, -1, 0, 0, 45758, -204586), (0, 1, -1, 0, -40923, -129620), (1, 0, 0, 0, -34720, 108743),
+    (0, 1, 1, 0, -30383, 104755), (2, 0, 0, -2, 15327, 10321), (0, 0, 1, 2, -12528, 0),
+    (0, 0, 1, -2, 10980, 79661), (4, 0, -1, 0, 10675, -34782), (0, 0, 3, 0, 10034, -23210),
+    (4, 0, -2, 0, 8548, -21636), (2, 1, -1, 0, -7888, 24208), (2, 1, 0, 0, -6766, 30824),
+    (1, 0, -1, 0, -5163, -8379), (1, 1, 0, 0, 4987, -16675), (2, -1, 1, 0, 4036, -12831),
+    (2, 0, 2, 0, 3994, -10445), (4, 0, 0, 0, 3861, -11650), (2, 0, -3, 0, 3665, 14403),
+    (0, 1, -2, 0, -2689, -7003), (2, 0, -1, 2, -2602, 0), (2, -1, -2, 0, 2390, 10056),
+    (1, 0, 1, 0, -2348, 6322), (2, -2, 0, 0, 2236, -9884), (0, 1, 2, 0, -2120, 5751),
+    (0, 2, 0, 0, -2069, 0), (2, -2, -1, 0, 2048, -4950), (2, 0, 1, -2, -1773, 4130),
+    (2, 0, 0, 2, -1595, 0), (4, -1, -1, 0, 1215, -3958), (0, 0, 2, 2, -1110, 0),
+    (3, 0, -1, 0, -892, 3258), (2, 1, 1, 0, -810, 2616), (4, -1, -2, 0, 759, -1897),
+    (0, 2, -1, 0, -713, -2117), (2, 2, -1, 0, -700, 2354), (2, 1, -2, 0, 691, 0),
+    (2, -1, 0, -2, 596, 0), (4, 0, 1, 0, 549, -1423), (0, 0, 4, 0, 537, -1117),
+    (4, -1, 0, 0, 520, -1571), (1, 0, -2, 0, -487, -1739), (2, 1, 0, -2, -399, 0),
+    (0, 0, 2, -2, -381, -4421), (1, 1, 1, 0, 351, 0), (3, 0, -2, 0, -340, 0),
+    (4, 0, -3, 0, 330, 0), (2, -1, 2, 0, 327, 0), (0, 2, 1, 0, -323, 1165),
+    (1, 1, -1, 0, 299, 0), (2, 0, 3, 0, 294, 0), (2, 0, -1, -2, 0, 8752),
+], dtype=float)
+
+# (D, M, M', F, sum_b [1e-6 deg])
+_MOON_B = np.array([
+    (0, 0, 0, 1, 5128122), (0, 0, 1, 1, 280602), (0, 0, 1, -1, 277693), (2, 0, 0, -1, 173237),
+    (2, 0, -1, 1, 55413), (2, 0, -1, -1, 46271), (2, 0, 0, 1, 32573), (0, 0, 2, 1, 17198),
+    (2, 0, 1, -1, 9266), (0, 0, 2, -1, 8822), (2, -1, 0, -1, 8216), (2, 0, -2, -1, 4324),
+    (2, 0, 1, 1, 4200), (2, 1, 0, -1, -3359), (2, -1, -1, 1, 2463), (2, -1, 0, 1, 2211),
+    (2, -1, -1, -1, 2065), (0, 1, -1, -1, -1870), (4, 0, -1, -1, 1828), (0, 1, 0, 1, -1794),
+    (0, 0, 0, 3, -1749), (0, 1, -1, 1, -1565), (1, 0, 0, 1, -1491), (0, 1, 1, 1, -1475),
+    (0, 1, 1, -1, -1410), (0, 1, 0, -1, -1344), (1, 0, 0, -1, -1335), (0, 0, 3, 1, 1107),
+    (4, 0, 0, -1, 1021), (4, 0, -1, 1, 833),
+], dtype=float)
+
+
+def moon_position(jd: np.ndarray):
+    """Geocentric ecliptic longitude, latitude (degrees) and distance (km) of the moon"""
+    t = (np.asarray(jd, dtype=float) - 2451545.0) / 36525
+    lp = 218.3164477 + 481267.88123421 * t - 0.0015786 * t ** 2
+    d = 297.8501921 + 445267.1114034 * t - 0.0018819 * t ** 2
+    m = 357.5291092 + 35999.0502909 * t - 0.0001536 * t ** 2
+    mp = 134.9633964 + 477198.8675055 * t + 0.0087414 * t ** 2
+    f = 93.2720950 + 483202.0175233 * t - 0.0036539 * t ** 2
+    a1 = 119.75 + 131.849 * t
+    a2 = 53.09 + 479264.290 * t
+    a3 = 313.45 + 481266.484 * t
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2
+
+    def series(table, column):
+        args = np.radians(np.multiply.outer(d, table[:, 0]) + np.multiply.outer(m, table[:, 1])
+                          + np.multiply.outer(mp, table[:, 2]) + np.multiply.outer(f, table[:, 3]))
+        # Terms containing M are scaled by E for every power of M
+        scale = np.power.outer(e, np.abs(table[:, 1]))
+        return args, scale * table[:, column]
+
+    args, coeff = series(_MOON_LR, 4)
+    sum_l = (coeff * np.sin(args)).sum(axis=-1)
+    sum_r = (series(_MOON_LR, 5)[1] * np.cos(args)).sum(axis=-1)
+    args, coeff = series(_MOON_B, 4)
+    sum_b = (coeff * np.sin(args)).sum(axis=-1)
+
+    sum_l += 3958 * np.sin(np.radians(a1)) + 1962 * np.sin(np.radians(lp - f)) + 318 * np.sin(np.radians(a2))
+    sum_b += (-2235 * np.sin(np.radians(lp)) + 382 * np.sin(np.radians(a3))
+              + 175 * np.sin(np.radians(a1 - f)) + 175 * np.sin(np.radians(a1 + f))
+              + 127 * np.sin(np.radians(lp - mp)) - 115 * np.sin(np.radians(lp + mp)))
+
+    longitude = (lp + sum_l / 1e6) % 360
+    latitude = sum_b / 1e6
+    distance = 385000.56 + sum_r / 1000
+    return longitude, latitude, distance
+
+
+def sun_longitude(jd: np.ndarray) -> np.ndarray:
+    """Apparent ecliptic longitude of the sun (degrees), same series as the prayer-time engine"""
+    d = np.asarray(jd, dtype=float) - 2451545.0
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    return (q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360
+
+
+def _obliquity(jd):
+    return 23.4392911 - 0.0130042 * (np.asarray(jd, dtype=float) - 2451545.0) / 36525
+
+
+def ecliptic_to_equatorial(longitude, latitude, jd):
+    """Right ascension and declination (degrees)"""
+    eps = np.radians(_obliquity(jd))
+    lam, beta = np.radians(longitude), np.radians(latitude)
+    ra = np.degrees(np.arctan2(np.sin(lam) * np.cos(eps) - np.tan(beta) * np.sin(eps), np.cos(lam))) % 360
+    dec = np.degrees(np.arcsin(np.sin(beta) * np.cos(eps) + np.cos(beta) * np.sin(eps) * np.sin(lam)))
+    return ra, dec
+
+
+def sidereal_time(jd):
+    """Greenwich mean sidereal time (degrees)"""
+    days = np.asarray(jd, dtype=float) - 2451545.0
+    return (280.46061837 + 360.98564736629 * days) % 360
+
+
+def new_moon(k: int) -> float:
+    """Julian day (UT) of the k-th new moon after 2000-01-06 (Meeus ch. 49)"""
+    t = k / 1236.85
+    jde = 2451550.09766 + 29.530588861 * k + 0.00015437 * t ** 2 - 0.000000150 * t ** 3
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2
+    m = math.radians(2.5534 + 29.10535670 * k - 0.0000014 * t ** 2)
+    mp = math.radians(201.5643 + 385.81693528 * k + 0.0107582 * t ** 2 + 0.00001238 * t ** 3)
+    f = math.radians(160.7108 + 390.67050284 * k - 0.0016118 * t ** 2 - 0.00000227 * t ** 3)
+    om = math.radians(124.7746 - 1.56375588 * k + 0.0020672 * t ** 2)
+    jde += (-0.40720 * math.sin(mp) + 0.17241 * e * math.sin(m) + 0.01608 * math.sin(2 * mp)
+            + 0.01039 * math.sin(2 * f) + 0.00739 * e * math.sin(mp - m) - 0.00514 * e * math.sin(mp + m)
+            + 0.00208 * e * e * math.sin(2 * m) - 0.00111 * math.sin(mp - 2 * f) - 0.00057 * math.sin(mp + 2 * f)
+            + 0.00056 * e * math.sin(2 * mp + m) - 0.00042 * math.sin(3 * mp) + 0.00042 * e * math.sin(m + 2 * f)
+            + 0.00038 * e * math.sin(m - 2 * f) - 0.00024 * e * math.sin(2 * mp - m) - 0.00017 * math.sin(om)
+            - 0.00007 * math.sin(mp + 2 * m) + 0.00004 * math.sin(2 * mp - 2 * f) + 0.00004 * math.sin(3 * m)
+            + 0.00003 * math.sin(mp + m - 2 * f) + 0.00003 * math.sin(2 * mp + 2 * f)
+            - 0.00003 * math.sin(mp + m + 2 * f) + 0.00003 * math.sin(mp - m + 2 * f)
+            - 0.00002 * math.sin(mp - m - 2 * f) - 0.00002 * math.sin(3 * mp + m) + 0.00002 * math.sin(4 * mp))
+    # Terrestrial time -> UT (delta T is about 69-75 s for the covered years)
+    return jde - 72 / 86400
+
+
+# ==================== KHGT CRITERION ====================
+
+class _SearchGrid(NamedTuple):
+    latitude: np.ndarray
+    longitude: np.ndarray
+    americas: np.ndarray
+
+
+@lru_cache(maxsize=1)
+def _search_grid() -> _SearchGrid:
+    lat, lon = np.meshgrid(
+        np.arange(-GRID_LATITUDE_LIMIT, GRID_LATITUDE_LIMIT + 0.1, GRID_STEP),
+        np.arange(-180.0, 180.0, GRID_STEP),
+        indexing="ij",
+    )
+    lat, lon = lat.ravel(), lon.ravel()
+    west = np.interp(lat, _AMERICAS_WEST_COAST[:, 0], _AMERICAS_WEST_COAST[:, 1])
+    lat_min, lat_max, lon_min, lon_max = _GULF_OF_ALASKA
+    gulf = (lat > lat_min) & (lat < lat_max) & (lon > lon_min) & (lon < lon_max)
+    americas = (lon >= west) & (lon <= _AMERICAS_EAST_LIMIT) & (lat >= -56) & ~gulf
+    return _SearchGrid(lat, lon, americas)
+
+
+class _Ephemeris(NamedTuple):
+    """Sun and moon sampled every hour from 00:00 UT of an evening, interpolated per place"""
+    hours: np.ndarray
+    sun_decl: np.ndarray
+    sun_eqt: np.ndarray
+    sun_longitude: np.ndarray
+    moon_longitude: np.ndarray
+    moon_latitude: np.ndarray
+    moon_ra: np.ndarray
+    moon_dec: np.ndarray
+
+    def at(self, name: str, hours: np.ndarray) -> np.ndarray:
+        return np.interp(hours, self.hours, getattr(self, name))
+
+
+def _ephemeris(evening: date_cls) -> _Ephemeris:
+    hours = np.arange(0, 33, dtype=float)
+    jd = julian_day(evening) + hours / 24
+    decl, eqt = sun_position_batch(jd)
+    lam, beta, _ = moon_position(jd)
+    ra, dec = ecliptic_to_equatorial(lam, beta, jd)
+
+    def unwrap(degrees):
+        return np.degrees(np.unwrap(np.radians(degrees)))
+
+    return _Ephemeris(hours, decl, eqt, unwrap(sun_longitude(jd)), unwrap(lam), beta, unwrap(ra), dec)
+
+
+def sunset_hours(eph: _Ephemeris, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """UT hours after 00:00 UT of the evening at which the sun sets there (NaN if it does not set)"""
+    sin_h0, sin_lat, cos_lat = math.sin(math.radians(-0.8333)), np.sin(np.radians(lat)), np.cos(np.radians(lat))
+    hours = 18 - lon / 15
+    for _ in range(2):
+        decl = np.radians(eph.at("sun_decl", hours))
+        cos_h = (sin_h0 - sin_lat * np.sin(decl)) / (cos_lat * np.cos(decl))
+        hour_angle = np.degrees(np.arccos(np.where(np.abs(cos_h) <= 1, cos_h, np.nan))) / 15
+        hours = 12 - eph.at("sun_eqt", hours) - lon / 15 + hour_angle
+    return hours
+
+
+def moon_at(eph: _Ephemeris, jd0: float, hours: np.ndarray, lat: np.ndarray, lon: np.ndarray):
+    """Geocentric moon altitude and elongation (degrees) at the given hours and places"""
+    ra, dec = eph.at("moon_ra", hours), np.radians(eph.at("moon_dec", hours))
+    hour_angle = np.radians(sidereal_time(jd0 + hours / 24) + lon - ra)
+    phi = np.radians(lat)
+    altitude = np.degrees(np.arcsin(np.sin(phi) * np.sin(dec) + np.cos(phi) * np.cos(dec) * np.cos(hour_angle)))
+    beta = np.radians(eph.at("moon_latitude", hours))
+    delta_lambda = np.radians(eph.at("moon_longitude", hours) - eph.at("sun_longitude", hours))
+    elongation = np.degrees(np.arccos(np.cos(beta) * np.cos(delta_lambda)))
+    return altitude, elongation
+
+
+def criterion_met(evening: date_cls, conjunction: float) -> bool:
+    """Whether the KHGT criterion is met on the evening of ``evening`` (month starts the next day)"""
+    grid = _search_grid()
+    eph = _ephemeris(evening)
+    jd0 = julian_day(evening)
+    hours = sunset_hours(eph, grid.latitude, grid.longitude)
+    altitude, elongation = moon_at(eph, jd0, hours, grid.latitude, grid.longitude)
+    met = (altitude >= MIN_ALTITUDE) & (elongation >= MIN_ELONGATION) & (jd0 + hours / 24 > conjunction)
+    if np.any(met & (hours < 24)):
+        return True
+
+    # After 24:00 UTC only the American mainland counts, and only if the
+    # conjunction happened before dawn in New Zealand
+    next_day = evening + timedelta(days=1)
+    fajr = julian_day(next_day) + compute_raw_times(next_day, *NEW_ZEALAND, timezone_offset=0)["subuh"] / 24
+    return bool(conjunction < fajr and np.any(met & (hours >= 24) & grid.americas))
+
+
+def _jd_to_ordinal(jd: float) -> int:
+    return math.floor(jd - 1721424.5)
+
+
+def month_start_after(k: int) -> int:
+    """Ordinal (Gregorian) of the first day of the month following new moon ``k``"""
+    conjunction = new_moon(k)
+    evening = date_cls.fromordinal(_jd_to_ordinal(conjunction))
+    for _ in range(3):
+        if criterion_met(evening, conjunction):
+            break
+        evening += timedelta(days=1)
+    return evening.toordinal() + 1
+
+
+def lunation_before(d: date_cls) -> int:
+    """Index k of the last new moon before ``d``"""
+    k = math.floor((julian_day(d) - 2451550.1) / 29.530588861)
+    while new_moon(k + 1) < julian_day(d):
+        k += 1
+    while new_moon(k) >= julian_day(d):
+        k -= 1
+    return k
+
+
+# ==================== CALENDAR ====================
+
+class HijriDate(NamedTuple):
+    year: int
+    month: int
+    day: int
+
+    @property
+    def month_name(self) -> str:
+        return MONTH_NAMES[self.month - 1]
+
+    @property
+    def is_ramadan(self) -> bool:
+        return self.month == RAMADAN
+
+    def as_dict(self) -> dict:
+        return {
+            "year": self.year,
+            "month": self.month,
+            "day": self.day,
+            "month_name": self.month_name,
+            "month_name_ar": MONTH_NAMES_AR[self.month - 1],
+            "is_ramadan": self.is_ramadan,
+        }
+
+
+class KHGTCalendar:
+    """Sorted month-start ordinals; index i is Hijri month ``first_year * 12 + i`` (0-based month)"""
+
+    def __init__(self, first_year: int, starts: List[int]):
+        self.first_year = first_year
+        self.starts = starts
+
+    @property
+    def first_date(self) -> date_cls:
+        return date_cls.fromordinal(self.starts[0])
+
+    @property
+    def last_date(self) -> date_cls:
+        # The final entry is only the end sentinel
+        return date_cls.fromordinal(self.starts[-1] - 1)
+
+    def to_hijri(self, d: date_cls) -> HijriDate:
+        ordinal = d.toordinal()
+        i = bisect_right(self.starts, ordinal) - 1
+        if i < 0 or i >= len(self.starts) - 1:
+            raise ValueError(f"Tanggal {d.isoformat()} di luar tabel KHGT ({self.first_date} s.d. {self.last_date})")
+        year, month = divmod(self.first_year * 12 + i, 12)
+        return HijriDate(year, month + 1, ordinal - self.starts[i] + 1)
+
+    def _month_index(self, year: int, month: int) -> int:
+        i = (year - self.first_year) * 12 + month - 1
+        if not 1 <= month <= 12 or i < 0 or i >= len(self.starts) - 1:
+            raise ValueError(f"Bulan {month}/{year} H di luar tabel KHGT")
+        return i
+
+    def month_start(self, year: int, month: int) -> date_cls:
+        return date_cls.fromordinal(self.starts[self._month_index(year, month)])
+
+    def month_length(self, year: int, month: int) -> int:
+        i = self._month_index(year, month)
+        return self.starts[i + 1] - self.starts[i]
+
+    def to_gregorian(self, year: int, month: int, day: int) -> date_cls:
+        if not 1 <= day <= self.month_length(year, month):
+            raise ValueError(f"Tanggal {day} tidak ada pada bulan {month}/{year} H")
+        return self.month_start(year, month) + timedelta(days=day - 1)
+
+    def months_between(self, start: date_cls, end: date_cls) -> List[dict]:
+        """Every Hijri month overlapping [start, end] with its Gregorian first and last day"""
+        first = max(bisect_right(self.starts, start.toordinal()) - 1, 0)
+        last = min(bisect_right(self.starts, end.toordinal()) - 1, len(self.starts) - 2)
+        months = []
+        for i in range(first, last + 1):
+            year, month = divmod(self.first_year * 12 + i, 12)
+            months.append({
+                "year": year,
+                "month": month + 1,
+                "month_name": MONTH_NAMES[month],
+                "month_name_ar": MONTH_NAMES_AR[month],
+                "is_ramadan": month + 1 == RAMADAN,
+                "start": date_cls.fromordinal(self.starts[i]).isoformat(),
+                "end": date_cls.fromordinal(self.starts[i + 1] - 1).isoformat(),
+                "length": self.starts[i + 1] - self.starts[i],
+            })
+        return months
+
+    def ramadan_day(self, d: date_cls) -> Optional[int]:
+        hijri = self.to_hijri(d)
+        return hijri.day if hijri.is_ramadan else None
+
+
+def build_calendar(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> KHGTCalendar:
+    """Compute every month start from 1 Muharram ``first_year`` to the end of ``last_year``"""
+    anchor_year, anchor_month, anchor_date = ANCHOR
+    anchor_k = lunation_before(anchor_date)
+    first_k = anchor_k - ((anchor_year - first_year) * 12 + anchor_month - 1)
+    count = (last_year - first_year + 1) * 12 + 1
+    starts = [month_start_after(k) for k in range(first_k, first_k + count)]
+    return KHGTCalendar(first_year, starts)
+
+
+@lru_cache(maxsize=1)
+def get_calendar() -> KHGTCalendar:
+    return build_calendar()
@@ -0,0 +1,62 @@
+"""
+Parser tabel jadwal sholat bulanan dari halaman hisabmu.com
+Pola regex dikompilasi sekali saat import, dan HTML bisa di-feed per chunk
+langsung dari response stream. Parser berhenti di akhir tabel, sehingga sisa
+halaman tidak perlu diunduh maupun dipindai.
+"""
+import re
+from typing import List, Tuple
+
+PRAYER_COLUMNS = ("subuh", "terbit", "dhuha", "dzuhur", "ashar", "maghrib", "isya")
+
+# Possessive quantifiers (Python 3.11+) never backtrack into attributes or whitespace, and
+# each time is captured as HH:MM so rows need no post-processing
+_ROW = re.compile(
+    r"<tr[^>]*+>\s*+<td[^>]*+>(\d+)[^<]*+</td>"
+    + r"\s*+<td[^>]*+>(\d\d?:\d\d):\d\d</td>" * len(PRAYER_COLUMNS)
+)
+_SPLIT_MARGIN = len("</table>") - 1
+
+
+class HisabmuParser:
+    """Incremental parser: feed() HTML chunks until it returns True, then close() for the schedule"""
+
+    def __init__(self):
+        self._tail = ""
+        self.rows: List[Tuple[str, ...]] = []  # (day, subuh, ..., isya) as matched, times HH:MM
+        self.done = False
+
+    def feed(self, chunk: str) -> bool:
+        """Parse the complete rows in ``chunk``; True once the table has ended"""
+        if self.done:
+            return True
+        buffer = self._tail + chunk if self._tail else chunk
+        end = buffer.rfind("</tr>")
+        end = 0 if end < 0 else end + len("</tr>")
+        if end:
+            self.rows.extend(_ROW.findall(buffer, 0, end))
+        if self.rows and buffer.find("</table>", end) >= 0:
+            self.done = True
+            self._tail = ""
+            return True
+        # Only an unfinished row has to survive to the next chunk; it starts at the last "<tr".
+        # Otherwise keep just enough to catch a "<tr" or "</table>" split across chunks.
+        start = buffer.rfind("<tr", end)
+        self._tail = buffer[start:] if start >= 0 else buffer[max(end, len(buffer) - _SPLIT_MARGIN):]
+        return False
+
+    def close(self) -> list:
+        """Schedule rows in the /prayer-times/monthly shape (HH:MM)"""
+        self._tail = ""
+        return [
+            {"day": int(day), "subuh": subuh, "terbit": terbit, "dhuha": dhuha, "dzuhur": dzuhur,
+             "ashar": ashar, "maghrib": maghrib, "isya": isya}
+            for day, subuh, terbit, dhuha, dzuhur, ashar, maghrib, isya in self.rows
+        ]
+
+
+def parse_month_table(html: str) -> list:
+    """Parse a complete document in one call"""
+    parser = HisabmuParser()
+    parser.feed(html)
+    return parser.close()
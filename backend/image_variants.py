@@ -0,0 +1,63 @@
+"""
+Turunan gambar (thumbnail, medium, display) dalam format WebP
+Dihitung di process pool supaya decode/resize tidak menahan event loop.
+Nama turunan deterministik dari hash file asal: <sha256>-<varian>.webp
+"""
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# Varian -> sisi terpanjang (px); "display" cukup untuk layar 1080p
+VARIANTS = {"thumb": 320, "medium": 800, "display": 1920}
+WEBP_QUALITY = 80
+
+# Animated GIFs and SVGs are served as-is
+RASTER_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "bmp", "tif", "tiff"}
+
+
+def variant_name(source_name: str, variant: str) -> str:
+    return f"{source_name.split('.', 1)[0]}-{variant}.webp"
+
+
+def has_variants(source_name: str) -> bool:
+    return "." in source_name and source_name.rsplit(".", 1)[-1] in RASTER_EXTENSIONS
+
+
+def find_source(digest: str, directory: str) -> Optional[str]:
+    """Name of the raster upload ``<digest>.<ext>`` in ``directory``, probing each known extension"""
+    for ext in RASTER_EXTENSIONS:
+        name = f"{digest}.{ext}"
+        if os.path.isfile(os.path.join(directory, name)):
+            return name
+    return None
+
+
+def parse_variant_name(name: str) -> Optional[tuple]:
+    """(source hash, variant) for ``<hash>-<variant>.webp``, else None"""
+    if not name.endswith(".webp") or "-" not in name:
+        return None
+    digest, variant = name[:-len(".webp")].split("-", 1)
+    return (digest, variant) if variant in VARIANTS else None
+
+
+def render_variants(source: str, out_dir: str) -> Dict[str, str]:
+    """Write every missing variant of ``source``; runs in a worker process"""
+    from PIL import Image, ImageOps
+
+    source_path = Path(source)
+    written = {}
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        # Largest first, so each smaller size is resampled from an already reduced image
+        for variant, size in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+            name = variant_name(source_path.name, variant)
+            target = Path(out_dir) / name
+            if not target.exists():
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                tmp_path = target.with_name(f".tmp-{os.getpid()}-{name}")
+                image.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp_path, target)
+            written[variant] = name
+    return written
@@ -0,0 +1,285 @@
+"""
+Penyimpanan file upload berbasis konten (content-addressed)
+Nama file adalah sha256 dari isinya sehingga upload yang sama tidak disimpan dua kali
+dan URL-nya tidak pernah berubah isi (aman di-cache selamanya oleh browser/CDN).
+File ditulis per chunk (memori konstan), jenisnya ditentukan dari magic bytes,
+dan upload besar bisa dikirim bertahap lewat file parsial yang bisa dilanjutkan.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+
+URL_PREFIX = "/api/uploads/"
+CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 4096
+
+_NAME = re.compile(r"^[0-9a-f]{64}(-[a-z]+)?(\.[a-z0-9]{1,8})?$")
+_DATA_URL = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?((?:;[\w-]+=[^;,]*)*)(;base64)?,", re.IGNORECASE)
+
+# mimetypes gives odd picks for a few common types (e.g. .jpe for image/jpeg)
+_PREFERRED_EXTENSIONS = {
+    "image/jpeg": "jpg", "image/svg+xml": "svg", "image/webp": "webp", "image/avif": "avif",
+    "video/mp4": "mp4", "video/quicktime": "mov", "video/webm": "webm",
+    "audio/mpeg": "mp3", "audio/ogg": "ogg", "audio/wav": "wav",
+}
+
+# Major brands of the ISO-BMFF ``ftyp`` box accepted as MP4 video; HEIC, M4A etc. are rejected
+_MP4_BRANDS = {b"isom", b"iso2", b"mp41", b"mp42", b"avc1", b"M4V "}
+
+# (offset, magic bytes, mime type)
+_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"\xff\xfb", "audio/mpeg"),
+    (0, b"\xff\xf3", "audio/mpeg"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"%PDF-", "application/pdf"),
+    (8, b"WEBP", "image/webp"),
+    (8, b"WAVE", "audio/wav"),
+]
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File melebihi batas {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, current: int):
+        super().__init__(f"Offset tidak sesuai, lanjutkan dari {current}")
+        self.current = current
+
+
+class UnsupportedMediaType(Exception):
+    def __init__(self):
+        super().__init__("Jenis file tidak didukung (hanya gambar, video, audio atau PDF)")
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """MIME type from the first bytes of a file, ignoring what the client claims"""
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"avif", b"avis"):
+            return "image/avif"
+        if brand == b"qt  ":
+            return "video/quicktime"
+        return "video/mp4" if brand in _MP4_BRANDS else None
+    for offset, magic, mime_type in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic and (offset == 0 or head[:4] == b"RIFF"):
+            return mime_type
+    text = head.lstrip().lower()
+    if text.startswith(b"<svg") or (text.startswith((b"<?xml", b"<!--", b"<!doctype svg")) and b"<svg" in text):
+        return "image/svg+xml"
+    return None
+
+
+def is_inline_type(mime_type: Optional[str]) -> bool:
+    """Whether a stored file may be shown inline; anything scriptable (SVG, HTML, ...) is downloaded"""
+    if not mime_type or mime_type == "image/svg+xml":
+        return False
+    return mime_type == "application/pdf" or mime_type.startswith(("image/", "video/", "audio/"))
+
+
+def extension_for(content_type: Optional[str], filename: Optional[str] = None) -> str:
+    if content_type:
+        content_type = content_type.split(";")[0].strip().lower()
+        if content_type in _PREFERRED_EXTENSIONS:
+            return _PREFERRED_EXTENSIONS[content_type]
+        guessed = mimetypes.guess_extension(content_type)
+        if guessed:
+            return guessed.lstrip(".")
+    if filename and "." in filename:
+        ext = filename.rsplit(".", 1)[-1].lower()
+        if re.fullmatch(r"[a-z0-9]{1,8}", ext):
+            return ext
+    return ""
+
+
+def is_valid_name(name: str) -> bool:
+    return bool(_NAME.match(name))
+
+
+def url_for(name: str) -> str:
+    return f"{URL_PREFIX}{name}"
+
+
+def parse_data_url(url: str) -> Optional[Tuple[str, bytes]]:
+    """(mime type, raw bytes) of a ``data:`` URL, or None if it is not one"""
+    match = _DATA_URL.match(url)
+    if not match:
+        return None
+    payload = url[match.end():]
+    try:
+        data = base64.b64decode(payload, validate=False) if match.group(3) else payload.encode()
+    except (binascii.Error, ValueError):
+        return None
+    return (match.group(1) or "application/octet-stream").lower(), data
+
+
+class MediaStore:
+    """Files stored as ``<sha256>.<ext>`` in one directory"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        # One writer per resumable upload: the offset check and the append must not interleave.
+        # upload id -> [lock, requests using it]; removed with the last request, so uploads that are
+        # abandoned, pruned or cancelled leave nothing behind
+        self._upload_locks: Dict[str, list] = {}
+
+    def path_for(self, name: str) -> Path:
+        return self.root / name
+
+    def _finish(self, tmp_path: Path, digest: str, ext: str) -> str:
+        name = f"{digest}.{ext}" if ext else digest
+        target = self.path_for(name)
+        if target.exists():
+            # Same content already stored: keep the existing file
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, target)
+        return name
+
+    async def save_stream(self, read, filename: Optional[str] = None,
+                          max_bytes: Optional[int] = None) -> Tuple[str, str]:
+        """Write chunks from ``await read(size)`` while hashing; returns (stored name, mime type)"""
+        digest = hashlib.sha256()
+        tmp_path = self.root / f".tmp-{uuid.uuid4().hex}"
+        head = b""
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while True:
+                    chunk = await read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(max_bytes)
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES - len(head)]
+                    digest.update(chunk)
+                    await f.write(chunk)
+            mime_type = sniff_mime(head)
+            if mime_type is None:
+                raise UnsupportedMediaType()
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return self._finish(tmp_path, digest.hexdigest(), extension_for(mime_type, filename)), mime_type
+
+    async def save_bytes(self, data: bytes, ext: str) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest}.{ext}" if ext else digest
+        if self.path_for(name).exists():
+            return name
+        tmp_path = self.root / f".tmp-{uuid.uuid4().hex}"
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+        return self._finish(tmp_path, digest, ext)
+
+    # ---- Resumable uploads: one partial file per session, its size is the resume offset ----
+
+    def partial_path(self, upload_id: str) -> Path:
+        return self.root / f".partial-{upload_id}"
+
+    def partial_size(self, upload_id: str) -> int:
+        try:
+            return self.partial_path(upload_id).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @asynccontextmanager
+    async def _upload_lock(self, upload_id: str):
+        slot = self._upload_locks.get(upload_id)
+        if slot is None:
+            slot = self._upload_locks[upload_id] = [asyncio.Lock(), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._upload_locks[upload_id]
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+        """Append a streamed chunk at ``offset``; returns the new size
+
+        Raises OffsetMismatch unless ``offset`` is the current size, checked under the upload's
+        lock so two requests for the same offset cannot both write.
+        """
+        async with self._upload_lock(upload_id):
+            current = self.partial_size(upload_id)
+            if offset != current:
+                raise OffsetMismatch(current)
+            path = self.partial_path(upload_id)
+            size = offset
+            async with aiofiles.open(path, "r+b" if path.exists() else "wb") as f:
+                await f.seek(offset)
+                try:
+                    async for chunk in chunks:
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise UploadTooLarge(max_bytes)
+                        await f.write(chunk)
+                except BaseException:
+                    # Drop the incomplete chunk so the client can resume from ``offset``
+                    await f.truncate(offset)
+                    raise
+            return size
+
+    def _complete(self, upload_id: str, filename: Optional[str]) -> Tuple[str, str]:
+        path = self.partial_path(upload_id)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            digest.update(head)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        mime_type = sniff_mime(head)
+        if mime_type is None:
+            path.unlink(missing_ok=True)
+            raise UnsupportedMediaType()
+        return self._finish(path, digest.hexdigest(), extension_for(mime_type, filename)), mime_type
+
+    async def complete(self, upload_id: str, size: int, filename: Optional[str] = None) -> Tuple[str, str]:
+        """Hash the finished partial file (off the event loop) and move it into the store
+
+        Raises OffsetMismatch while fewer than ``size`` bytes have been received.
+        """
+        async with self._upload_lock(upload_id):
+            received = self.partial_size(upload_id)
+            if received != size:
+                raise OffsetMismatch(received)
+            return await asyncio.to_thread(self._complete, upload_id, filename)
+
+    async def discard(self, upload_id: str):
+        async with self._upload_lock(upload_id):
+            self.partial_path(upload_id).unlink(missing_ok=True)
+
+    def prune(self, max_age: float) -> int:
+        """Remove temp and partial files older than ``max_age`` seconds (abandoned uploads)"""
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.root.glob(".*-*"):
+            if path.name.startswith((".tmp-", ".partial-")) and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,74 @@
+"""
+HTTP client bersama untuk semua panggilan keluar (hisabmu.com, Sheets, kalender KHGT)
+Satu httpx.AsyncClient per aplikasi dengan connection pooling, keep-alive,
+HTTP/2 (jika paket ``h2`` terpasang) dan batas konkurensi per host.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class OutboundClient:
+    """Application-scoped httpx client with a per-host concurrency cap"""
+
+    def __init__(self, max_connections: int = 50, max_keepalive: int = 10, keepalive_expiry: float = 60.0,
+                 per_host_limit: int = 4, timeout: float = 30.0, headers: Optional[dict] = None):
+        self.per_host_limit = per_host_limit
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=10.0)
+        self._headers = headers or {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: dict = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits,
+                timeout=self._timeout,
+                headers=self._headers,
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._semaphore(url):
+            return await self.client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streamed response; the per-host slot is held until the body is consumed"""
+        async with self._semaphore(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
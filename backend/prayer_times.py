@@ -0,0 +1,204 @@
+"""
+Perhitungan jadwal sholat lokal (hisab) untuk metode Muhammadiyah (MU)
+Menggantikan scraping hisabmu.com per request: posisi matahari dihitung
+langsung dari lintang, bujur, elevasi dan zona waktu masjid.
+"""
+import math
+from datetime import date as date_cls, timedelta
+
+import numpy as np
+
+# Parameter metode. "MU" mengikuti parameter yang dikirim ke hisabmu.com
+# (method=MU, ikhtiyat=16): subuh & isya -18 derajat, ashar bayangan 1x,
+# dhuha saat matahari setinggi 3.5 derajat, ikhtiyat 16 detik.
+PRAYER_METHODS = {
+    "MU": {
+        "fajr_angle": 18.0,
+        "isha_angle": 18.0,
+        "asr_factor": 1.0,
+        "dhuha_altitude": 3.5,
+        "ikhtiyat_seconds": 16,
+        "imsak_minutes": 10,
+    },
+}
+
+PRAYER_NAMES = ["subuh", "terbit", "dhuha", "dzuhur", "ashar", "maghrib", "isya"]
+
+
+def _dsin(d):
+    return math.sin(math.radians(d))
+
+
+def _dcos(d):
+    return math.cos(math.radians(d))
+
+
+def julian_day(d: date_cls) -> float:
+    """Julian day at 00:00 UT for a Gregorian date"""
+    year, month = d.year, d.month
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return math.floor(365.25 * (year + 4716)) + math.floor(30.6001 * (month + 1)) + d.day + b - 1524.5
+
+
+def sun_position(jd: float):
+    """Return (declination in degrees, equation of time in hours)"""
+    d = jd - 2451545.0
+    g = (357.529 + 0.98560028 * d) % 360
+    q = (280.459 + 0.98564736 * d) % 360
+    lam = (q + 1.915 * _dsin(g) + 0.020 * _dsin(2 * g)) % 360
+    e = 23.439 - 0.00000036 * d
+    ra = math.degrees(math.atan2(_dcos(e) * _dsin(lam), _dcos(lam))) / 15 % 24
+    decl = math.degrees(math.asin(_dsin(e) * _dsin(lam)))
+    eqt = q / 15 - ra
+    eqt = (eqt + 12) % 24 - 12
+    return decl, eqt
+
+
+def _hour_angle(altitude: float, decl: float, lat: float) -> float:
+    """Hours between transit and the moment the sun reaches ``altitude``"""
+    cos_h = (_dsin(altitude) - _dsin(decl) * _dsin(lat)) / (_dcos(decl) * _dcos(lat))
+    # Clamp so extreme latitudes degrade gracefully instead of raising
+    cos_h = max(-1.0, min(1.0, cos_h))
+    return math.degrees(math.acos(cos_h)) / 15
+
+
+def _asr_altitude(factor: float, decl: float, lat: float) -> float:
+    return math.degrees(math.atan(1 / (factor + math.tan(math.radians(abs(lat - decl))))))
+
+
+def compute_raw_times(d: date_cls, latitude: float, longitude: float, elevation: float = 0,
+                      timezone_offset: float = 7, method: str = "MU") -> dict:
+    """Compute unrounded prayer times for one day as fractional local hours"""
+    params = PRAYER_METHODS[method]
+    jd = julian_day(d) - longitude / 360
+    horizon = -(0.8333 + 0.0347 * math.sqrt(max(elevation, 0)))
+
+    # Initial guesses (local hours) refined with the sun position at that moment
+    guesses = {"subuh": 5, "terbit": 6, "dhuha": 7, "dzuhur": 12, "ashar": 15, "maghrib": 18, "isya": 19}
+    times = {}
+    for name, guess in guesses.items():
+        decl, eqt = sun_position(jd + guess / 24)
+        transit = 12 - eqt - longitude / 15 + timezone_offset
+        if name == "dzuhur":
+            times[name] = transit
+        elif name == "subuh":
+            times[name] = transit - _hour_angle(-params["fajr_angle"], decl, latitude)
+        elif name == "terbit":
+            times[name] = transit - _hour_angle(horizon, decl, latitude)
+        elif name == "dhuha":
+            times[name] = transit - _hour_angle(params["dhuha_altitude"], decl, latitude)
+        elif name == "ashar":
+            times[name] = transit + _hour_angle(_asr_altitude(params["asr_factor"], decl, latitude), decl, latitude)
+        elif name == "maghrib":
+            times[name] = transit + _hour_angle(horizon, decl, latitude)
+        elif name == "isya":
+            times[name] = transit + _hour_angle(-params["isha_angle"], decl, latitude)
+    return times
+
+
+def _apply_ikhtiyat(raw: dict, params: dict) -> dict:
+    """Apply ikhtiyat and truncate to whole minutes since midnight (HH:MM:SS[:5])"""
+    ikhtiyat = params["ikhtiyat_seconds"]
+    return {name: int((raw[name] * 3600 + ikhtiyat) // 60) for name in PRAYER_NAMES}
+
+
+def format_minutes(total: int) -> str:
+    total %= 24 * 60
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def compute_prayer_times(d: date_cls, latitude: float, longitude: float, elevation: float = 0,
+                         timezone_offset: float = 7, method: str = "MU") -> dict:
+    """Compute the daily schedule in the same shape as /api/prayer-times"""
+    params = PRAYER_METHODS[method]
+    raw = compute_raw_times(d, latitude, longitude, elevation, timezone_offset, method)
+    minutes = _apply_ikhtiyat(raw, params)
+    result = {"date": d.strftime("%Y-%m-%d"), "imsak": format_minutes(minutes["subuh"] - params["imsak_minutes"])}
+    for name in PRAYER_NAMES:
+        result[name] = format_minutes(minutes[name])
+    return result
+
+
+# ==================== VECTORIZED (BATCH) ====================
+
+def sun_position_batch(jd: np.ndarray):
+    """Vectorized :func:`sun_position` over an array of Julian days"""
+    d = jd - 2451545.0
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    lam = np.radians((q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360)
+    e = np.radians(23.439 - 0.00000036 * d)
+    ra = np.degrees(np.arctan2(np.cos(e) * np.sin(lam), np.cos(lam))) / 15 % 24
+    decl = np.degrees(np.arcsin(np.sin(e) * np.sin(lam)))
+    eqt = (q / 15 - ra + 12) % 24 - 12
+    return decl, eqt
+
+
+def _hour_angle_batch(altitude, decl: np.ndarray, lat: float) -> np.ndarray:
+    lat_r = math.radians(lat)
+    decl_r = np.radians(decl)
+    cos_h = (np.sin(np.radians(altitude)) - np.sin(decl_r) * math.sin(lat_r)) / (np.cos(decl_r) * math.cos(lat_r))
+    return np.degrees(np.arccos(np.clip(cos_h, -1.0, 1.0))) / 15
+
+
+def compute_raw_times_batch(start: date_cls, days: int, latitude: float, longitude: float, elevation: float = 0,
+                            timezone_offset: float = 7, method: str = "MU") -> dict:
+    """Compute unrounded prayer times for ``days`` consecutive days in one pass"""
+    params = PRAYER_METHODS[method]
+    jd = julian_day(start) - longitude / 360 + np.arange(days, dtype=np.float64)
+    horizon = -(0.8333 + 0.0347 * math.sqrt(max(elevation, 0)))
+    guesses = {"subuh": 5, "terbit": 6, "dhuha": 7, "dzuhur": 12, "ashar": 15, "maghrib": 18, "isya": 19}
+
+    times = {}
+    for name, guess in guesses.items():
+        decl, eqt = sun_position_batch(jd + guess / 24)
+        transit = 12 - eqt - longitude / 15 + timezone_offset
+        if name == "dzuhur":
+            times[name] = transit
+        elif name == "subuh":
+            times[name] = transit - _hour_angle_batch(-params["fajr_angle"], decl, latitude)
+        elif name == "terbit":
+            times[name] = transit - _hour_angle_batch(horizon, decl, latitude)
+        elif name == "dhuha":
+            times[name] = transit - _hour_angle_batch(params["dhuha_altitude"], decl, latitude)
+        elif name == "ashar":
+            asr_alt = np.degrees(np.arctan(1 / (params["asr_factor"] + np.tan(np.radians(np.abs(latitude - decl))))))
+            times[name] = transit + _hour_angle_batch(asr_alt, decl, latitude)
+        elif name == "maghrib":
+            times[name] = transit + _hour_angle_batch(horizon, decl, latitude)
+        elif name == "isya":
+            times[name] = transit + _hour_angle_batch(-params["isha_angle"], decl, latitude)
+    return times
+
+
+def compute_schedule_range(start: date_cls, end: date_cls, latitude: float, longitude: float, elevation: float = 0,
+                           timezone_offset: float = 7, method: str = "MU") -> list:
+    """Compute every day from ``start`` to ``end`` (inclusive) with one vectorized pass"""
+    params = PRAYER_METHODS[method]
+    days = (end - start).days + 1
+    if days <= 0:
+        return []
+    raw = compute_raw_times_batch(start, days, latitude, longitude, elevation, timezone_offset, method)
+    minutes = {name: ((raw[name] * 3600 + params["ikhtiyat_seconds"]) // 60).astype(np.int64).tolist() for name in PRAYER_NAMES}
+
+    schedule = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        row = {"date": d.strftime("%Y-%m-%d"), "day": d.day, "imsak": format_minutes(minutes["subuh"][i] - params["imsak_minutes"])}
+        for name in PRAYER_NAMES:
+            row[name] = format_minutes(minutes[name][i])
+        schedule.append(row)
+    return schedule
+
+
+def compute_monthly_schedule(year: int, month: int, latitude: float, longitude: float, elevation: float = 0,
+                             timezone_offset: float = 7, method: str = "MU") -> list:
+    """Compute a month in the same row shape as /api/prayer-times/monthly"""
+    start = date_cls(year, month, 1)
+    end = (date_cls(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    rows = compute_schedule_range(start, end, latitude, longitude, elevation, timezone_offset, method)
+    return [{"day": row["day"], **{name: row[name] for name in PRAYER_NAMES}} for row in rows]
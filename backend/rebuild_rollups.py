@@ -0,0 +1,16 @@
+"""
+Script untuk menyusun ulang koleksi zis_monthly_rollups dari zis_reports dan expenditure_reports
+Jalankan jika ringkasan ZIS / grafik bulanan terlihat tidak sesuai dengan daftar laporan
+"""
+import asyncio
+
+from server import client, rebuild_zis_rollups
+
+
+async def main():
+    result = await rebuild_zis_rollups()
+    print(f"✅ {result['buckets']} rollup diperiksa, {result['corrected']} diperbaiki")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
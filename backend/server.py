@@ -1,20 +1,52 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status, UploadFile, File, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteMany, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
 import os
 import logging
+import asyncio
+import time
+import base64
+import hashlib
+import importlib.util
+import mimetypes
+import re
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
 import jwt
 import bcrypt
-import httpx
-import aiofiles
-import base64
+
+from broadcaster import Broadcaster, format_sse
+from cache import PrewarmedSlot, TTLCache
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from display_timeline import build_timeline
+from hijri_calendar import KHGTCalendar, get_calendar
+from hisabmu_parser import HisabmuParser
+from image_variants import VARIANTS, find_source, has_variants, parse_variant_name, render_variants, variant_name
+from ledger_export import EXPENDITURE_EXPORT_COLUMNS, ZIS_EXPORT_COLUMNS, cell_value, csv_chunks, write_xlsx
+from media_store import (
+    SNIFF_BYTES, URL_PREFIX, MediaStore, OffsetMismatch, UnsupportedMediaType, UploadTooLarge, extension_for,
+    is_inline_type, is_valid_name, parse_data_url, sniff_mime, url_for,
+)
+from outbound import OutboundClient
+from change_watcher import ChangeWatcher
+from sheets_sync import (
+    SHEETS, error_message as sheets_error_message, open_spreadsheet, plan_sync, prepare_worksheet, write_rows,
+)
+from singleflight import SingleFlight, StaleWhileRevalidate
+from prayer_times import PRAYER_NAMES, compute_prayer_times, compute_monthly_schedule, compute_schedule_range
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -29,15 +61,32 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'masjid-khgt-secret-key-2024')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Shared outbound HTTP client (hisabmu.com, Google Sheets, KHGT calendar, ...)
+http_client = OutboundClient(
+    max_connections=int(os.environ.get('HTTP_MAX_CONNECTIONS', '50')),
+    per_host_limit=int(os.environ.get('HTTP_PER_HOST_LIMIT', '4')),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_db_init()
+    yield
+    await shutdown_app()
+
 # Create the main app
-app = FastAPI(title="Jam Sholat Digital KHGT", lifespan=None)
+app = FastAPI(title="Jam Sholat Digital KHGT", lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
 # ==================== STARTUP INIT ====================
 
-@app.on_event("startup")
 async def startup_db_init():
+    created = await ensure_indexes()
+    if created:
+        logging.info(f"Index dibuat: {', '.join(created)}")
+    else:
+        logging.info("Semua index sudah tersedia")
+
     # Cek apakah koleksi users kosong, jika ya buat admin default
     user_count = await db.users.count_documents({})
     if user_count == 0:
@@ -49,6 +98,39 @@ async def startup_db_init():
         await db.users.insert_one(doc)
         logging.info("Berhasil membuat username: admin, password: admin123")
 
+    await load_revisions()
+    if REPLICA_SYNC != "off":
+        task = asyncio.create_task(change_watcher.run())
+        background_tasks.add(task)
+
+    # Siapkan cache jadwal sholat untuk beberapa bulan ke depan
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
+    try:
+        count = await precompute_prayer_times(get_prayer_location(identity))
+        logging.info(f"Cache jadwal sholat terisi: {count} hari")
+    except Exception as e:
+        logging.error(f"Error precomputing prayer times: {e}")
+
+    await ensure_zis_rollups()
+
+    # Tabel KHGT dihitung di thread terpisah agar startup tidak tertahan
+    task = asyncio.create_task(get_hijri_calendar())
+    background_tasks.add(task)
+
+    # Pindahkan gambar base64 lama di dokumen ke file upload
+    task = asyncio.create_task(run_upload_migration())
+    background_tasks.add(task)
+    task = asyncio.create_task(run_upload_cleanup())
+    background_tasks.add(task)
+
+    # Bangun tampilan hari berikutnya sebelum tengah malam waktu lokal
+    task = asyncio.create_task(run_midnight_prewarm())
+    background_tasks.add(task)
+
+    # Worker antrean sinkronisasi Google Sheets
+    task = asyncio.create_task(run_sheets_worker())
+    background_tasks.add(task)
+
 # ==================== MODELS ====================
 
 class UserCreate(BaseModel):
@@ -509,6 +591,73 @@ async def require_admin(user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+# ==================== REVISIONS & CONDITIONAL GET ====================
+
+# Monotonic per-collection revision, persisted in db.revisions and mirrored here
+collection_revisions = {}
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+async def load_revisions():
+    async for doc in db.revisions.find({}, {"_id": 0}):
+        collection_revisions[doc["collection"]] = doc["revision"]
+
+async def mark_changed(collection: str):
+    """Record a write to ``collection``: bump its revision and drop derived snapshots"""
+    doc = await db.revisions.find_one_and_update(
+        {"collection": collection},
+        {"$inc": {"revision": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={"_id": 0},
+    )
+    collection_revisions[collection] = max(collection_revisions.get(collection, 0), doc["revision"])
+    invalidate_local_caches(collection)
+    if collection in DISPLAY_COLLECTIONS:
+        await publish_display_change(collection)
+
+def invalidate_local_caches(collection: str):
+    """Drop every in-process cache derived from ``collection``"""
+    if collection in SETTINGS_SINGLETONS:
+        settings_cache.invalidate(collection)
+    if collection == "mosque_identity":
+        _prayer_times_memory.clear()
+    if collection in DISPLAY_COLLECTIONS:
+        display_snapshot["payload"] = None
+        display_next_day.clear()
+    if collection in FINANCE_COLLECTIONS:
+        finance_cache.clear()
+
+def make_etag(collection: str, *parts) -> str:
+    raw = ":".join([collection, str(collection_revisions.get(collection, 0)), *map(str, parts)])
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def conditional_get(collection: str, daily: bool = False):
+    """Route dependency: strong ETag from the collection revision, 304 before any DB access"""
+    async def dependency(request: Request, response: Response):
+        parts = [request.url.query]
+        if daily:
+            # "upcoming" filters depend on the current date as well
+            parts.append(datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+        etag = make_etag(collection, *parts)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return Depends(dependency)
+
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
+
 # ==================== AUTH & USER ROUTES ====================
 
 @api_router.get("/users", response_model=List[UserResponse])
@@ -571,16 +720,39 @@ async def login(user: UserLogin):
 async def get_me(user: dict = Depends(get_current_user)):
     return {"id": user["id"], "username": user["username"], "name": user["name"], "role": user.get("role", "editor")}
 
+# ==================== SETTINGS CACHE ====================
+
+SETTINGS_SINGLETONS = {"mosque_identity", "prayer_settings", "layout_settings", "qris_settings"}
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '300'))
+settings_cache = TTLCache(maxsize=16, ttl=SETTINGS_CACHE_TTL)
+
+async def get_singleton(collection: str, model, insert_default: bool = True) -> dict:
+    """Read a singleton settings document through the in-process cache"""
+    async def load():
+        doc = await db[collection].find_one({}, {"_id": 0})
+        if not doc:
+            doc = model().model_dump()
+            if insert_default:
+                await db[collection].insert_one(dict(doc))
+        return doc
+    return await settings_cache.get_or_load(collection, load)
+
+@api_router.get("/cache/stats")
+async def get_cache_stats(user: dict = Depends(get_current_user)):
+    """Hit/miss counters of the in-process caches"""
+    return {
+        "settings": settings_cache.stats(),
+        "prayer_times": {"memory_size": len(_prayer_times_memory), "coalesced": prayer_times_flight.coalesced},
+        "hisabmu": {"coalesced": hisabmu_cache.flight.coalesced},
+        "display": {"version": display_snapshot["version"], "day": display_snapshot["day"], "next_day": display_next_day.key},
+        "finance": finance_cache.stats(),
+    }
+
 # ==================== MOSQUE IDENTITY ====================
 
 @api_router.get("/mosque/identity", response_model=MosqueIdentity)
 async def get_mosque_identity():
-    identity = await db.mosque_identity.find_one({}, {"_id": 0})
-    if not identity:
-        default = MosqueIdentity()
-        doc = default.model_dump()
-        await db.mosque_identity.insert_one(doc)
-        return default
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
     return MosqueIdentity(**identity)
 
 @api_router.put("/mosque/identity", response_model=MosqueIdentity)
@@ -589,24 +761,32 @@ async def update_mosque_identity(update: MosqueIdentityUpdate, user: dict = Depe
     if not identity:
         default = MosqueIdentity()
         identity = default.model_dump()
-        await db.mosque_identity.insert_one(identity)
+        await db.mosque_identity.insert_one(dict(identity))
     
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     if update_data:
         await db.mosque_identity.update_one({}, {"$set": update_data})
     
     updated = await db.mosque_identity.find_one({}, {"_id": 0})
+    
+    # Coordinates changed: fill the prayer-time cache for the new location
+    new_location = get_prayer_location(updated)
+    if new_location != get_prayer_location(identity):
+        _prayer_times_memory.clear()
+        try:
+            await precompute_prayer_times(new_location)
+        except Exception as e:
+            logging.error(f"Error precomputing prayer times: {e}")
+    
+    await mark_changed("mosque_identity")
+    settings_cache.set("mosque_identity", updated)
     return MosqueIdentity(**updated)
 
 # ==================== PRAYER SETTINGS ====================
 
 @api_router.get("/settings/prayer", response_model=PrayerSettings)
 async def get_prayer_settings():
-    settings = await db.prayer_settings.find_one({}, {"_id": 0})
-    if not settings:
-        default = PrayerSettings()
-        await db.prayer_settings.insert_one(default.model_dump())
-        return default
+    settings = await get_singleton("prayer_settings", PrayerSettings)
     return PrayerSettings(**settings)
 
 @api_router.put("/settings/prayer", response_model=PrayerSettings)
@@ -622,17 +802,15 @@ async def update_prayer_settings(update: PrayerSettingsUpdate, user: dict = Depe
         await db.prayer_settings.update_one({}, {"$set": update_data})
     
     updated = await db.prayer_settings.find_one({}, {"_id": 0})
+    await mark_changed("prayer_settings")
+    settings_cache.set("prayer_settings", updated)
     return PrayerSettings(**updated)
 
 # ==================== LAYOUT SETTINGS ====================
 
 @api_router.get("/settings/layout", response_model=LayoutSettings)
 async def get_layout_settings():
-    settings = await db.layout_settings.find_one({}, {"_id": 0})
-    if not settings:
-        default = LayoutSettings()
-        await db.layout_settings.insert_one(default.model_dump())
-        return default
+    settings = await get_singleton("layout_settings", LayoutSettings)
     return LayoutSettings(**settings)
 
 @api_router.put("/settings/layout", response_model=LayoutSettings)
@@ -648,146 +826,229 @@ async def update_layout_settings(update: LayoutSettingsUpdate, user: dict = Depe
         await db.layout_settings.update_one({}, {"$set": update_data})
     
     updated = await db.layout_settings.find_one({}, {"_id": 0})
+    await mark_changed("layout_settings")
+    settings_cache.set("layout_settings", updated)
     return LayoutSettings(**updated)
 
 # ==================== PRAYER TIMES ====================
 
+HISABMU_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7"
+}
+
+def get_prayer_location(identity: dict) -> dict:
+    """Extract the coordinates used for hisab from a mosque identity document"""
+    return {
+        "latitude": identity.get("latitude", -7.9404),
+        "longitude": identity.get("longitude", 110.2357),
+        "elevation": identity.get("elevation", 50),
+        "timezone_offset": identity.get("timezone_offset", 7),
+    }
+
+async def fetch_hisabmu_schedule(location: dict) -> list:
+    """Scrape the current month from hisabmu.com (only used as a cross-check)"""
+    url = (
+        f"https://hisabmu.com/shalat/?latitude={location['latitude']}&longitude={location['longitude']}"
+        f"&elevation={location['elevation']}&timezone={location['timezone_offset']}&dst=auto&method=MU&ikhtiyat=16"
+    )
+    # Parse the table while the body streams in instead of buffering the whole page
+    parser = HisabmuParser()
+    async with http_client.stream("GET", url, headers=HISABMU_HEADERS) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            if parser.feed(chunk):
+                break  # Table complete: skip downloading the rest of the page
+    return parser.close()
+
+# ==================== PRAYER TIMES CACHE ====================
+
+PRAYER_METHOD = "MU"
+PRAYER_CACHE_MONTHS = int(os.environ.get('PRAYER_CACHE_MONTHS', '6'))
+PRAYER_CACHE_MEMORY_LIMIT = 2048
+PRAYER_CACHE_KEY_FIELDS = [
+    ("latitude", 1), ("longitude", 1), ("elevation", 1), ("timezone_offset", 1), ("method", 1), ("date", 1)
+]
+PRAYER_CACHE_PROJECTION = {"_id": 0, "date": 1, "imsak": 1, **{name: 1 for name in PRAYER_NAMES}}
+
+# In-memory copy of prayer_times_cache, keyed like the unique index
+_prayer_times_memory = {}
+prayer_times_flight = SingleFlight()
+
+# Last good hisabmu.com month per (location, year, month); stale data is served while refreshing
+HISABMU_FRESH_TTL = float(os.environ.get('HISABMU_FRESH_TTL', str(6 * 3600)))
+HISABMU_STALE_TTL = float(os.environ.get('HISABMU_STALE_TTL', str(31 * 24 * 3600)))
+hisabmu_cache = StaleWhileRevalidate(fresh_ttl=HISABMU_FRESH_TTL, stale_ttl=HISABMU_STALE_TTL)
+
+# Fail fast while hisabmu.com is down instead of waiting out the full client timeout
+hisabmu_breaker = CircuitBreaker(
+    "hisabmu",
+    failure_threshold=int(os.environ.get('HISABMU_FAILURE_THRESHOLD', '3')),
+    reset_timeout=float(os.environ.get('HISABMU_RESET_TIMEOUT', '60')),
+    min_timeout=float(os.environ.get('HISABMU_MIN_TIMEOUT', '2')),
+    max_timeout=float(os.environ.get('HISABMU_MAX_TIMEOUT', '15')),
+)
+
+async def get_hisabmu_month(location: dict) -> list:
+    """Current hisabmu.com month for a location, coalesced and stale-while-revalidate"""
+    now = datetime.now(timezone(timedelta(hours=location["timezone_offset"])))
+    key = (*location.values(), now.year, now.month)
+    try:
+        return await hisabmu_cache.get(key, lambda: hisabmu_breaker.call(lambda: fetch_hisabmu_schedule(location)))
+    except CircuitOpenError:
+        # Serve the last good copy of this month no matter how old it is
+        last_good = hisabmu_cache.peek(key)
+        if last_good is None:
+            raise
+        return last_good
+
+def prayer_cache_key(location: dict, day: str) -> dict:
+    return {**location, "method": PRAYER_METHOD, "date": day}
+
+def _remember_prayer_times(key: dict, times: dict):
+    if len(_prayer_times_memory) >= PRAYER_CACHE_MEMORY_LIMIT:
+        _prayer_times_memory.clear()
+    _prayer_times_memory[tuple(key.values())] = times
+
+async def precompute_prayer_times(location: dict, months: int = PRAYER_CACHE_MONTHS) -> int:
+    """Compute and upsert the next ``months`` months of prayer times for a location"""
+    start = datetime.now(timezone(timedelta(hours=location["timezone_offset"]))).date()
+    end = start + timedelta(days=31 * months)
+    rows = compute_schedule_range(start, end, **location)
+    
+    operations = []
+    for row in rows:
+        key = prayer_cache_key(location, row["date"])
+        times = {"date": row["date"], "imsak": row["imsak"], **{name: row[name] for name in PRAYER_NAMES}}
+        operations.append(UpdateOne(key, {"$set": times}, upsert=True))
+    if operations:
+        await db.prayer_times_cache.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def get_cached_prayer_times(location: dict, day: str) -> dict:
+    """Prayer times for one day: memory, then prayer_times_cache, then compute"""
+    key = prayer_cache_key(location, day)
+    cached = _prayer_times_memory.get(tuple(key.values()))
+    if cached:
+        return cached
+    
+    async def load():
+        times = await db.prayer_times_cache.find_one(key, PRAYER_CACHE_PROJECTION)
+        if not times:
+            times = compute_prayer_times(datetime.strptime(day, "%Y-%m-%d").date(), **location)
+            await db.prayer_times_cache.update_one(key, {"$set": times}, upsert=True)
+        _remember_prayer_times(key, times)
+        return times
+    
+    # Screens restarting together share one lookup per (location, day)
+    return await prayer_times_flight.do(tuple(key.values()), load)
+
 @api_router.get("/prayer-times")
 async def get_prayer_times(date: Optional[str] = None):
-    identity = await db.mosque_identity.find_one({}, {"_id": 0})
-    if not identity:
-        identity = MosqueIdentity().model_dump()
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
     
-    tz = identity.get("timezone_offset", 7)
+    location = get_prayer_location(identity)
     
-    # If date provided, use it. Otherwise use today (WIB)
+    # If date provided, use it. Otherwise use today (local mosque time)
     if date:
         target_date = datetime.fromisoformat(date)
     else:
-        target_date = datetime.now(timezone(timedelta(hours=tz)))
-    
-    year = target_date.year
-    month = target_date.month
-    day = target_date.day
+        target_date = datetime.now(timezone(timedelta(hours=location["timezone_offset"])))
     
-    # Extract requested params to pass to hisabmu API
-    lat = identity.get("latitude", -7.9404)
-    lng = identity.get("longitude", 110.2357)
-    elev = identity.get("elevation", 50)
-
-    
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7"
-        }
-        async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-            url = f"https://hisabmu.com/shalat/?latitude={lat}&longitude={lng}&elevation={elev}&timezone={tz}&dst=auto&method=MU&ikhtiyat=16"
-            response = await client.get(url)
-            html = response.text
-            
-            import re
-            pattern = r'<tr[^>]*>\s*<td[^>]*>(\d+)[^<]*</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>'
-            
-            matches = re.findall(pattern, html, re.DOTALL)
-            
-            for match in matches:
-                row_day = int(match[0].split('/')[0] if '/' in match[0] else match[0])
-                if row_day == day:
-                    subuh = match[1][:5]
-                    # Calculate imsak
-                    subuh_parts = subuh.split(":")
-                    imsak_hour = int(subuh_parts[0])
-                    imsak_min = int(subuh_parts[1]) - 10
-                    if imsak_min < 0:
-                        imsak_min += 60
-                        imsak_hour -= 1
-                    imsak = f"{imsak_hour:02d}:{imsak_min:02d}"
-                    
-                    return {
-                        "date": target_date.strftime("%Y-%m-%d"),
-                        "imsak": imsak,
-                        "subuh": subuh,
-                        "terbit": match[2][:5],
-                        "dhuha": match[3][:5],
-                        "dzuhur": match[4][:5],
-                        "ashar": match[5][:5],
-                        "maghrib": match[6][:5],
-                        "isya": match[7][:5],
-                    }
-    except Exception as e:
-        logging.error(f"Error fetching prayer times: {e}")
-    
-    # Final fallback
-    return {
-        "date": target_date.strftime("%Y-%m-%d"),
-        "imsak": "04:22",
-        "subuh": "04:32",
-        "terbit": "05:43",
-        "dhuha": "06:01",
-        "dzuhur": "11:53",
-        "ashar": "15:02",
-        "maghrib": "18:03",
-        "isya": "19:14",
-    }
+    return await get_cached_prayer_times(location, target_date.strftime("%Y-%m-%d"))
 
 @api_router.get("/prayer-times/monthly")
-async def get_monthly_prayer_times(month: Optional[int] = None, year: Optional[int] = None):
-    identity = await db.mosque_identity.find_one({}, {"_id": 0})
-    if not identity:
-        identity = MosqueIdentity().model_dump()
+async def get_monthly_prayer_times(month: Optional[int] = Query(None, ge=1, le=12), year: Optional[int] = None):
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
     
-    lat = identity.get("latitude", -7.9404)
-    lng = identity.get("longitude", 110.2357)
-    elev = identity.get("elevation", 50)
-    tz = identity.get("timezone_offset", 7)
+    location = get_prayer_location(identity)
     
-    now = datetime.now(timezone(timedelta(hours=tz)))
+    now = datetime.now(timezone(timedelta(hours=location["timezone_offset"])))
     if not month:
         month = now.month
     if not year:
         year = now.year
     
+    schedule = compute_monthly_schedule(year, month, **location)
+    return {"month": month, "year": year, "schedule": schedule}
+
+PRAYER_RANGE_MAX_DAYS = 731
+
+@api_router.get("/prayer-times/range")
+async def get_prayer_times_range(start: Optional[str] = None, end: Optional[str] = None):
+    """Get prayer times for every day between start and end (inclusive, max 2 years)"""
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
+    
+    location = get_prayer_location(identity)
+    
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7"
-        }
-        async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
-            url = f"https://hisabmu.com/shalat/?latitude={lat}&longitude={lng}&elevation={elev}&timezone={tz}&dst=auto&method=MU&ikhtiyat=16"
-            response = await client.get(url)
-            html = response.text
-            
-            import re
-            pattern = r'<tr[^>]*>\s*<td[^>]*>(\d+)[^<]*</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>\s*<td[^>]*>(\d+:\d+:\d+)</td>'
-            
-            matches = re.findall(pattern, html, re.DOTALL)
-            
-            schedule = []
-            for match in matches:
-                row_day = int(match[0].split('/')[0] if '/' in match[0] else match[0])
-                schedule.append({
-                    "day": row_day,
-                    "subuh": match[1][:5],
-                    "terbit": match[2][:5],
-                    "dhuha": match[3][:5],
-                    "dzuhur": match[4][:5],
-                    "ashar": match[5][:5],
-                    "maghrib": match[6][:5],
-                    "isya": match[7][:5],
-                })
-            
-            return {"month": month, "year": year, "schedule": schedule}
-            
+        if start:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date()
+        else:
+            start_date = datetime.now(timezone(timedelta(hours=location["timezone_offset"]))).date()
+        if end:
+            end_date = datetime.strptime(end, "%Y-%m-%d").date()
+        else:
+            end_date = start_date + timedelta(days=364)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format tanggal harus YYYY-MM-DD")
+    
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        raise HTTPException(status_code=400, detail="Tanggal akhir harus setelah tanggal awal")
+    if days > PRAYER_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Rentang maksimal {PRAYER_RANGE_MAX_DAYS} hari")
+    
+    schedule = compute_schedule_range(start_date, end_date, **location)
+    return {"start": start_date.isoformat(), "end": end_date.isoformat(), "schedule": schedule}
+
+@api_router.get("/prayer-times/cross-check")
+async def cross_check_prayer_times(user: dict = Depends(get_current_user)):
+    """Compare the local hisab for the current month against hisabmu.com"""
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
+    
+    location = get_prayer_location(identity)
+    now = datetime.now(timezone(timedelta(hours=location["timezone_offset"])))
+    local = {row["day"]: row for row in compute_monthly_schedule(now.year, now.month, **location)}
+    
+    try:
+        remote = await get_hisabmu_month(location)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503, detail=f"hisabmu.com tidak tersedia: {str(e)}",
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
     except Exception as e:
-        logging.error(f"Error fetching monthly prayer times: {e}")
-        return {"month": month, "year": year, "schedule": [], "error": str(e)}
+        logging.error(f"Error fetching hisabmu cross-check: {e}")
+        raise HTTPException(status_code=502, detail=f"Gagal mengambil data hisabmu.com: {str(e)}")
+    
+    def to_minutes(value: str) -> int:
+        hour, minute = value.split(":")
+        return int(hour) * 60 + int(minute)
+    
+    max_diff = 0
+    differences = []
+    for row in remote:
+        local_row = local.get(row["day"])
+        if not local_row:
+            continue
+        diff = {name: to_minutes(local_row[name]) - to_minutes(row[name]) for name in PRAYER_NAMES}
+        max_diff = max(max_diff, max(abs(v) for v in diff.values()))
+        if any(diff.values()):
+            differences.append({"day": row["day"], "local": local_row, "hisabmu": row, "diff_minutes": diff})
+    
+    return {
+        "month": now.month,
+        "year": now.year,
+        "days_compared": len(remote),
+        "max_diff_minutes": max_diff,
+        "differences": differences,
+    }
 
 # ==================== CONTENT MANAGEMENT ====================
 
-@api_router.get("/content", response_model=List[Content])
+@api_router.get("/content", response_model=List[Content], dependencies=[conditional_get("contents")])
 async def get_contents(active_only: bool = False):
     query = {"is_active": True} if active_only else {}
     contents = await db.contents.find(query, {"_id": 0}).sort("order", 1).to_list(100)
@@ -799,6 +1060,7 @@ async def create_content(content: ContentCreate, user: dict = Depends(get_curren
     doc = content_obj.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.contents.insert_one(doc)
+    await mark_changed("contents")
     return content_obj
 
 @api_router.put("/content/{content_id}", response_model=Content)
@@ -812,6 +1074,7 @@ async def update_content(content_id: str, update: ContentUpdate, user: dict = De
         await db.contents.update_one({"id": content_id}, {"$set": update_data})
     
     updated = await db.contents.find_one({"id": content_id}, {"_id": 0})
+    await mark_changed("contents")
     return Content(**updated)
 
 @api_router.delete("/content/{content_id}")
@@ -819,11 +1082,12 @@ async def delete_content(content_id: str, user: dict = Depends(get_current_user)
     result = await db.contents.delete_one({"id": content_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Content not found")
+    await mark_changed("contents")
     return {"message": "Content deleted"}
 
 # ==================== AGENDA ====================
 
-@api_router.get("/agenda", response_model=List[Agenda])
+@api_router.get("/agenda", response_model=List[Agenda], dependencies=[conditional_get("agendas", daily=True)])
 async def get_agendas(active_only: bool = False, upcoming_only: bool = False):
     query = {}
     if active_only:
@@ -843,6 +1107,7 @@ async def create_agenda(agenda: AgendaCreate, user: dict = Depends(get_current_u
     doc = agenda_obj.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.agendas.insert_one(doc)
+    await mark_changed("agendas")
     return agenda_obj
 
 @api_router.put("/agenda/{agenda_id}", response_model=Agenda)
@@ -856,6 +1121,7 @@ async def update_agenda(agenda_id: str, update: AgendaUpdate, user: dict = Depen
         await db.agendas.update_one({"id": agenda_id}, {"$set": update_data})
     
     updated = await db.agendas.find_one({"id": agenda_id}, {"_id": 0})
+    await mark_changed("agendas")
     return Agenda(**updated)
 
 @api_router.delete("/agenda/{agenda_id}")
@@ -863,11 +1129,12 @@ async def delete_agenda(agenda_id: str, user: dict = Depends(get_current_user)):
     result = await db.agendas.delete_one({"id": agenda_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Agenda not found")
+    await mark_changed("agendas")
     return {"message": "Agenda deleted"}
 
 # ==================== RUNNING TEXT ====================
 
-@api_router.get("/running-text", response_model=List[RunningText])
+@api_router.get("/running-text", response_model=List[RunningText], dependencies=[conditional_get("running_texts")])
 async def get_running_texts(active_only: bool = False):
     query = {"is_active": True} if active_only else {}
     texts = await db.running_texts.find(query, {"_id": 0}).sort("order", 1).to_list(100)
@@ -877,6 +1144,7 @@ async def get_running_texts(active_only: bool = False):
 async def create_running_text(text: RunningTextCreate, user: dict = Depends(get_current_user)):
     text_obj = RunningText(**text.model_dump())
     await db.running_texts.insert_one(text_obj.model_dump())
+    await mark_changed("running_texts")
     return text_obj
 
 @api_router.put("/running-text/{text_id}", response_model=RunningText)
@@ -890,6 +1158,7 @@ async def update_running_text(text_id: str, update: RunningTextUpdate, user: dic
         await db.running_texts.update_one({"id": text_id}, {"$set": update_data})
     
     updated = await db.running_texts.find_one({"id": text_id}, {"_id": 0})
+    await mark_changed("running_texts")
     return RunningText(**updated)
 
 @api_router.delete("/running-text/{text_id}")
@@ -897,32 +1166,287 @@ async def delete_running_text(text_id: str, user: dict = Depends(get_current_use
     result = await db.running_texts.delete_one({"id": text_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Running text not found")
+    await mark_changed("running_texts")
     return {"message": "Running text deleted"}
 
 # ==================== FILE UPLOAD ====================
 
 UPLOAD_DIR = ROOT_DIR / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
+media_store = MediaStore(UPLOAD_DIR)
+
+# Nama file = sha256 isi, jadi isi di balik URL tidak pernah berubah
+UPLOAD_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Upload disajikan dari origin API (yang sama dengan token admin): jangan pernah dijalankan sebagai dokumen
+UPLOAD_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox",
+}
+
+# Jika backend di belakang nginx, isi mis. "/_uploads/" agar nginx yang mengirim file (sendfile, Range)
+UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '')
+
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_MB', '200')) * 1024 * 1024
+# Ukuran chunk yang disarankan ke klien untuk upload bertahap (video besar)
+UPLOAD_CHUNK_BYTES = int(os.environ.get('UPLOAD_CHUNK_MB', '8')) * 1024 * 1024
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+
+# Resize/encode gambar di proses terpisah (CPU-bound, juga lepas dari GIL)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+_image_pool: Optional[ProcessPoolExecutor] = None
+variant_flight = SingleFlight()
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_pool
+
+async def ensure_variants(name: str) -> dict:
+    """Render the WebP variants of an uploaded image (once, even with concurrent callers)"""
+    async def render():
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(get_image_pool(), render_variants,
+                                              str(media_store.path_for(name)), str(UPLOAD_DIR))
+        except Exception as e:
+            logging.error(f"Gagal membuat varian gambar {name}: {e}")
+            return {}
+    return await variant_flight.do(name, render)
+
+def schedule_variants(name: str):
+    if has_variants(name):
+        task = asyncio.create_task(ensure_variants(name))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+def variant_urls(url: Optional[str]) -> Optional[dict]:
+    """Variant URLs of an uploaded image, or None for external/non-raster media"""
+    if not url or not url.startswith(URL_PREFIX):
+        return None
+    name = url[len(URL_PREFIX):]
+    if not has_variants(name):
+        return None
+    return {variant: url_for(variant_name(name, variant)) for variant in VARIANTS}
+
+def with_variants(items: list, field: str) -> list:
+    key = field.replace("_url", "_variants")
+    for item in items:
+        item[key] = variant_urls(item.get(field))
+    return items
+
+# Field yang berisi URL gambar/media, per koleksi
+MEDIA_FIELDS = {
+    "contents": ["content_url"],
+    "gallery": ["image_url"],
+    "articles": ["image_url"],
+    "pengurus": ["photo_url"],
+    "special_events": ["image_url"],
+    "mosque_identity": ["logo_url", "profile_image_url"],
+    "layout_settings": ["background_image", "background_images"],
+    "qris_settings": ["qris_image_url"],
+}
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+
+def upload_error(e: Exception) -> HTTPException:
+    if isinstance(e, UploadTooLarge):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=415, detail=str(e))
+
+def offset_conflict(detail: str, current: int) -> HTTPException:
+    return HTTPException(status_code=409, detail=detail, headers={"Upload-Offset": str(current)})
+
+def uploaded_file(name: str, mime_type: str) -> dict:
+    schedule_variants(name)
+    url = url_for(name)
+    return {"url": url, "filename": name, "content_type": mime_type, "variants": variant_urls(url)}
 
 @api_router.post("/upload")
-async def upload_file(file: UploadFile = File(...), user: dict = Depends(get_current_user)):
-    file_ext = file.filename.split(".")[-1] if "." in file.filename else ""
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}.{file_ext}" if file_ext else file_id
-    
-    file_path = UPLOAD_DIR / filename
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    
-    # Return base64 URL for simplicity (in production, use proper file serving)
-    with open(file_path, 'rb') as f:
-        b64_content = base64.b64encode(f.read()).decode()
-    
-    mime_type = file.content_type or "application/octet-stream"
-    data_url = f"data:{mime_type};base64,{b64_content}"
-    
-    return {"url": data_url, "filename": filename}
+async def upload_file(request: Request, file: UploadFile = File(...), user: dict = Depends(get_current_user)):
+    # Tolak lebih awal bila Content-Length sudah jelas melebihi batas (multipart menambah sedikit overhead)
+    if int(request.headers.get("content-length") or 0) > UPLOAD_MAX_BYTES + 64 * 1024:
+        raise upload_error(UploadTooLarge(UPLOAD_MAX_BYTES))
+    try:
+        name, mime_type = await media_store.save_stream(file.read, file.filename, UPLOAD_MAX_BYTES)
+    except (UploadTooLarge, UnsupportedMediaType) as e:
+        raise upload_error(e)
+    return uploaded_file(name, mime_type)
+
+async def get_upload_session(upload_id: str, user: dict) -> dict:
+    session = await db.upload_sessions.find_one({"id": upload_id, "user_id": user["id"]}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Sesi upload tidak ditemukan atau sudah kedaluwarsa")
+    return session
+
+def upload_session_state(session: dict) -> dict:
+    return {
+        "id": session["id"],
+        "size": session["size"],
+        "offset": media_store.partial_size(session["id"]),
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+    }
+
+@api_router.post("/upload/sessions")
+async def create_upload_session(data: UploadSessionCreate, user: dict = Depends(get_current_user)):
+    """Start a resumable upload; chunks are then PUT at increasing offsets"""
+    if data.size > UPLOAD_MAX_BYTES:
+        raise upload_error(UploadTooLarge(UPLOAD_MAX_BYTES))
+    now = datetime.now(timezone.utc)
+    session = {
+        "id": str(uuid.uuid4()),
+        "user_id": user["id"],
+        "filename": data.filename,
+        "size": data.size,
+        "created_at": now,
+        "expires_at": now + UPLOAD_SESSION_TTL,
+    }
+    await db.upload_sessions.insert_one(session)
+    return upload_session_state(session)
+
+@api_router.get("/upload/sessions/{upload_id}")
+async def get_upload_session_state(upload_id: str, user: dict = Depends(get_current_user)):
+    """Current offset, to resume after a dropped connection"""
+    return upload_session_state(await get_upload_session(upload_id, user))
+
+@api_router.put("/upload/sessions/{upload_id}")
+async def upload_session_chunk(upload_id: str, offset: int, request: Request, user: dict = Depends(get_current_user)):
+    """Append the raw request body at ``offset``; streamed straight to disk"""
+    session = await get_upload_session(upload_id, user)
+    try:
+        size = await media_store.append(upload_id, offset, request.stream(), session["size"])
+    except OffsetMismatch as e:
+        raise offset_conflict(str(e), e.current)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Data melebihi ukuran file yang dideklarasikan")
+    return {**upload_session_state(session), "offset": size}
+
+@api_router.post("/upload/sessions/{upload_id}/complete")
+async def complete_upload_session(upload_id: str, user: dict = Depends(get_current_user)):
+    session = await get_upload_session(upload_id, user)
+    try:
+        name, mime_type = await media_store.complete(upload_id, session["size"], session["filename"])
+    except OffsetMismatch as e:
+        raise offset_conflict(f"Upload belum lengkap ({e.current}/{session['size']} byte)", e.current)
+    except UnsupportedMediaType as e:
+        await db.upload_sessions.delete_one({"id": upload_id})
+        raise upload_error(e)
+    await db.upload_sessions.delete_one({"id": upload_id})
+    return uploaded_file(name, mime_type)
+
+@api_router.delete("/upload/sessions/{upload_id}")
+async def cancel_upload_session(upload_id: str, user: dict = Depends(get_current_user)):
+    await get_upload_session(upload_id, user)
+    await media_store.discard(upload_id)
+    await db.upload_sessions.delete_one({"id": upload_id})
+    return {"message": "Upload dibatalkan"}
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    try:
+        since = parsedate_to_datetime(request.headers["if-modified-since"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return int(mtime) <= since.timestamp()
+
+@api_router.get("/uploads/{name}")
+async def get_upload(name: str, request: Request):
+    """Serve an uploaded file with Range, ETag and Last-Modified; the name is its content hash"""
+    if not is_valid_name(name):
+        raise HTTPException(status_code=404, detail="File tidak ditemukan")
+    path = media_store.path_for(name)
+    # Filesystem calls stay off the event loop: one stat covers existence, ETag and Range
+    try:
+        stat_result = await asyncio.to_thread(path.stat)
+    except FileNotFoundError:
+        variant = parse_variant_name(name)
+        if not variant:
+            raise HTTPException(status_code=404, detail="File tidak ditemukan")
+        # Varian belum ada (mis. upload lama): buat sekarang dari file asalnya
+        source = await asyncio.to_thread(find_source, variant[0], str(UPLOAD_DIR))
+        if source is None:
+            raise HTTPException(status_code=404, detail="File tidak ditemukan")
+        await ensure_variants(source)
+        try:
+            stat_result = await asyncio.to_thread(path.stat)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File tidak ditemukan")
+
+    # Isi file tidak pernah berubah untuk nama yang sama, jadi nama = ETag yang kuat (sama di semua replika)
+    headers = {"Cache-Control": UPLOAD_CACHE_CONTROL, "ETag": f'"{name.split(".")[0]}"', **UPLOAD_SECURITY_HEADERS}
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if not is_inline_type(content_type):
+        headers["Content-Disposition"] = f'attachment; filename="{name}"'
+    if is_not_modified(request, headers["ETag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+    if UPLOAD_ACCEL_PREFIX:
+        # nginx serves the bytes itself (sendfile, Range) from an internal location
+        headers["X-Accel-Redirect"] = f"{UPLOAD_ACCEL_PREFIX}{name}"
+        headers["Content-Type"] = content_type
+        return Response(headers=headers)
+    # FileResponse handles Range / If-Range and uses the ASGI pathsend extension (zero-copy) when the server offers it
+    return FileResponse(path, stat_result=stat_result, headers=headers, media_type=content_type)
+
+async def data_url_to_file(value):
+    """Store an inline ``data:`` URL as an upload and return its file URL"""
+    if not isinstance(value, str) or not value.startswith("data:"):
+        return value
+    parsed = parse_data_url(value)
+    if parsed is None:
+        return value
+    # Go by the bytes, not the claimed type: only media the upload endpoint would accept becomes a file
+    mime_type = sniff_mime(parsed[1][:SNIFF_BYTES])
+    if mime_type is None:
+        return value
+    return url_for(await media_store.save_bytes(parsed[1], extension_for(mime_type)))
+
+async def migrate_data_urls() -> dict:
+    """Rewrite base64 data URLs stored in documents to /api/uploads file references"""
+    migrated = {}
+    for collection, fields in MEDIA_FIELDS.items():
+        query = {"$or": [{field: {"$regex": "^data:"}} for field in fields]}
+        operations = []
+        async for doc in db[collection].find(query, {field: 1 for field in fields}):
+            update = {}
+            for field in fields:
+                value = doc.get(field)
+                if isinstance(value, list):
+                    new_value = [await data_url_to_file(item) for item in value]
+                else:
+                    new_value = await data_url_to_file(value)
+                if new_value != value:
+                    update[field] = new_value
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if operations:
+            await db[collection].bulk_write(operations, ordered=False)
+            await mark_changed(collection)
+            migrated[collection] = len(operations)
+    return migrated
+
+UPLOAD_CLEANUP_INTERVAL = 3600
+
+async def run_upload_cleanup():
+    """Remove temp and partial files left by abandoned uploads, hourly"""
+    while True:
+        try:
+            removed = await asyncio.to_thread(media_store.prune, UPLOAD_SESSION_TTL.total_seconds())
+            if removed:
+                logging.info(f"Sisa upload yang ditinggalkan dihapus: {removed} file")
+        except Exception as e:
+            logging.error(f"Error cleaning up uploads: {e}")
+        await asyncio.sleep(UPLOAD_CLEANUP_INTERVAL)
+
+async def run_upload_migration():
+    try:
+        migrated = await migrate_data_urls()
+        if migrated:
+            logging.info(f"Data URL dipindah ke file upload: {migrated}")
+    except Exception as e:
+        logging.error(f"Error migrating data URLs: {e}")
 
 # ==================== DASHBOARD STATS ====================
 
@@ -938,20 +1462,218 @@ async def get_dashboard_stats(user: dict = Depends(get_current_user)):
         "active_running_texts": running_texts_count,
     }
 
-# ==================== ZIS (Zakat, Infaq, Shodaqoh) ROUTES ====================
+# ==================== LEDGER PAGINATION ====================
 
-@api_router.get("/zis")
-async def get_zis_reports(month: Optional[int] = None, year: Optional[int] = None, type: Optional[str] = None):
-    """Get ZIS reports with optional filters"""
+# Kolom yang ditampilkan di tabel laporan (dan cukup untuk form edit)
+ZIS_LEDGER_FIELDS = ["id", "date", "type", "donor_name", "amount", "description"]
+EXPENDITURE_LEDGER_FIELDS = ["id", "date", "category", "amount", "description"]
+LEDGER_PAGE_SIZE = 100
+LEDGER_MAX_PAGE_SIZE = 500
+
+def encode_ledger_cursor(doc: dict) -> str:
+    return base64.urlsafe_b64encode(f"{doc['date']}|{doc['id']}".encode()).decode().rstrip("=")
+
+def decode_ledger_cursor(cursor: str) -> tuple:
+    try:
+        date, item_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|", 1)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor tidak valid")
+    return date, item_id
+
+def ledger_filters(month: Optional[int] = None, year: Optional[int] = None,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   min_amount: Optional[float] = None, max_amount: Optional[float] = None) -> dict:
+    """Mongo filter shared by the ZIS and expenditure ledgers (dates are YYYY-MM-DD strings)"""
     query = {}
     if month:
         query["month"] = month
     if year:
         query["year"] = year
+    date_range = {}
+    if start_date:
+        date_range["$gte"] = start_date
+    if end_date:
+        date_range["$lte"] = end_date
+    if date_range:
+        query["date"] = date_range
+    amount_range = {}
+    if min_amount is not None:
+        amount_range["$gte"] = min_amount
+    if max_amount is not None:
+        amount_range["$lte"] = max_amount
+    if amount_range:
+        query["amount"] = amount_range
+    return query
+
+async def ledger_page(collection: str, query: dict, fields: list, limit: int, after: Optional[str] = None):
+    """One page ordered by (date, id) descending; returns (items, cursor of the next page or None)"""
+    if after:
+        date, item_id = decode_ledger_cursor(after)
+        query = {"$and": [query, {"$or": [{"date": {"$lt": date}}, {"date": date, "id": {"$lt": item_id}}]}]}
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    # One extra row tells us whether another page exists without a count query
+    items = await db[collection].find(query, projection).sort([("date", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_ledger_cursor(items[-1])
+    return items, None
+
+# ==================== ZIS MONTHLY ROLLUPS ====================
+
+# Satu dokumen per (tahun, bulan, sumber, jenis) berisi total & jumlah transaksi,
+# diperbarui dengan $inc setiap kali laporan ZIS / pengeluaran ditulis.
+# source "zis": type = zakat/infaq/shodaqoh; source "expenditure": type = kategori
+ROLLUP_FIELDS = ["total", "count", "expenditure_total", "expenditure_count"]
+
+def rollup_entry(doc: dict, source: str):
+    """(rollup key, amounts) contributed by one zis_reports / expenditure_reports document"""
+    key = {
+        "year": doc["year"],
+        "month": doc["month"],
+        "source": source,
+        "type": doc["type"] if source == "zis" else doc["category"],
+    }
+    values = {"total": doc.get("amount") or 0, "count": 1}
+    if source == "zis":
+        expenditure = doc.get("expenditure_amount") or 0
+        values["expenditure_total"] = expenditure if expenditure > 0 else 0
+        values["expenditure_count"] = 1 if expenditure > 0 else 0
+    return key, values
+
+async def apply_rollup(doc: Optional[dict], source: str, sign: int):
+    if not doc:
+        return
+    key, values = rollup_entry(doc, source)
+    await db.zis_monthly_rollups.update_one(
+        key, {"$inc": {field: sign * value for field, value in values.items()}}, upsert=True
+    )
+
+async def move_rollup(before: Optional[dict], after: Optional[dict], source: str):
+    await apply_rollup(before, source, -1)
+    await apply_rollup(after, source, 1)
+
+async def get_rollups(source: str, year: int, month: Optional[int] = None) -> list:
+    query = {"year": year, "source": source}
+    if month:
+        query["month"] = month
+    # count 0 = every report in that bucket was deleted or moved away
+    query["count"] = {"$gt": 0}
+    return await db.zis_monthly_rollups.find(query, {"_id": 0}).to_list(500)
+
+def zis_summary_from(rollups: list, year: int, month: int) -> dict:
+    """/zis/summary payload from one month's ZIS rollups"""
+    summary = {
+        "month": month,
+        "year": year,
+        "zakat": {"total": 0, "count": 0},
+        "infaq": {"total": 0, "count": 0},
+        "shodaqoh": {"total": 0, "count": 0}
+    }
+    for r in rollups:
+        if r["type"] in summary:
+            summary[r["type"]] = {"total": r["total"], "count": r["count"]}
+    summary["grand_total"] = summary["zakat"]["total"] + summary["infaq"]["total"] + summary["shodaqoh"]["total"]
+    # Total pengeluaran yang dicatat pada laporan ZIS
+    summary["total_pengeluaran"] = sum(r.get("expenditure_total", 0) for r in rollups)
+    summary["pengeluaran_count"] = sum(r.get("expenditure_count", 0) for r in rollups)
+    return summary
+
+def zis_chart_from(rollups: list) -> list:
+    """/zis/monthly-chart payload (12 months) from one year's ZIS rollups"""
+    month_names = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
+    chart_data = [{"month": name, "zakat": 0, "infaq": 0, "shodaqoh": 0} for name in month_names]
+    for r in rollups:
+        chart_data[r["month"] - 1][r["type"]] = r["total"]
+    return chart_data
+
+def expenditure_summary_from(rollups: list, year: int, month: int) -> dict:
+    categories = {r["type"]: {"total": r["total"], "count": r["count"]} for r in rollups}
+    return {
+        "month": month,
+        "year": year,
+        "categories": categories,
+        "grand_total": sum(v["total"] for v in categories.values())
+    }
+
+async def rebuild_zis_rollups() -> dict:
+    """Recompute every rollup from the report collections and repair any drift"""
+    expenditure_amount = {"$cond": [{"$gt": ["$expenditure_amount", 0]}, "$expenditure_amount", 0]}
+    zis_pipeline = [{"$group": {
+        "_id": {"year": "$year", "month": "$month", "type": "$type"},
+        "total": {"$sum": "$amount"},
+        "count": {"$sum": 1},
+        "expenditure_total": {"$sum": expenditure_amount},
+        "expenditure_count": {"$sum": {"$cond": [{"$gt": ["$expenditure_amount", 0]}, 1, 0]}},
+    }}]
+    expenditure_pipeline = [{"$group": {
+        "_id": {"year": "$year", "month": "$month", "type": "$category"},
+        "total": {"$sum": "$amount"},
+        "count": {"$sum": 1},
+    }}]
+
+    expected = {}
+    for source, collection, pipeline in [("zis", db.zis_reports, zis_pipeline),
+                                         ("expenditure", db.expenditure_reports, expenditure_pipeline)]:
+        async for row in collection.aggregate(pipeline):
+            key = (row["_id"]["year"], row["_id"]["month"], source, row["_id"]["type"])
+            expected[key] = {field: row.get(field, 0) for field in ROLLUP_FIELDS}
+
+    operations = []
+    seen = set()
+    corrected = 0
+    async for doc in db.zis_monthly_rollups.find({}):
+        key = (doc["year"], doc["month"], doc["source"], doc["type"])
+        seen.add(key)
+        values = expected.get(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        if any(abs((doc.get(field) or 0) - values[field]) > 1e-6 for field in ROLLUP_FIELDS):
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": values}))
+            corrected += 1
+    for key, values in expected.items():
+        if key not in seen:
+            year, month, source, type_ = key
+            operations.append(UpdateOne({"year": year, "month": month, "source": source, "type": type_},
+                                        {"$set": values}, upsert=True))
+            corrected += 1
+    if operations:
+        await db.zis_monthly_rollups.bulk_write(operations, ordered=False)
+    return {"buckets": len(expected), "corrected": corrected}
+
+async def ensure_zis_rollups():
+    """Build the rollups once on the first start after upgrading"""
+    try:
+        if await db.zis_monthly_rollups.estimated_document_count() == 0:
+            result = await rebuild_zis_rollups()
+            logging.info(f"Rollup ZIS dibangun: {result}")
+    except Exception as e:
+        logging.error(f"Error building ZIS rollups: {e}")
+
+@api_router.post("/zis/rollups/rebuild")
+async def rebuild_zis_rollups_endpoint(user: dict = Depends(require_admin)):
+    """Reconcile zis_monthly_rollups with the report collections"""
+    result = await rebuild_zis_rollups()
+    if result["corrected"]:
+        for collection in FINANCE_COLLECTIONS:
+            await mark_changed(collection)
+    return result
+
+# ==================== ZIS (Zakat, Infaq, Shodaqoh) ROUTES ====================
+
+@api_router.get("/zis")
+async def get_zis_reports(response: Response, month: Optional[int] = None, year: Optional[int] = None,
+                          type: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                          donor: Optional[str] = None, min_amount: Optional[float] = None,
+                          max_amount: Optional[float] = None, after: Optional[str] = None,
+                          limit: int = Query(LEDGER_PAGE_SIZE, ge=1, le=LEDGER_MAX_PAGE_SIZE)):
+    """Get ZIS reports with optional filters, newest first; next page cursor in X-Next-Cursor"""
+    query = ledger_filters(month, year, start_date, end_date, min_amount, max_amount)
     if type:
         query["type"] = type
+    if donor:
+        query["donor_name"] = {"$regex": re.escape(donor), "$options": "i"}
     
-    reports = await db.zis_reports.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
+    reports, next_cursor = await ledger_page("zis_reports", query, ZIS_LEDGER_FIELDS, limit, after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reports
 
 @api_router.get("/zis/summary")
@@ -961,73 +1683,14 @@ async def get_zis_summary(month: Optional[int] = None, year: Optional[int] = Non
     target_month = month or now.month
     target_year = year or now.year
     
-    pipeline = [
-        {"$match": {"month": target_month, "year": target_year}},
-        {"$group": {
-            "_id": "$type",
-            "total": {"$sum": "$amount"},
-            "count": {"$sum": 1}
-        }}
-    ]
-    
-    results = await db.zis_reports.aggregate(pipeline).to_list(10)
-    summary = {
-        "month": target_month,
-        "year": target_year,
-        "zakat": {"total": 0, "count": 0},
-        "infaq": {"total": 0, "count": 0},
-        "shodaqoh": {"total": 0, "count": 0}
-    }
-    
-    for r in results:
-        if r["_id"] in summary:
-            summary[r["_id"]] = {"total": r["total"], "count": r["count"]}
-    
-    summary["grand_total"] = summary["zakat"]["total"] + summary["infaq"]["total"] + summary["shodaqoh"]["total"]
-    
-    # Calculate total pengeluaran
-    exp_pipeline = [
-        {"$match": {"month": target_month, "year": target_year, "expenditure_amount": {"$exists": True, "$gt": 0}}},
-        {"$group": {
-            "_id": None,
-            "total": {"$sum": "$expenditure_amount"},
-            "count": {"$sum": 1}
-        }}
-    ]
-    exp_results = await db.zis_reports.aggregate(exp_pipeline).to_list(1)
-    summary["total_pengeluaran"] = exp_results[0]["total"] if exp_results else 0
-    summary["pengeluaran_count"] = exp_results[0]["count"] if exp_results else 0
-    
-    return summary
+    return zis_summary_from(await get_rollups("zis", target_year, target_month), target_year, target_month)
 
 @api_router.get("/zis/monthly-chart")
 async def get_zis_monthly_chart(year: Optional[int] = None):
     """Get ZIS data for chart (last 12 months or specific year)"""
     target_year = year or datetime.now(timezone.utc).year
     
-    pipeline = [
-        {"$match": {"year": target_year}},
-        {"$group": {
-            "_id": {"month": "$month", "type": "$type"},
-            "total": {"$sum": "$amount"}
-        }},
-        {"$sort": {"_id.month": 1}}
-    ]
-    
-    results = await db.zis_reports.aggregate(pipeline).to_list(100)
-    
-    # Initialize chart data
-    chart_data = []
-    month_names = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
-    
-    for i in range(1, 13):
-        month_data = {"month": month_names[i-1], "zakat": 0, "infaq": 0, "shodaqoh": 0}
-        for r in results:
-            if r["_id"]["month"] == i:
-                month_data[r["_id"]["type"]] = r["total"]
-        chart_data.append(month_data)
-    
-    return chart_data
+    return zis_chart_from(await get_rollups("zis", target_year))
 
 @api_router.post("/zis")
 async def create_zis_report(data: ZISReportCreate, user: dict = Depends(get_current_user)):
@@ -1047,6 +1710,8 @@ async def create_zis_report(data: ZISReportCreate, user: dict = Depends(get_curr
     doc = report.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.zis_reports.insert_one(doc)
+    await apply_rollup(doc, "zis", 1)
+    await mark_changed("zis_reports")
     return report
 
 @api_router.put("/zis/{report_id}")
@@ -1060,19 +1725,25 @@ async def update_zis_report(report_id: str, data: ZISReportUpdate, user: dict =
         update_data["month"] = date_obj.month
         update_data["year"] = date_obj.year
     
-    result = await db.zis_reports.update_one({"id": report_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.zis_reports.find_one_and_update(
+        {"id": report_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    updated = await db.zis_reports.find_one({"id": report_id}, {"_id": 0})
+    updated = {**before, **update_data}
+    await move_rollup(before, updated, "zis")
+    await mark_changed("zis_reports")
     return updated
 
 @api_router.delete("/zis/{report_id}")
 async def delete_zis_report(report_id: str, user: dict = Depends(get_current_user)):
     """Delete ZIS report"""
-    result = await db.zis_reports.delete_one({"id": report_id})
-    if result.deleted_count == 0:
+    deleted = await db.zis_reports.find_one_and_delete({"id": report_id}, projection={"_id": 0})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Report not found")
+    await apply_rollup(deleted, "zis", -1)
+    await mark_changed("zis_reports")
     return {"message": "Report deleted"}
 
 # ==================== EXPENDITURE (PENGELUARAN DANA) ROUTES ====================
@@ -1101,14 +1772,18 @@ class ExpenditureUpdate(BaseModel):
     date: Optional[str] = None
 
 @api_router.get("/expenditure")
-async def get_expenditures(month: Optional[int] = None, year: Optional[int] = None):
-    """Get expenditure reports with optional filters"""
-    query = {}
-    if month:
-        query["month"] = month
-    if year:
-        query["year"] = year
-    reports = await db.expenditure_reports.find(query, {"_id": 0}).sort("date", -1).to_list(1000)
+async def get_expenditures(response: Response, month: Optional[int] = None, year: Optional[int] = None,
+                           category: Optional[str] = None, start_date: Optional[str] = None,
+                           end_date: Optional[str] = None, min_amount: Optional[float] = None,
+                           max_amount: Optional[float] = None, after: Optional[str] = None,
+                           limit: int = Query(LEDGER_PAGE_SIZE, ge=1, le=LEDGER_MAX_PAGE_SIZE)):
+    """Get expenditure reports with optional filters, newest first; next page cursor in X-Next-Cursor"""
+    query = ledger_filters(month, year, start_date, end_date, min_amount, max_amount)
+    if category:
+        query["category"] = category
+    reports, next_cursor = await ledger_page("expenditure_reports", query, EXPENDITURE_LEDGER_FIELDS, limit, after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reports
 
 @api_router.get("/expenditure/summary")
@@ -1117,26 +1792,7 @@ async def get_expenditure_summary(month: Optional[int] = None, year: Optional[in
     now = datetime.now(timezone.utc)
     target_month = month or now.month
     target_year = year or now.year
-
-    pipeline = [
-        {"$match": {"month": target_month, "year": target_year}},
-        {"$group": {
-            "_id": "$category",
-            "total": {"$sum": "$amount"},
-            "count": {"$sum": 1}
-        }}
-    ]
-    results = await db.expenditure_reports.aggregate(pipeline).to_list(20)
-    categories = {}
-    for r in results:
-        categories[r["_id"]] = {"total": r["total"], "count": r["count"]}
-    grand_total = sum(v["total"] for v in categories.values())
-    return {
-        "month": target_month,
-        "year": target_year,
-        "categories": categories,
-        "grand_total": grand_total
-    }
+    return expenditure_summary_from(await get_rollups("expenditure", target_year, target_month), target_year, target_month)
 
 @api_router.post("/expenditure")
 async def create_expenditure(data: ExpenditureCreate, user: dict = Depends(get_current_user)):
@@ -1153,6 +1809,8 @@ async def create_expenditure(data: ExpenditureCreate, user: dict = Depends(get_c
     doc = report.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.expenditure_reports.insert_one(doc)
+    await apply_rollup(doc, "expenditure", 1)
+    await mark_changed("expenditure_reports")
     return report
 
 @api_router.put("/expenditure/{report_id}")
@@ -1163,20 +1821,131 @@ async def update_expenditure(report_id: str, data: ExpenditureUpdate, user: dict
         date_obj = datetime.strptime(update_data["date"], "%Y-%m-%d")
         update_data["month"] = date_obj.month
         update_data["year"] = date_obj.year
-    result = await db.expenditure_reports.update_one({"id": report_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    before = await db.expenditure_reports.find_one_and_update(
+        {"id": report_id}, {"$set": update_data}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
         raise HTTPException(status_code=404, detail="Expenditure not found")
-    updated = await db.expenditure_reports.find_one({"id": report_id}, {"_id": 0})
+    updated = {**before, **update_data}
+    await move_rollup(before, updated, "expenditure")
+    await mark_changed("expenditure_reports")
     return updated
 
 @api_router.delete("/expenditure/{report_id}")
 async def delete_expenditure(report_id: str, user: dict = Depends(get_current_user)):
     """Delete expenditure record"""
-    result = await db.expenditure_reports.delete_one({"id": report_id})
-    if result.deleted_count == 0:
+    deleted = await db.expenditure_reports.find_one_and_delete({"id": report_id}, projection={"_id": 0})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Expenditure not found")
+    await apply_rollup(deleted, "expenditure", -1)
+    await mark_changed("expenditure_reports")
     return {"message": "Expenditure deleted"}
 
+# ==================== LEDGER EXPORT ====================
+
+EXPORT_FORMATS = {"csv", "xlsx"}
+
+async def export_ledger(collection: str, query: dict, columns: list, fmt: str, basename: str, sheet_name: str):
+    """Stream the ledger as CSV, or build an XLSX file row by row; oldest first like a printed ledger"""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format harus csv atau xlsx")
+    projection = {"_id": 0, **{field: 1 for field, _ in columns}}
+    cursor = db[collection].find(query, projection).sort([("date", 1), ("id", 1)]).batch_size(1000)
+    filename = f"{basename}.{fmt}"
+    if fmt == "csv":
+        return StreamingResponse(
+            csv_chunks(cursor, columns), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    path = await write_xlsx(cursor, columns, sheet_name)
+    return FileResponse(
+        path, filename=filename, background=BackgroundTask(os.unlink, path),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+def export_basename(prefix: str, month: Optional[int], year: Optional[int]) -> str:
+    if year and month:
+        return f"{prefix}-{year}-{month:02d}"
+    return f"{prefix}-{year}" if year else f"{prefix}-semua"
+
+@api_router.get("/zis/export")
+async def export_zis_reports(format: str = "csv", month: Optional[int] = None, year: Optional[int] = None,
+                             type: Optional[str] = None, start_date: Optional[str] = None,
+                             end_date: Optional[str] = None, donor: Optional[str] = None,
+                             min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                             user: dict = Depends(get_current_user)):
+    """Download ZIS reports as CSV or XLSX (same filters as GET /zis)"""
+    query = ledger_filters(month, year, start_date, end_date, min_amount, max_amount)
+    if type:
+        query["type"] = type
+    if donor:
+        query["donor_name"] = {"$regex": re.escape(donor), "$options": "i"}
+    return await export_ledger("zis_reports", query, ZIS_EXPORT_COLUMNS, format,
+                               export_basename("zis", month, year), "ZIS")
+
+@api_router.get("/expenditure/export")
+async def export_expenditures(format: str = "csv", month: Optional[int] = None, year: Optional[int] = None,
+                              category: Optional[str] = None, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None, min_amount: Optional[float] = None,
+                              max_amount: Optional[float] = None, user: dict = Depends(get_current_user)):
+    """Download expenditure reports as CSV or XLSX (same filters as GET /expenditure)"""
+    query = ledger_filters(month, year, start_date, end_date, min_amount, max_amount)
+    if category:
+        query["category"] = category
+    return await export_ledger("expenditure_reports", query, EXPENDITURE_EXPORT_COLUMNS, format,
+                               export_basename("pengeluaran", month, year), "Pengeluaran")
+
+# ==================== FINANCE DASHBOARD ====================
+
+FINANCE_COLLECTIONS = {"zis_reports", "expenditure_reports"}
+# Dibuang pada setiap penulisan ZIS/pengeluaran; TTL hanya jaring pengaman
+FINANCE_CACHE_TTL = float(os.environ.get('FINANCE_CACHE_TTL', '3600'))
+finance_cache = TTLCache(maxsize=32, ttl=FINANCE_CACHE_TTL)
+
+async def build_finance_dashboard(year: int, month: int) -> dict:
+    rollup_pipeline = [
+        {"$match": {"year": year, "count": {"$gt": 0}}},
+        {"$project": {"_id": 0}},
+        {"$facet": {
+            "zis_year": [{"$match": {"source": "zis"}}],
+            "expenditure_month": [{"$match": {"source": "expenditure", "month": month}}],
+        }},
+    ]
+    period = {"year": year, "month": month}
+    rollups, (zis_reports, zis_cursor), (expenditure_reports, expenditure_cursor) = await asyncio.gather(
+        db.zis_monthly_rollups.aggregate(rollup_pipeline).to_list(1),
+        ledger_page("zis_reports", period, ZIS_LEDGER_FIELDS, LEDGER_PAGE_SIZE),
+        ledger_page("expenditure_reports", period, EXPENDITURE_LEDGER_FIELDS, LEDGER_PAGE_SIZE),
+    )
+    facets = rollups[0]
+    zis_month = [r for r in facets["zis_year"] if r["month"] == month]
+    return {
+        "year": year,
+        "month": month,
+        "zis": {
+            "reports": zis_reports,
+            "next_cursor": zis_cursor,
+            "summary": zis_summary_from(zis_month, year, month),
+            "chart": zis_chart_from(facets["zis_year"]),
+        },
+        "expenditure": {
+            "reports": expenditure_reports,
+            "next_cursor": expenditure_cursor,
+            "summary": expenditure_summary_from(facets["expenditure_month"], year, month),
+        },
+    }
+
+@api_router.get("/finance/dashboard")
+async def get_finance_dashboard(month: Optional[int] = None, year: Optional[int] = None,
+                                user: dict = Depends(get_current_user)):
+    """ZIS and expenditure reports, summaries and the yearly chart in one response"""
+    now = datetime.now(timezone.utc)
+    target_month = month or now.month
+    target_year = year or now.year
+    return await finance_cache.get_or_load(
+        (target_year, target_month), lambda: build_finance_dashboard(target_year, target_month)
+    )
+
 # ==================== GOOGLE SHEETS SYNC ROUTES ====================
 
 class SheetsConfig(BaseModel):
@@ -1191,7 +1960,8 @@ async def get_sheets_config(user: dict = Depends(get_current_user)):
         return {"spreadsheet_id": None, "has_credentials": False}
     return {
         "spreadsheet_id": config.get("spreadsheet_id"),
-        "has_credentials": bool(config.get("service_account_json"))
+        "has_credentials": bool(config.get("service_account_json")),
+        "last_sync": config.get("last_sync"),
     }
 
 @api_router.post("/zis/sheets-config")
@@ -1205,91 +1975,209 @@ async def save_sheets_config(data: SheetsConfig, user: dict = Depends(get_curren
     await db.settings.update_one({"key": "sheets_config"}, {"$set": update}, upsert=True)
     return {"message": "Konfigurasi Google Sheets disimpan"}
 
-@api_router.post("/zis/sync-to-sheets")
-async def sync_to_sheets(user: dict = Depends(get_current_user)):
-    """Sync ZIS and Expenditure data to Google Sheets"""
-    try:
-        import gspread
-        from google.oauth2.service_account import Credentials
-        import json as json_lib
-
-        config = await db.settings.find_one({"key": "sheets_config"}, {"_id": 0})
-        if not config or not config.get("spreadsheet_id") or not config.get("service_account_json"):
-            raise HTTPException(status_code=400, detail="Konfigurasi Google Sheets belum diatur. Masukkan Spreadsheet ID dan Service Account terlebih dahulu.")
-
-        scopes = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        sa_info = json_lib.loads(config["service_account_json"])
-        creds = Credentials.from_service_account_info(sa_info, scopes=scopes)
-        gc = gspread.authorize(creds)
-        spreadsheet = gc.open_by_key(config["spreadsheet_id"])
-
-        now = datetime.now(timezone.utc)
-
-        # ---- Sheet 1: Pemasukan ZIS ----
-        try:
-            ws_zis = spreadsheet.worksheet("Pemasukan ZIS")
-            ws_zis.clear()
-        except gspread.exceptions.WorksheetNotFound:
-            ws_zis = spreadsheet.add_worksheet(title="Pemasukan ZIS", rows=500, cols=10)
-
-        zis_reports = await db.zis_reports.find({}, {"_id": 0}).sort("date", -1).to_list(1000)
-        zis_rows = [["Tanggal", "Jenis", "Donatur", "Jumlah (Rp)", "Keterangan"]]
-        for r in zis_reports:
-            zis_rows.append([
-                r.get("date", ""),
-                r.get("type", "").capitalize(),
-                r.get("donor_name") or "Anonim",
-                r.get("amount", 0),
-                r.get("description") or ""
-            ])
-        ws_zis.update(zis_rows, "A1")
-
-        # ---- Sheet 2: Pengeluaran Dana ----
+# Sinkronisasi berjalan sebagai job di background: gspread blocking dijalankan di thread pool
+# sendiri, status dan progres job disimpan di MongoDB (bisa dibaca dari replica mana pun)
+SHEETS_WORKERS = int(os.environ.get('SHEETS_WORKERS', '1'))
+SHEETS_BATCH_ROWS = 500
+SHEETS_JOB_TTL = timedelta(days=7)
+# Replica yang menjalankan job memegang lease: owner + updated_at yang diperbarui tiap heartbeat.
+# Job aktif tanpa kabar selama SHEETS_JOB_STALE dianggap mati (mis. replica di-restart di tengah job)
+SHEETS_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+SHEETS_JOB_HEARTBEAT = timedelta(seconds=30)
+SHEETS_JOB_STALE = timedelta(minutes=2)
+ACTIVE_JOB_STATUSES = ["queued", "running"]
+_sheets_pool: Optional[ThreadPoolExecutor] = None
+sheets_queue: asyncio.Queue = asyncio.Queue()
+
+def get_sheets_pool() -> ThreadPoolExecutor:
+    global _sheets_pool
+    if _sheets_pool is None:
+        _sheets_pool = ThreadPoolExecutor(max_workers=SHEETS_WORKERS, thread_name_prefix="sheets")
+    return _sheets_pool
+
+async def in_sheets_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_sheets_pool(), fn, *args)
+
+class SheetsLeaseLost(Exception):
+    """The job was failed as stale and may already be rerun elsewhere: stop touching the sheet"""
+
+async def update_sheets_job(job_id: str, **fields) -> bool:
+    """Update a job and renew its lease; False once this replica no longer holds it"""
+    result = await db.sheets_sync_jobs.update_one(
+        {"id": job_id, "status": "running", "owner": SHEETS_WORKER_ID},
+        {"$set": {**fields, "updated_at": datetime.now(timezone.utc).isoformat()}},
+    )
+    return result.matched_count == 1
+
+async def renew_sheets_lease(job_id: str, **fields):
+    if not await update_sheets_job(job_id, **fields):
+        raise SheetsLeaseLost(job_id)
+
+async def heartbeat_sheets_job(job_id: str):
+    """Keep the lease alive while a single long batch is in the thread pool"""
+    while True:
+        await asyncio.sleep(SHEETS_JOB_HEARTBEAT.total_seconds())
         try:
-            ws_exp = spreadsheet.worksheet("Pengeluaran Dana")
-            ws_exp.clear()
-        except gspread.exceptions.WorksheetNotFound:
-            ws_exp = spreadsheet.add_worksheet(title="Pengeluaran Dana", rows=500, cols=10)
-
-        exp_reports = await db.expenditure_reports.find({}, {"_id": 0}).sort("date", -1).to_list(1000)
-        exp_rows = [["Tanggal", "Kategori", "Jumlah (Rp)", "Keterangan"]]
-        for r in exp_reports:
-            exp_rows.append([
-                r.get("date", ""),
-                r.get("category", "").capitalize(),
-                r.get("amount", 0),
-                r.get("description") or ""
-            ])
-        ws_exp.update(exp_rows, "A1")
-
-        # Save sync timestamp
+            if not await update_sheets_job(job_id):
+                return
+        except PyMongoError as e:
+            logging.warning(f"Heartbeat job Google Sheets {job_id} gagal: {e}")
+
+async def fail_stale_sheets_jobs():
+    now = datetime.now(timezone.utc)
+    cutoff = (now - SHEETS_JOB_STALE).isoformat()
+    await db.sheets_sync_jobs.update_many(
+        {"status": {"$in": ACTIVE_JOB_STATUSES}, "updated_at": {"$lt": cutoff}},
+        {"$set": {"status": "failed", "finished_at": now.isoformat(),
+                  "error": "Job terhenti sebelum selesai, silakan ulangi"}},
+    )
+
+async def sync_sheet(job_id: str, spreadsheet, key: str, full: bool) -> dict:
+    """Push the rows of one ledger that differ from their last synced fingerprint"""
+    title, collection, columns = SHEETS[key]
+    width = len(columns)
+    await renew_sheets_lease(job_id)
+    worksheet, created = await in_sheets_pool(prepare_worksheet, spreadsheet, title, [h for _, h in columns], full)
+    full = full or created
+    if full:
+        await db.sheets_sync_rows.delete_many({"sheet": key})
+
+    projection = {"_id": 0, "id": 1, **{f: 1 for f, _ in columns}}
+    rows = {}
+    async for doc in db[collection].find({}, projection).sort([("date", 1), ("id", 1)]):
+        rows[doc["id"]] = [cell_value(doc, f) for f, _ in columns]
+    state = {}
+    async for doc in db.sheets_sync_rows.find({"sheet": key}, {"_id": 0}):
+        state[doc["record_id"]] = (doc["row"], doc["hash"])
+
+    plan = plan_sync(rows, state, width)
+    total = len(plan.updates)
+    for i in range(0, total, SHEETS_BATCH_ROWS):
+        await renew_sheets_lease(job_id, progress={"sheet": key, "done": i, "total": total})
+        await in_sheets_pool(write_rows, worksheet, plan.updates[i:i + SHEETS_BATCH_ROWS], width, plan.row_count)
+
+    # Watermarks are only advanced once the sheet holds the new values, and only by the lease holder
+    await renew_sheets_lease(job_id, progress={"sheet": key, "done": total, "total": total})
+    ops = [
+        UpdateOne({"sheet": key, "record_id": record_id}, {"$set": {"row": row, "hash": digest}}, upsert=True)
+        for record_id, (row, digest) in plan.changed.items()
+    ]
+    if plan.removed:
+        ops.append(DeleteMany({"sheet": key, "record_id": {"$in": plan.removed}}))
+    if ops:
+        await db.sheets_sync_rows.bulk_write(ops, ordered=False)
+    return {"rows": plan.total, "changed": len(plan.changed), "removed": len(plan.removed)}
+
+async def run_sheets_job(job_id: str):
+    now = datetime.now(timezone.utc).isoformat()
+    job = await db.sheets_sync_jobs.find_one_and_update(
+        {"id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "owner": SHEETS_WORKER_ID, "started_at": now, "updated_at": now}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+    )
+    if job is None:
+        return
+    heartbeat = asyncio.create_task(heartbeat_sheets_job(job_id))
+    try:
+        config = await db.settings.find_one({"key": "sheets_config"}, {"_id": 0}) or {}
+        if not config.get("spreadsheet_id") or not config.get("service_account_json"):
+            raise ValueError("Konfigurasi Google Sheets belum diatur")
+        spreadsheet = await in_sheets_pool(open_spreadsheet, config["service_account_json"], config["spreadsheet_id"])
+        # Row watermarks belong to one spreadsheet; a new ID starts from empty sheets
+        full = job["full"] or config.get("synced_spreadsheet_id") != config["spreadsheet_id"]
+        sheets = {key: await sync_sheet(job_id, spreadsheet, key, full) for key in SHEETS}
+        synced_at = datetime.now(timezone.utc).isoformat()
+        await renew_sheets_lease(job_id)
         await db.settings.update_one(
             {"key": "sheets_config"},
-            {"$set": {"last_sync": now.isoformat()}},
-            upsert=True
+            {"$set": {"last_sync": synced_at, "synced_spreadsheet_id": config["spreadsheet_id"]}},
         )
+        await update_sheets_job(job_id, status="done", finished_at=synced_at, result={
+            "zis_rows": sheets["zis"]["rows"],
+            "expenditure_rows": sheets["expenditure"]["rows"],
+            "sheets": sheets,
+            "synced_at": synced_at,
+        })
+    except SheetsLeaseLost:
+        logging.warning(f"Job Google Sheets {job_id} dihentikan: lease sudah kedaluwarsa")
+    except Exception as e:
+        logging.error(f"Sinkronisasi Google Sheets gagal: {e}")
+        await update_sheets_job(job_id, status="failed", finished_at=datetime.now(timezone.utc).isoformat(),
+                                error=sheets_error_message(e))
+    finally:
+        heartbeat.cancel()
+
+async def recover_sheets_jobs():
+    """At startup: fail jobs whose lease expired (their replica died), queue the waiting ones again
+
+    Jobs still running on a live replica keep their heartbeat fresh and are left alone. A queued
+    job may land in several queues; the atomic queued -> running claim runs it once.
+    """
+    await fail_stale_sheets_jobs()
+    async for job in db.sheets_sync_jobs.find({"status": "queued"}, {"_id": 0, "id": 1}).sort("created_at", 1):
+        await sheets_queue.put(job["id"])
+
+async def run_sheets_worker():
+    """Run queued sync jobs one at a time"""
+    await recover_sheets_jobs()
+    while True:
+        job_id = await sheets_queue.get()
+        try:
+            await run_sheets_job(job_id)
+        except Exception as e:
+            logging.error(f"Job Google Sheets {job_id} error: {e}")
 
-        return {
-            "message": "Sinkronisasi berhasil!",
-            "zis_rows": len(zis_rows) - 1,
-            "expenditure_rows": len(exp_rows) - 1,
-            "synced_at": now.isoformat()
-        }
-
-    except ImportError:
+@api_router.post("/zis/sync-to-sheets", status_code=status.HTTP_202_ACCEPTED)
+async def sync_to_sheets(full: bool = False, user: dict = Depends(get_current_user)):
+    """Queue a ZIS and Expenditure sync to Google Sheets (only changed rows unless full=true)"""
+    config = await db.settings.find_one({"key": "sheets_config"}, {"_id": 0})
+    if not config or not config.get("spreadsheet_id") or not config.get("service_account_json"):
+        raise HTTPException(status_code=400, detail="Konfigurasi Google Sheets belum diatur. Masukkan Spreadsheet ID dan Service Account terlebih dahulu.")
+    if importlib.util.find_spec("gspread") is None:
         raise HTTPException(status_code=500, detail="Library gspread belum terinstall. Hubungi administrator.")
-    except gspread.exceptions.SpreadsheetNotFound:
-        raise HTTPException(status_code=400, detail="Spreadsheet tidak ditemukan. Pastikan ID benar dan sudah di-share ke Service Account.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gagal sinkronisasi: {str(e)}")
+
+    await fail_stale_sheets_jobs()
+    # A sync already waiting or running will pick up every change made so far
+    active = await db.sheets_sync_jobs.find_one({"status": {"$in": ACTIVE_JOB_STATUSES}}, {"_id": 0})
+    if active:
+        return active
+    now = datetime.now(timezone.utc)
+    job = {
+        "id": str(uuid.uuid4()),
+        "status": "queued",
+        "full": full,
+        "requested_by": user.get("username"),
+        "progress": None,
+        "result": None,
+        "error": None,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat(),
+        "expires_at": now + SHEETS_JOB_TTL,
+    }
+    await db.sheets_sync_jobs.insert_one(job)
+    await sheets_queue.put(job["id"])
+    job.pop("_id", None)
+    job["expires_at"] = job["expires_at"].isoformat()
+    return job
+
+@api_router.get("/zis/sync-jobs")
+async def get_sheets_jobs(user: dict = Depends(get_current_user)):
+    """Most recent Google Sheets sync jobs"""
+    await fail_stale_sheets_jobs()
+    return await db.sheets_sync_jobs.find({}, {"_id": 0, "expires_at": 0}).sort("created_at", -1).to_list(10)
+
+@api_router.get("/zis/sync-jobs/{job_id}")
+async def get_sheets_job(job_id: str, user: dict = Depends(get_current_user)):
+    """Status and progress of one Google Sheets sync job"""
+    await fail_stale_sheets_jobs()
+    job = await db.sheets_sync_jobs.find_one({"id": job_id}, {"_id": 0, "expires_at": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job sinkronisasi tidak ditemukan")
+    return job
 
 # ==================== ANNOUNCEMENT ROUTES ====================
 
-@api_router.get("/announcements")
+@api_router.get("/announcements", dependencies=[conditional_get("announcements")])
 async def get_announcements(active_only: bool = False):
     """Get all announcements"""
     query = {"is_active": True} if active_only else {}
@@ -1303,6 +2191,7 @@ async def create_announcement(data: AnnouncementCreate, user: dict = Depends(get
     doc = item.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.announcements.insert_one(doc)
+    await mark_changed("announcements")
     return item
 
 @api_router.put("/announcements/{item_id}")
@@ -1313,6 +2202,7 @@ async def update_announcement(item_id: str, data: AnnouncementUpdate, user: dict
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
     updated = await db.announcements.find_one({"id": item_id}, {"_id": 0})
+    await mark_changed("announcements")
     return updated
 
 @api_router.delete("/announcements/{item_id}")
@@ -1321,16 +2211,17 @@ async def delete_announcement(item_id: str, user: dict = Depends(get_current_use
     result = await db.announcements.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
+    await mark_changed("announcements")
     return {"message": "Announcement deleted"}
 
 # ==================== PENGURUS ROUTES ====================
 
-@api_router.get("/pengurus")
+@api_router.get("/pengurus", dependencies=[conditional_get("pengurus")])
 async def get_pengurus(active_only: bool = False):
     """Get all pengurus"""
     query = {"is_active": True} if active_only else {}
     items = await db.pengurus.find(query, {"_id": 0}).sort("order", 1).to_list(100)
-    return items
+    return with_variants(items, "photo_url")
 
 @api_router.post("/pengurus")
 async def create_pengurus(data: PengurusCreate, user: dict = Depends(get_current_user)):
@@ -1342,6 +2233,7 @@ async def create_pengurus(data: PengurusCreate, user: dict = Depends(get_current
     doc = item.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.pengurus.insert_one(doc)
+    await mark_changed("pengurus")
     return item
 
 @api_router.put("/pengurus/{item_id}")
@@ -1355,6 +2247,7 @@ async def update_pengurus(item_id: str, data: PengurusUpdate, user: dict = Depen
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Pengurus not found")
     updated = await db.pengurus.find_one({"id": item_id}, {"_id": 0})
+    await mark_changed("pengurus")
     return updated
 
 @api_router.delete("/pengurus/{item_id}")
@@ -1366,11 +2259,12 @@ async def delete_pengurus(item_id: str, user: dict = Depends(get_current_user)):
     result = await db.pengurus.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Pengurus not found")
+    await mark_changed("pengurus")
     return {"message": "Pengurus deleted"}
 
 # ==================== SPECIAL EVENT ROUTES ====================
 
-@api_router.get("/special-events")
+@api_router.get("/special-events", dependencies=[conditional_get("special_events", daily=True)])
 async def get_special_events(active_only: bool = False, upcoming_only: bool = False):
     """Get all special events"""
     query = {}
@@ -1390,6 +2284,7 @@ async def create_special_event(data: SpecialEventCreate, user: dict = Depends(ge
     doc = item.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.special_events.insert_one(doc)
+    await mark_changed("special_events")
     return item
 
 @api_router.put("/special-events/{item_id}")
@@ -1400,6 +2295,7 @@ async def update_special_event(item_id: str, data: SpecialEventUpdate, user: dic
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
     updated = await db.special_events.find_one({"id": item_id}, {"_id": 0})
+    await mark_changed("special_events")
     return updated
 
 @api_router.delete("/special-events/{item_id}")
@@ -1408,11 +2304,12 @@ async def delete_special_event(item_id: str, user: dict = Depends(get_current_us
     result = await db.special_events.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await mark_changed("special_events")
     return {"message": "Event deleted"}
 
 # ==================== GALLERY ROUTES ====================
 
-@api_router.get("/gallery")
+@api_router.get("/gallery", dependencies=[conditional_get("gallery")])
 async def get_gallery(active_only: bool = False, category: Optional[str] = None):
     """Get all gallery items, optionally filtered by category"""
     query = {}
@@ -1421,7 +2318,7 @@ async def get_gallery(active_only: bool = False, category: Optional[str] = None)
     if category:
         query["category"] = category
     items = await db.gallery.find(query, {"_id": 0}).sort([("order", 1), ("created_at", -1)]).to_list(100)
-    return items
+    return with_variants(items, "image_url")
 
 @api_router.post("/gallery")
 async def create_gallery_item(data: GalleryItemCreate, user: dict = Depends(get_current_user)):
@@ -1430,6 +2327,7 @@ async def create_gallery_item(data: GalleryItemCreate, user: dict = Depends(get_
     doc = item.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.gallery.insert_one(doc)
+    await mark_changed("gallery")
     return item
 
 @api_router.put("/gallery/{item_id}")
@@ -1440,6 +2338,7 @@ async def update_gallery_item(item_id: str, data: GalleryItemUpdate, user: dict
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Gallery item not found")
     updated = await db.gallery.find_one({"id": item_id}, {"_id": 0})
+    await mark_changed("gallery")
     return updated
 
 @api_router.delete("/gallery/{item_id}")
@@ -1448,11 +2347,12 @@ async def delete_gallery_item(item_id: str, user: dict = Depends(get_current_use
     result = await db.gallery.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Gallery item not found")
+    await mark_changed("gallery")
     return {"message": "Gallery item deleted"}
 
 # ==================== ISLAMIC QUOTES ROUTES ====================
 
-@api_router.get("/quotes")
+@api_router.get("/quotes", dependencies=[conditional_get("quotes")])
 async def get_quotes(active_only: bool = False):
     """Get all Islamic quotes"""
     query = {"is_active": True} if active_only else {}
@@ -1480,6 +2380,7 @@ async def create_quote(data: IslamicQuoteCreate, user: dict = Depends(get_curren
     doc = item.model_dump()
     doc["created_at"] = doc["created_at"].isoformat()
     await db.quotes.insert_one(doc)
+    await mark_changed("quotes")
     return item
 
 @api_router.put("/quotes/{item_id}")
@@ -1490,6 +2391,7 @@ async def update_quote(item_id: str, data: IslamicQuoteUpdate, user: dict = Depe
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Quote not found")
     updated = await db.quotes.find_one({"id": item_id}, {"_id": 0})
+    await mark_changed("quotes")
     return updated
 
 @api_router.delete("/quotes/{item_id}")
@@ -1498,6 +2400,7 @@ async def delete_quote(item_id: str, user: dict = Depends(get_current_user)):
     result = await db.quotes.delete_one({"id": item_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Quote not found")
+    await mark_changed("quotes")
     return {"message": "Quote deleted"}
 
 # ==================== ARTICLE ROUTES ====================
@@ -1512,7 +2415,7 @@ async def get_articles(published_only: bool = False, category: Optional[str] = N
         query["category"] = category
     
     items = await db.articles.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return items
+    return with_variants(items, "image_url")
 
 @api_router.get("/articles/{article_id}")
 async def get_article(article_id: str):
@@ -1523,6 +2426,7 @@ async def get_article(article_id: str):
     # Increment views
     await db.articles.update_one({"id": article_id}, {"$inc": {"views": 1}})
     article["views"] = article.get("views", 0) + 1
+    article["image_variants"] = variant_urls(article.get("image_url"))
     return article
 
 @api_router.post("/articles")
@@ -1560,11 +2464,8 @@ async def delete_article(article_id: str, user: dict = Depends(get_current_user)
 @api_router.get("/qris-settings")
 async def get_qris_settings():
     """Get QRIS settings"""
-    settings = await db.qris_settings.find_one({}, {"_id": 0})
-    if not settings:
-        # Return default settings
-        return QRISSettings().model_dump()
-    return settings
+    # Defaults are returned (not stored) until an admin saves the settings
+    return await get_singleton("qris_settings", QRISSettings, insert_default=False)
 
 @api_router.put("/qris-settings")
 async def update_qris_settings(data: QRISSettings, user: dict = Depends(get_current_user)):
@@ -1573,8 +2474,60 @@ async def update_qris_settings(data: QRISSettings, user: dict = Depends(get_curr
         raise HTTPException(status_code=403, detail="Only admin can update QRIS settings")
     
     await db.qris_settings.update_one({}, {"$set": data.model_dump()}, upsert=True)
+    await mark_changed("qris_settings")
     return data
 
+# ==================== HIJRI CALENDAR (KHGT) ====================
+
+hijri_flight = SingleFlight()
+
+async def get_hijri_calendar() -> KHGTCalendar:
+    """KHGT month table, built once in a worker thread (a few seconds) and then served from memory"""
+    if get_calendar.cache_info().currsize:
+        return get_calendar()
+    return await hijri_flight.do("khgt", lambda: asyncio.to_thread(get_calendar))
+
+async def get_hijri_date_for(day: str) -> dict:
+    calendar = await get_hijri_calendar()
+    hijri = calendar.to_hijri(datetime.strptime(day, "%Y-%m-%d").date())
+    return {"date": day, **hijri.as_dict(), "ramadan_day": hijri.day if hijri.is_ramadan else None}
+
+@api_router.get("/hijri")
+async def get_hijri_date(date: Optional[str] = None):
+    """KHGT Hijri date for a Gregorian date (default: today at the mosque)"""
+    if date:
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Format tanggal harus YYYY-MM-DD")
+    else:
+        day = local_now(await get_display_location()).strftime("%Y-%m-%d")
+    
+    try:
+        return await get_hijri_date_for(day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/hijri/range")
+async def get_hijri_range(response: Response, start: Optional[str] = None, end: Optional[str] = None):
+    """Hijri months overlapping start..end (default: the whole precomputed table)"""
+    calendar = await get_hijri_calendar()
+    try:
+        start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else calendar.first_date
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else calendar.last_date
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format tanggal harus YYYY-MM-DD")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="Tanggal akhir harus setelah tanggal awal")
+    
+    # The table is deterministic, so clients may keep it for a day
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "months": calendar.months_between(start_date, end_date),
+    }
+
 # ==================== RAMADAN SCHEDULE ====================
 
 class RamadanDaySchedule(BaseModel):
@@ -1602,20 +2555,30 @@ class RamadanScheduleCreate(BaseModel):
     penyedia_takjil: Optional[str] = None
     penyedia_jaburan: Optional[str] = None
 
+async def with_ramadan_day(schedule: RamadanDaySchedule) -> RamadanDaySchedule:
+    """Fill ramadan_day from the KHGT calendar when it was not entered manually"""
+    if schedule.ramadan_day is None:
+        calendar = await get_hijri_calendar()
+        try:
+            schedule.ramadan_day = calendar.ramadan_day(datetime.strptime(schedule.date, "%Y-%m-%d").date())
+        except ValueError:
+            pass
+    return schedule
+
 @api_router.get("/ramadan/schedule")
 async def get_ramadan_schedule():
     """Get all Ramadan schedule data"""
     schedules = await db.ramadan_schedules.find({}, {"_id": 0}).sort("date", 1).to_list(100)
-    return schedules
+    return [await with_ramadan_day(RamadanDaySchedule(**schedule)) for schedule in schedules]
 
 @api_router.get("/ramadan/today")
 async def get_ramadan_today():
     """Get today's Ramadan schedule"""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    today = local_now(await get_display_location()).strftime("%Y-%m-%d")
     schedule = await db.ramadan_schedules.find_one({"date": today}, {"_id": 0})
     if not schedule:
         return None
-    return RamadanDaySchedule(**schedule)
+    return await with_ramadan_day(RamadanDaySchedule(**schedule))
 
 @api_router.post("/ramadan/schedule", response_model=RamadanDaySchedule)
 async def save_ramadan_schedule(data: RamadanScheduleCreate, user: dict = Depends(get_current_user)):
@@ -1627,6 +2590,7 @@ async def save_ramadan_schedule(data: RamadanScheduleCreate, user: dict = Depend
         update_data = {k: v for k, v in data.model_dump().items() if v is not None}
         await db.ramadan_schedules.update_one({"date": data.date}, {"$set": update_data})
         updated = await db.ramadan_schedules.find_one({"date": data.date}, {"_id": 0})
+        await mark_changed("ramadan_schedules")
         return RamadanDaySchedule(**updated)
     else:
         # Create new
@@ -1634,6 +2598,7 @@ async def save_ramadan_schedule(data: RamadanScheduleCreate, user: dict = Depend
         doc = schedule_obj.model_dump()
         doc["created_at"] = doc["created_at"].isoformat()
         await db.ramadan_schedules.insert_one(doc)
+        await mark_changed("ramadan_schedules")
         return schedule_obj
 
 @api_router.delete("/ramadan/schedule/{date}")
@@ -1642,8 +2607,334 @@ async def delete_ramadan_schedule(date: str, user: dict = Depends(get_current_us
     result = await db.ramadan_schedules.delete_one({"date": date})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    await mark_changed("ramadan_schedules")
     return {"message": "Schedule deleted"}
 
+# ==================== DISPLAY BOOTSTRAP ====================
+
+# Collection -> sections of the display payload it feeds
+DISPLAY_SECTIONS = {
+    "mosque_identity": ["mosque", "prayer_times", "timeline"],
+    "ramadan_schedules": ["ramadan"],
+    "prayer_settings": ["prayer_settings", "timeline"],
+    "layout_settings": ["layout"],
+    "contents": ["contents"],
+    "special_events": ["special_events"],
+    "running_texts": ["running_texts"],
+}
+DISPLAY_COLLECTIONS = set(DISPLAY_SECTIONS)
+DISPLAY_SNAPSHOT_TTL = float(os.environ.get('DISPLAY_SNAPSHOT_TTL', '300'))
+
+# Last built /display/bootstrap payload; version increases on every rebuild
+display_snapshot = {"version": 0, "payload": None, "expires": 0.0, "day": None}
+# Payload for the next local day, built ahead of midnight by the pre-warm scheduler
+display_next_day = PrewarmedSlot()
+_display_snapshot_lock = asyncio.Lock()
+
+def local_now(location: dict) -> datetime:
+    """Current wall-clock time at the mosque"""
+    return datetime.now(timezone(timedelta(hours=location["timezone_offset"])))
+
+async def get_display_location() -> dict:
+    identity = await get_singleton("mosque_identity", MosqueIdentity)
+    return get_prayer_location(identity)
+
+async def build_display_payload(day: str, location: dict) -> dict:
+    """Gather everything a TV display needs for local ``day`` in one concurrent pass"""
+    async def hijri_date():
+        try:
+            return await get_hijri_date_for(day)
+        except ValueError:
+            return None  # Outside the precomputed KHGT table
+    
+    next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    (prayer_times, next_prayer_times, hijri, identity, prayer_settings, layout,
+     contents, events, running_texts, ramadan) = await asyncio.gather(
+        get_cached_prayer_times(location, day),
+        get_cached_prayer_times(location, next_day),
+        hijri_date(),
+        get_singleton("mosque_identity", MosqueIdentity),
+        get_singleton("prayer_settings", PrayerSettings),
+        get_singleton("layout_settings", LayoutSettings),
+        db.contents.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(100),
+        db.special_events.find({"is_active": True, "event_date": {"$gte": day}}, {"_id": 0}).sort("event_date", 1).to_list(100),
+        db.running_texts.find({"is_active": True}, {"_id": 0}).sort("order", 1).to_list(100),
+        db.ramadan_schedules.find_one({"date": day}, {"_id": 0}),
+    )
+    return {
+        "date": day,
+        "hijri": hijri,
+        "prayer_times": prayer_times,
+        "timeline": make_display_timeline(day, location, prayer_times, next_prayer_times, prayer_settings),
+        "mosque": MosqueIdentity(**identity).model_dump(),
+        "prayer_settings": PrayerSettings(**prayer_settings).model_dump(),
+        "layout": LayoutSettings(**layout).model_dump(),
+        "contents": contents,
+        "special_events": events,
+        "running_texts": running_texts,
+        "ramadan": (await with_ramadan_day(RamadanDaySchedule(**ramadan))).model_dump() if ramadan else None,
+    }
+
+def make_display_timeline(day: str, location: dict, prayer_times: dict, next_prayer_times: dict,
+                          prayer_settings: dict) -> dict:
+    """Phase transitions (pre-adzan, adzan, iqomah, sholat) for one local day"""
+    transitions = build_timeline(
+        datetime.strptime(day, "%Y-%m-%d").date(), prayer_times, next_prayer_times,
+        PrayerSettings(**prayer_settings).model_dump(), location["timezone_offset"],
+    )
+    return {"date": day, "timezone_offset": location["timezone_offset"], "transitions": transitions}
+
+async def get_display_snapshot() -> dict:
+    """Return the current snapshot, rebuilding it after a write, expiry or local day change"""
+    location = await get_display_location()
+    now = time.monotonic()
+    day = local_now(location).strftime("%Y-%m-%d")
+    
+    def is_fresh():
+        return display_snapshot["payload"] is not None and display_snapshot["expires"] > now and display_snapshot["day"] == day
+    
+    if not is_fresh():
+        async with _display_snapshot_lock:
+            if not is_fresh():
+                # At midnight take the pre-warmed payload instead of rebuilding under load
+                # Only consumed once its day has come; earlier (TTL) rebuilds leave it for midnight
+                payload = display_next_day.take(day)
+                if payload is None:
+                    payload = await build_display_payload(day, location)
+                # No await between here and the end, so readers never see a half-swapped snapshot
+                display_snapshot["version"] += 1
+                display_snapshot["payload"] = {
+                    "version": display_snapshot["version"],
+                    "generated_at": datetime.now(timezone.utc).isoformat(),
+                    **payload,
+                }
+                display_snapshot["expires"] = now + DISPLAY_SNAPSHOT_TTL
+                display_snapshot["day"] = day
+    return display_snapshot["payload"]
+
+@api_router.get("/display/timeline")
+async def get_display_timeline(date: Optional[str] = None):
+    """Sorted phase transitions for a day; today's comes straight from the display snapshot"""
+    snapshot = await get_display_snapshot()
+    if not date or date == snapshot["date"]:
+        return snapshot["timeline"]
+    
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format tanggal harus YYYY-MM-DD")
+    location = await get_display_location()
+    prayer_times, next_prayer_times, prayer_settings = await asyncio.gather(
+        get_cached_prayer_times(location, day.strftime("%Y-%m-%d")),
+        get_cached_prayer_times(location, (day + timedelta(days=1)).strftime("%Y-%m-%d")),
+        get_singleton("prayer_settings", PrayerSettings),
+    )
+    return make_display_timeline(day.strftime("%Y-%m-%d"), location, prayer_times, next_prayer_times, prayer_settings)
+
+@api_router.get("/display/bootstrap")
+async def get_display_bootstrap():
+    """Everything a TV display needs (prayer times, identity, settings, content, events, running text) in one call"""
+    return await get_display_snapshot()
+
+# ==================== DISPLAY STREAM (SSE) ====================
+
+DISPLAY_STREAM_HEARTBEAT = 20  # seconds
+display_broadcaster = Broadcaster()
+
+async def publish_display_change(collection: str):
+    """Push only the display sections fed by ``collection`` to connected screens"""
+    if not display_broadcaster.subscriber_count:
+        return
+    snapshot = await get_display_snapshot()
+    sections = {name: snapshot[name] for name in DISPLAY_SECTIONS[collection]}
+    display_broadcaster.publish("update", {"version": snapshot["version"], "sections": sections}, snapshot["version"])
+
+@api_router.get("/display/stream")
+async def display_stream(request: Request):
+    """Server-Sent Events: full snapshot on connect, then only the changed sections"""
+    async def event_source():
+        # Subscribed once the response starts streaming, so the finally below always unsubscribes;
+        # still before the snapshot, so no change between the two is missed
+        queue = display_broadcaster.subscribe()
+        try:
+            snapshot = await get_display_snapshot()
+            yield "retry: 5000\n\n"
+            yield format_sse("snapshot", snapshot, snapshot["version"])
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=DISPLAY_STREAM_HEARTBEAT)
+                    yield message
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+        finally:
+            display_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ==================== MIDNIGHT PRE-WARM ====================
+
+DISPLAY_PREWARM_LEAD = float(os.environ.get('DISPLAY_PREWARM_LEAD', '600'))  # seconds before local midnight
+
+def next_local_midnight(location: dict) -> datetime:
+    now = local_now(location)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+async def prewarm_day(day: str, location: dict):
+    """Fill the prayer-time caches and build the display payload for ``day`` ahead of time"""
+    # Keeps PRAYER_CACHE_MONTHS of prayer_times_cache ahead, so month boundaries are covered too
+    await precompute_prayer_times(location)
+    await get_cached_prayer_times(location, day)
+    payload = await build_display_payload(day, location)
+    display_next_day.put(day, payload)
+
+async def run_midnight_prewarm():
+    """Pre-warm tomorrow shortly before local midnight, then swap and push it at midnight"""
+    while True:
+        try:
+            location = await get_display_location()
+            midnight = next_local_midnight(location)
+            lead = (midnight - local_now(location)).total_seconds() - DISPLAY_PREWARM_LEAD
+            if lead > 0:
+                await asyncio.sleep(lead)
+            await prewarm_day(midnight.strftime("%Y-%m-%d"), location)
+            logging.info(f"Display {midnight.date()} sudah disiapkan sebelum tengah malam")
+            
+            # Sleep just past midnight, then swap; screens on the stream roll over without refetching
+            await asyncio.sleep(max(0.0, (midnight - local_now(location)).total_seconds()) + 1)
+            snapshot = await get_display_snapshot()
+            display_broadcaster.publish("snapshot", snapshot, snapshot["version"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error pre-warming display: {e}")
+            await asyncio.sleep(60)
+
+# ==================== REPLICA SYNC ====================
+
+# Collections whose writes must reach caches and displays on every replica
+REPLICA_SYNC_COLLECTIONS = [
+    "contents", "agendas", "running_texts", "announcements", "gallery", "quotes", "pengurus", "special_events",
+    "ramadan_schedules",
+    *sorted(SETTINGS_SINGLETONS),
+    *sorted(FINANCE_COLLECTIONS),
+]
+REPLICA_SYNC = os.environ.get('REPLICA_SYNC', 'off').lower()  # off, auto
+REPLICA_SYNC_POLL_INTERVAL = float(os.environ.get('REPLICA_SYNC_POLL_INTERVAL', '5'))
+
+async def apply_remote_change(collection: str, revision: Optional[int]):
+    """Apply a change observed by the watcher (possibly made by another replica)"""
+    if revision is None:
+        # Raw document change: caches only, the revision event drives the push
+        invalidate_local_caches(collection)
+        return
+    if revision <= collection_revisions.get(collection, 0):
+        return  # Already applied (our own write or an earlier poll)
+    collection_revisions[collection] = revision
+    invalidate_local_caches(collection)
+    if collection in DISPLAY_COLLECTIONS:
+        await publish_display_change(collection)
+
+change_watcher = ChangeWatcher(db, REPLICA_SYNC_COLLECTIONS, apply_remote_change, poll_interval=REPLICA_SYNC_POLL_INTERVAL)
+background_tasks = set()
+
+# ==================== INDEXES ====================
+
+def _unique_id():
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+# Indexes for every queried field, applied at startup (create_index is idempotent)
+INDEX_MANIFEST = {
+    "users": [_unique_id(), IndexModel([("username", ASCENDING)], unique=True, name="username_unique")],
+    "mosque_identity": [_unique_id()],
+    "prayer_settings": [_unique_id()],
+    "layout_settings": [_unique_id()],
+    "contents": [_unique_id(), IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="active_order")],
+    "running_texts": [_unique_id(), IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="active_order")],
+    "pengurus": [_unique_id(), IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="active_order")],
+    "quotes": [_unique_id(), IndexModel([("is_active", ASCENDING), ("order", ASCENDING)], name="active_order")],
+    "gallery": [
+        _unique_id(),
+        IndexModel([("is_active", ASCENDING), ("order", ASCENDING), ("created_at", DESCENDING)], name="active_order"),
+        IndexModel([("category", ASCENDING), ("order", ASCENDING)], name="category_order"),
+    ],
+    "announcements": [
+        _unique_id(),
+        IndexModel([("is_active", ASCENDING), ("priority", DESCENDING), ("created_at", DESCENDING)], name="active_priority"),
+    ],
+    "agendas": [_unique_id(), IndexModel([("is_active", ASCENDING), ("event_date", ASCENDING)], name="active_event_date")],
+    "special_events": [
+        _unique_id(),
+        IndexModel([("is_active", ASCENDING), ("event_date", ASCENDING)], name="active_event_date"),
+        IndexModel([("event_date", ASCENDING)], name="event_date"),
+    ],
+    "articles": [
+        _unique_id(),
+        IndexModel([("is_published", ASCENDING), ("created_at", DESCENDING)], name="published_created"),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING)], name="category_created"),
+    ],
+    "zis_reports": [
+        _unique_id(),
+        IndexModel([("year", ASCENDING), ("month", ASCENDING), ("type", ASCENDING)], name="year_month_type"),
+        IndexModel([("date", DESCENDING), ("id", DESCENDING)], name="date_id"),
+    ],
+    "expenditure_reports": [
+        _unique_id(),
+        IndexModel([("year", ASCENDING), ("month", ASCENDING), ("category", ASCENDING)], name="year_month_category"),
+        IndexModel([("date", DESCENDING), ("id", DESCENDING)], name="date_id"),
+    ],
+    "ramadan_schedules": [_unique_id(), IndexModel([("date", ASCENDING)], unique=True, name="date_unique")],
+    "settings": [IndexModel([("key", ASCENDING)], unique=True, name="key_unique")],
+    "revisions": [IndexModel([("collection", ASCENDING)], unique=True, name="collection_unique")],
+    "prayer_times_cache": [IndexModel(PRAYER_CACHE_KEY_FIELDS, unique=True, name="location_method_date")],
+    "zis_monthly_rollups": [
+        IndexModel([("year", ASCENDING), ("source", ASCENDING), ("month", ASCENDING), ("type", ASCENDING)],
+                   unique=True, name="year_source_month_type"),
+    ],
+    "upload_sessions": [_unique_id(), IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")],
+    "sheets_sync_jobs": [
+        _unique_id(),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+    "sheets_sync_rows": [IndexModel([("sheet", ASCENDING), ("record_id", ASCENDING)], unique=True, name="sheet_record")],
+}
+
+# Indexes superseded by a manifest entry; dropped at startup so writes stop maintaining them
+OBSOLETE_INDEXES = {
+    "zis_reports": ["date"],  # prefix of date_id
+    "expenditure_reports": ["date"],  # prefix of date_id
+}
+
+async def ensure_indexes() -> list:
+    """Apply INDEX_MANIFEST and return the names of indexes that were newly created"""
+    for collection, names in OBSOLETE_INDEXES.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
+                logging.info(f"Index lama dihapus: {collection}.{name}")
+    created = []
+    for collection, indexes in INDEX_MANIFEST.items():
+        existing = await db[collection].index_information()
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            try:
+                await db[collection].create_indexes([index])
+                created.append(f"{collection}.{name}")
+            except PyMongoError as e:
+                # e.g. duplicate values in legacy data; keep serving without this index
+                logging.error(f"Gagal membuat index {collection}.{name}: {e}")
+    return created
+
 # ==================== ROOT ====================
 
 @api_router.get("/")
@@ -1661,13 +2952,16 @@ async def health_check():
         return {
             "status": "healthy",
             "database": "connected",
-            "service": "Jam Sholat Digital KHGT"
+            "service": "Jam Sholat Digital KHGT",
+            "replica_sync": change_watcher.mode,
+            "upstreams": {"hisabmu": hisabmu_breaker.snapshot()}
         }
     except Exception as e:
         return {
             "status": "unhealthy",
             "database": "disconnected",
-            "error": str(e)
+            "error": str(e),
+            "upstreams": {"hisabmu": hisabmu_breaker.snapshot()}
         }
 
 # Include router and middleware
@@ -1679,6 +2973,8 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Dibaca oleh klien: cursor halaman berikutnya dan offset upload bertahap
+    expose_headers=["X-Next-Cursor", "Upload-Offset"],
 )
 
 logging.basicConfig(
@@ -1687,6 +2983,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+async def shutdown_app():
+    for task in background_tasks:
+        task.cancel()
+    await http_client.aclose()
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+    if _sheets_pool is not None:
+        _sheets_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
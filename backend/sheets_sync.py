@@ -0,0 +1,131 @@
+"""
+Sinkronisasi inkremental laporan keuangan ke Google Sheets
+Setiap baris sheet dicatat (record id -> nomor baris, fingerprint nilai terakhir yang dikirim),
+sehingga sinkronisasi berikutnya hanya mengirim baris yang berubah lewat satu batch_update.
+Fungsi gspread di sini blocking: panggil dari thread pool, jangan dari event loop.
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from ledger_export import EXPENDITURE_EXPORT_COLUMNS, ZIS_EXPORT_COLUMNS
+
+# key -> (worksheet title, collection, columns)
+SHEETS = {
+    "zis": ("Pemasukan ZIS", "zis_reports", ZIS_EXPORT_COLUMNS),
+    "expenditure": ("Pengeluaran Dana", "expenditure_reports", EXPENDITURE_EXPORT_COLUMNS),
+}
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+FIRST_DATA_ROW = 2  # row 1 holds the headers
+NEW_SHEET_ROWS = 500
+
+
+def fingerprint(values: list) -> str:
+    return hashlib.sha1(json.dumps(values, default=str).encode()).hexdigest()
+
+
+@dataclass
+class SyncPlan:
+    updates: List[Tuple[int, list]] = field(default_factory=list)  # (row number, values), sorted by row
+    changed: Dict[str, Tuple[int, str]] = field(default_factory=dict)  # record id -> (row, fingerprint)
+    removed: List[str] = field(default_factory=list)
+    row_count: int = FIRST_DATA_ROW - 1  # last row in use after the sync
+    total: int = 0
+
+
+def plan_sync(rows: Dict[str, list], state: Dict[str, Tuple[int, str]], width: int) -> SyncPlan:
+    """Diff current rows (record id -> values, in sheet order) against what the sheet holds
+
+    Changed records keep their row, new records fill the rows of deleted ones before
+    being appended, and rows of deleted records that are not reused are blanked.
+    """
+    plan = SyncPlan(total=len(rows))
+    plan.removed = [record_id for record_id in state if record_id not in rows]
+    free_rows = sorted(state[record_id][0] for record_id in plan.removed)
+    last_row = max((row for row, _ in state.values()), default=FIRST_DATA_ROW - 1)
+    next_row = last_row + 1
+    free_index = 0
+    for record_id, values in rows.items():
+        digest = fingerprint(values)
+        if record_id in state:
+            row, synced = state[record_id]
+            if synced == digest:
+                continue
+        elif free_index < len(free_rows):
+            row = free_rows[free_index]
+            free_index += 1
+        else:
+            row = next_row
+            next_row += 1
+        plan.updates.append((row, values))
+        plan.changed[record_id] = (row, digest)
+    plan.updates.extend((row, [""] * width) for row in free_rows[free_index:])
+    plan.updates.sort(key=lambda update: update[0])
+    plan.row_count = next_row - 1
+    return plan
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def value_ranges(updates: List[Tuple[int, list]], width: int) -> List[dict]:
+    """batch_update payload; runs of consecutive rows become a single range"""
+    last_column = _column_letter(width)
+    ranges = []
+    for row, values in updates:
+        if ranges and ranges[-1]["end"] == row - 1:
+            ranges[-1]["end"] = row
+            ranges[-1]["values"].append(values)
+        else:
+            ranges.append({"start": row, "end": row, "values": [values]})
+    return [{"range": f"A{r['start']}:{last_column}{r['end']}", "values": r["values"]} for r in ranges]
+
+
+def open_spreadsheet(service_account_json: str, spreadsheet_id: str):
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(json.loads(service_account_json), scopes=SCOPES)
+    return gspread.authorize(creds).open_by_key(spreadsheet_id)
+
+
+def prepare_worksheet(spreadsheet, title: str, headers: List[str], reset: bool):
+    """(worksheet, created); a new or reset worksheet is emptied and gets the header row"""
+    import gspread
+
+    try:
+        worksheet = spreadsheet.worksheet(title)
+        created = False
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet = spreadsheet.add_worksheet(title=title, rows=NEW_SHEET_ROWS, cols=len(headers))
+        created = True
+    if reset and not created:
+        worksheet.clear()
+    if reset or created:
+        worksheet.update([headers], "A1")
+    return worksheet, created
+
+
+def write_rows(worksheet, updates: List[Tuple[int, list]], width: int, row_count: int):
+    """Send one batch of row updates, growing the grid first if they land past its end"""
+    if worksheet.row_count < row_count:
+        worksheet.add_rows(row_count - worksheet.row_count)
+    worksheet.batch_update(value_ranges(updates, width))
+
+
+def error_message(error: Exception) -> str:
+    if isinstance(error, ImportError):
+        return "Library gspread belum terinstall. Hubungi administrator."
+    if type(error).__name__ == "SpreadsheetNotFound":
+        return "Spreadsheet tidak ditemukan. Pastikan ID benar dan sudah di-share ke Service Account."
+    return f"Gagal sinkronisasi: {error}"
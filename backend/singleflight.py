@@ -0,0 +1,96 @@
+"""
+Single-flight dan stale-while-revalidate untuk pemanggilan yang mahal
+Permintaan bersamaan dengan kunci yang sama berbagi satu pemanggilan yang
+sedang berjalan; data lama tetap disajikan selama pembaruan berjalan di latar.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            # Mark retrieved so a failure without waiters is not logged as "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+class StaleWhileRevalidate:
+    """Serve fresh values directly, stale values while refreshing in the background"""
+
+    def __init__(self, fresh_ttl: float, stale_ttl: float, maxsize: int = 64):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.flight = SingleFlight()
+        self._entries: dict = {}
+        self._tasks: set = set()
+
+    def peek(self, key: Hashable):
+        """Return the last good value regardless of age (or None)"""
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def put(self, key: Hashable, value: Any):
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            oldest = min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest]
+        self._entries[key] = (time.monotonic(), value)
+
+    async def _load(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        async def load_and_store():
+            value = await fn()
+            self.put(key, value)
+            return value
+        return await self.flight.do(key, load_and_store)
+
+    def _refresh_in_background(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        async def refresh():
+            try:
+                await self._load(key, fn)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.fresh_ttl:
+                return entry[1]
+            if age < self.stale_ttl:
+                if not self.flight.in_flight(key):
+                    self._refresh_in_background(key, fn)
+                return entry[1]
+        return await self._load(key, fn)
@@ -0,0 +1,35 @@
+"""
+Midnight pre-warm slot used by the display snapshot:
+- a same-day (TTL) rebuild after pre-warming leaves tomorrow's payload in place
+- the payload is handed out once, on its own day
+"""
+
+from cache import PrewarmedSlot
+
+TODAY = "2026-10-17"
+TOMORROW = "2026-10-18"
+
+
+class TestPrewarmedSlot:
+
+    def test_same_day_rebuild_keeps_prewarmed_payload(self):
+        """Verify a rebuild for today does not discard the payload prepared for tomorrow"""
+        slot = PrewarmedSlot()
+        payload = {"date": TOMORROW}
+        slot.put(TOMORROW, payload)
+
+        # Snapshot expired a few minutes before midnight: rebuilt for today
+        assert slot.take(TODAY) is None
+        assert slot.key == TOMORROW
+
+        # First rebuild after midnight takes the prepared payload
+        assert slot.take(TOMORROW) is payload
+        assert slot.key is None
+        assert slot.take(TOMORROW) is None
+
+    def test_clear_drops_payload(self):
+        """Verify a display write (clear) means tomorrow is built from scratch"""
+        slot = PrewarmedSlot()
+        slot.put(TOMORROW, {"date": TOMORROW})
+        slot.clear()
+        assert slot.take(TOMORROW) is None
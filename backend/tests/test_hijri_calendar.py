@@ -0,0 +1,30 @@
+"""
+KHGT calendar table lookups:
+- months outside the precomputed table (or not 1-12) raise ValueError, which the API turns into 400
+"""
+
+import pytest
+
+from hijri_calendar import build_calendar
+
+
+@pytest.fixture(scope="module")
+def calendar():
+    return build_calendar(1446, 1448)
+
+
+class TestMonthBounds:
+
+    @pytest.mark.parametrize("year, month", [(1445, 12), (1449, 1), (1447, 0), (1447, 13)])
+    def test_out_of_range_month(self, calendar, year, month):
+        """Verify month_length and month_start reject months outside the table"""
+        with pytest.raises(ValueError):
+            calendar.month_length(year, month)
+        with pytest.raises(ValueError):
+            calendar.month_start(year, month)
+
+    def test_known_month_starts(self, calendar):
+        """Verify the 1447 H month starts the frontend fallback table is copied from"""
+        assert calendar.month_start(1447, 1).isoformat() == "2025-06-26"
+        assert calendar.month_start(1447, 9).isoformat() == "2026-02-18"
+        assert calendar.month_length(1447, 12) == 29
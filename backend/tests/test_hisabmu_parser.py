@@ -0,0 +1,38 @@
+"""
+hisabmu.com table parser:
+- the same schedule whatever the chunk boundaries
+- feed() reports the end of the table so the caller can stop reading
+"""
+
+from hisabmu_parser import HisabmuParser, parse_month_table
+
+CELLS = "".join(f"<td class='t'>0{h}:1{h}:2{h}</td>" for h in range(1, 8))
+PAGE = (
+    "<html><head>" + "<script>var tr = '<track>';</script>" * 20 + "</head><body>"
+    + "<table><tr><th>Tgl</th></tr>"
+    + "".join(f"<tr class='row'>\n<td class='d'>{day}/01</td>{CELLS}</tr>" for day in range(1, 4))
+    + "</table>" + "<p>footer</p>" * 50 + "</body></html>"
+)
+
+
+class TestHisabmuParser:
+
+    def test_rows_as_schedule(self):
+        """Verify rows come out in the /prayer-times/monthly shape"""
+        schedule = parse_month_table(PAGE)
+        assert [row["day"] for row in schedule] == [1, 2, 3]
+        assert schedule[0] == {"day": 1, "subuh": "01:11", "terbit": "02:12", "dhuha": "03:13",
+                               "dzuhur": "04:14", "ashar": "05:15", "maghrib": "06:16", "isya": "07:17"}
+
+    def test_any_chunking_gives_the_same_rows(self):
+        """Verify rows and the table end survive being split anywhere"""
+        expected = parse_month_table(PAGE)
+        for size in (1, 2, 3, 5, 8, 13, 64, 500):
+            parser = HisabmuParser()
+            chunks = [PAGE[i:i + size] for i in range(0, len(PAGE), size)]
+            for read, chunk in enumerate(chunks, 1):
+                if parser.feed(chunk):
+                    break
+            assert parser.close() == expected, size
+            # Stopped inside the footer, well before the end of the page
+            assert read * size < PAGE.index("</table>") + len("</table>") + size, size
@@ -6,7 +6,7 @@ Tests: Authentication, Prayer Times, Calibration Settings, Sound Notifications
 import pytest
 import requests
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://islamic-cms.preview.emergentagent.com').rstrip('/')
 
@@ -120,6 +120,103 @@ class TestPrayerTimes:
         assert "year" in data
         assert "schedule" in data
 
+    def test_monthly_prayer_times_requested_month(self):
+        """Test monthly prayer times are computed for the requested month"""
+        response = requests.get(f"{BASE_URL}/api/prayer-times/monthly?month=2&year=2026", timeout=30)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["month"] == 2
+        assert data["year"] == 2026
+        assert len(data["schedule"]) == 28
+        assert [row["day"] for row in data["schedule"]] == list(range(1, 29))
+
+    def test_prayer_times_order(self):
+        """Test locally computed prayer times are chronologically ordered"""
+        response = requests.get(f"{BASE_URL}/api/prayer-times?date=2026-02-15", timeout=30)
+
+        assert response.status_code == 200
+        data = response.json()
+        order = ["imsak", "subuh", "terbit", "dhuha", "dzuhur", "ashar", "maghrib", "isya"]
+        values = [data[name] for name in order]
+        assert values == sorted(values), f"Prayer times out of order: {values}"
+
+    def test_prayer_times_range_full_year(self):
+        """Test a whole year of prayer times in a single request"""
+        response = requests.get(f"{BASE_URL}/api/prayer-times/range?start=2026-01-01&end=2026-12-31", timeout=30)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["start"] == "2026-01-01"
+        assert data["end"] == "2026-12-31"
+        assert len(data["schedule"]) == 365
+        assert data["schedule"][0]["date"] == "2026-01-01"
+        assert data["schedule"][-1]["date"] == "2026-12-31"
+
+        # Range rows must agree with the single-day endpoint
+        single = requests.get(f"{BASE_URL}/api/prayer-times?date=2026-02-15", timeout=30).json()
+        row = data["schedule"][45]
+        assert row["date"] == "2026-02-15"
+        for name in ["imsak", "subuh", "terbit", "dhuha", "dzuhur", "ashar", "maghrib", "isya"]:
+            assert row[name] == single[name]
+
+    def test_prayer_times_range_invalid(self):
+        """Test range endpoint rejects reversed and oversized ranges"""
+        response = requests.get(f"{BASE_URL}/api/prayer-times/range?start=2026-02-01&end=2026-01-01", timeout=30)
+        assert response.status_code == 400
+
+        response = requests.get(f"{BASE_URL}/api/prayer-times/range?start=2020-01-01&end=2026-01-01", timeout=30)
+        assert response.status_code == 400
+
+    def test_monthly_prayer_times_invalid_month(self):
+        """Test monthly endpoint rejects months outside 1-12 instead of failing with 500"""
+        for month in (0, 13):
+            response = requests.get(f"{BASE_URL}/api/prayer-times/monthly?month={month}&year=2026", timeout=30)
+            assert response.status_code == 422
+
+
+class TestHijriCalendar:
+    """Server-side KHGT Hijri calendar"""
+
+    def test_ramadan_1447(self):
+        """Test 1 Ramadan 1447 H falls on 18 February 2026"""
+        response = requests.get(f"{BASE_URL}/api/hijri?date=2026-02-18", timeout=60)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["year"], data["month"], data["day"]) == (1447, 9, 1)
+        assert data["month_name"] == "Ramadan"
+        assert data["is_ramadan"] is True
+        assert data["ramadan_day"] == 1
+
+    def test_beyond_1447_table(self):
+        """Test dates after Zulhijah 1447 H are still converted"""
+        response = requests.get(f"{BASE_URL}/api/hijri?date=2030-01-01", timeout=60)
+
+        assert response.status_code == 200
+        assert response.json()["year"] == 1451
+
+    def test_hijri_range_months(self):
+        """Test range returns contiguous months of 29 or 30 days"""
+        response = requests.get(f"{BASE_URL}/api/hijri/range?start=2026-01-01&end=2027-12-31", timeout=60)
+
+        assert response.status_code == 200
+        months = response.json()["months"]
+        assert len(months) >= 24
+        for month in months:
+            assert month["length"] in (29, 30)
+        for previous, current in zip(months, months[1:]):
+            expected_start = datetime.strptime(previous["end"], "%Y-%m-%d") + timedelta(days=1)
+            assert current["start"] == expected_start.strftime("%Y-%m-%d")
+
+    def test_hijri_invalid_date(self):
+        """Test malformed and out-of-table dates are rejected"""
+        response = requests.get(f"{BASE_URL}/api/hijri?date=18-02-2026", timeout=30)
+        assert response.status_code == 400
+
+        response = requests.get(f"{BASE_URL}/api/hijri?date=2200-01-01", timeout=30)
+        assert response.status_code == 400
+
 
 class TestPrayerSettings:
     """Prayer settings and calibration API tests"""
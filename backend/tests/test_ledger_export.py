@@ -0,0 +1,44 @@
+"""
+CSV export of the ledgers:
+- donor names and descriptions that look like formulas are written as text
+- ordinary values and amounts are written unchanged
+"""
+
+import asyncio
+import csv
+import io
+
+from ledger_export import ZIS_EXPORT_COLUMNS, csv_chunks
+
+
+async def cursor(docs):
+    for doc in docs:
+        yield doc
+
+
+def export(docs):
+    async def collect():
+        return b"".join([chunk async for chunk in csv_chunks(cursor(docs), ZIS_EXPORT_COLUMNS)])
+    return list(csv.reader(io.StringIO(asyncio.run(collect()).decode("utf-8-sig"))))
+
+
+class TestCSVExport:
+
+    def test_formula_text_is_escaped(self):
+        """Verify =, +, - and @ at the start of user text cannot run as a formula"""
+        rows = export([
+            {"date": "2026-10-17", "type": "zakat", "donor_name": "=HYPERLINK(\"http://x\")",
+             "amount": 1500.0, "description": "@SUM(A1)"},
+            {"date": "2026-10-17", "type": "infaq", "donor_name": "+62812", "amount": 2000, "description": "-1"},
+        ])
+        assert rows[1][2] == "'=HYPERLINK(\"http://x\")"
+        assert rows[1][4] == "'@SUM(A1)"
+        assert rows[2][2] == "'+62812"
+        assert rows[2][4] == "'-1"
+
+    def test_plain_values_unchanged(self):
+        """Verify normal text and amounts are not touched"""
+        rows = export([{"date": "2026-10-17", "type": "sedekah", "donor_name": None,
+                        "amount": 1500.0, "description": "Kotak Jumat"}])
+        assert rows[0] == [header for _, header in ZIS_EXPORT_COLUMNS]
+        assert rows[1] == ["2026-10-17", "Sedekah", "Anonim", "1500", "Kotak Jumat"]
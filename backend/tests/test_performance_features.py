@@ -0,0 +1,654 @@
+"""
+Performance Features Test Suite:
+- Settings cache (write-through invalidation, hit/miss counters)
+- Display bootstrap snapshot
+- Display phase timeline
+- ETag / conditional GET on public read endpoints
+- Server-Sent Events display stream
+- Upstream circuit breaker state on /api/health
+- Content-addressed uploads
+- Resumable chunked uploads, size limit and MIME sniffing
+- WebP image variants for gallery, articles and pengurus
+- Range / ETag / Last-Modified on uploaded media
+- ZIS monthly rollups maintained on write
+- Combined finance dashboard, cached until the next finance write
+- Keyset pagination and filters on the ZIS / expenditure ledgers
+- Streaming CSV / XLSX export of the ledgers
+- Background Google Sheets sync jobs with status polling
+"""
+
+import pytest
+import requests
+import os
+import hashlib
+import io
+import time
+from PIL import Image
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def auth_headers():
+    """Login as admin and return authorization headers"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "username": "admin",
+        "password": "admin123"
+    })
+    assert response.status_code == 200, "Login failed"
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+class TestSettingsCache:
+    """In-process settings cache tests"""
+
+    def test_cache_stats_requires_auth(self):
+        """Verify /api/cache/stats is not public"""
+        response = requests.get(f"{BASE_URL}/api/cache/stats")
+        assert response.status_code in [401, 403]
+
+    def test_cache_counts_hits(self, auth_headers):
+        """Verify repeated settings reads are served from the cache"""
+        requests.get(f"{BASE_URL}/api/settings/layout")
+        before = requests.get(f"{BASE_URL}/api/cache/stats", headers=auth_headers).json()["settings"]
+        for _ in range(3):
+            assert requests.get(f"{BASE_URL}/api/settings/layout").status_code == 200
+        after = requests.get(f"{BASE_URL}/api/cache/stats", headers=auth_headers).json()["settings"]
+        assert after["hits"] >= before["hits"] + 3
+
+    def test_update_is_visible_immediately(self, auth_headers):
+        """Verify PUT writes through the cache so the next GET is fresh"""
+        original = requests.get(f"{BASE_URL}/api/settings/prayer").json()
+        new_value = 7 if original["bell_before_minutes"] != 7 else 6
+
+        response = requests.put(f"{BASE_URL}/api/settings/prayer",
+                                json={"bell_before_minutes": new_value}, headers=auth_headers)
+        assert response.status_code == 200
+        assert requests.get(f"{BASE_URL}/api/settings/prayer").json()["bell_before_minutes"] == new_value
+
+        # Restore
+        requests.put(f"{BASE_URL}/api/settings/prayer",
+                     json={"bell_before_minutes": original["bell_before_minutes"]}, headers=auth_headers)
+
+
+class TestDisplayBootstrap:
+    """Aggregated TV display endpoint tests"""
+
+    def test_bootstrap_contains_all_sections(self):
+        """Verify /api/display/bootstrap returns every display section"""
+        response = requests.get(f"{BASE_URL}/api/display/bootstrap")
+        assert response.status_code == 200
+        data = response.json()
+        for key in ["version", "prayer_times", "mosque", "prayer_settings", "layout",
+                    "contents", "special_events", "running_texts", "ramadan", "date", "hijri"]:
+            assert key in data, f"Missing section: {key}"
+        assert "subuh" in data["prayer_times"]
+        assert "calibration_subuh" in data["prayer_settings"]
+        assert data["prayer_times"]["date"] == data["date"]
+
+    def test_cache_stats_report_display_day(self, auth_headers):
+        """Verify /api/cache/stats shows the snapshot day and the pre-warmed day"""
+        requests.get(f"{BASE_URL}/api/display/bootstrap")
+        response = requests.get(f"{BASE_URL}/api/cache/stats", headers=auth_headers)
+        assert response.status_code == 200
+        display = response.json()["display"]
+        assert display["day"] is not None
+        assert "next_day" in display
+
+    def test_bootstrap_version_bumps_after_write(self, auth_headers):
+        """Verify a running text write produces a new snapshot version"""
+        before = requests.get(f"{BASE_URL}/api/display/bootstrap").json()
+        assert requests.get(f"{BASE_URL}/api/display/bootstrap").json()["version"] == before["version"]
+
+        created = requests.post(f"{BASE_URL}/api/running-text",
+                                json={"text": "TEST_bootstrap running text"}, headers=auth_headers).json()
+        try:
+            after = requests.get(f"{BASE_URL}/api/display/bootstrap").json()
+            assert after["version"] > before["version"]
+            assert any(t["id"] == created["id"] for t in after["running_texts"])
+        finally:
+            requests.delete(f"{BASE_URL}/api/running-text/{created['id']}", headers=auth_headers)
+
+
+class TestDisplayTimeline:
+    """Precomputed adzan/iqomah/sholat phase timeline"""
+
+    def test_timeline_is_sorted_and_complete(self):
+        """Verify every main prayer has an adzan transition, in time order"""
+        response = requests.get(f"{BASE_URL}/api/display/timeline")
+        assert response.status_code == 200
+        data = response.json()
+        transitions = data["transitions"]
+
+        stamps = [t["ts"] for t in transitions]
+        assert stamps == sorted(stamps)
+        adzans = [t["prayer"] for t in transitions if t["phase"] == "adzan"]
+        assert adzans[:5] == ["subuh", "dzuhur", "ashar", "maghrib", "isya"]
+
+    def test_timeline_matches_prayer_times(self):
+        """Verify adzan transitions fall exactly on the published prayer times"""
+        times = requests.get(f"{BASE_URL}/api/prayer-times?date=2026-03-01").json()
+        response = requests.get(f"{BASE_URL}/api/display/timeline?date=2026-03-01")
+        assert response.status_code == 200
+
+        for transition in response.json()["transitions"]:
+            if transition["phase"] == "adzan" and transition["at"].startswith("2026-03-01"):
+                assert transition["at"][11:16] == times[transition["prayer"]]
+
+    def test_timeline_in_bootstrap(self):
+        """Verify the display snapshot carries today's timeline"""
+        data = requests.get(f"{BASE_URL}/api/display/bootstrap").json()
+        assert data["timeline"]["date"] == data["date"]
+
+
+class TestConditionalGet:
+    """ETag / If-None-Match tests for public read endpoints"""
+
+    @pytest.mark.parametrize("path", [
+        "/api/content", "/api/agenda", "/api/running-text", "/api/announcements",
+        "/api/gallery", "/api/quotes", "/api/pengurus", "/api/special-events",
+    ])
+    def test_repeat_poll_returns_304(self, path):
+        """Verify a second poll with If-None-Match is answered with 304"""
+        first = requests.get(f"{BASE_URL}{path}")
+        assert first.status_code == 200
+        etag = first.headers.get("ETag")
+        assert etag and etag.startswith('"'), "Strong ETag expected"
+
+        second = requests.get(f"{BASE_URL}{path}", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers.get("ETag") == etag
+
+    def test_etag_varies_with_query(self):
+        """Verify filtered and unfiltered lists do not share an ETag"""
+        all_items = requests.get(f"{BASE_URL}/api/content")
+        active = requests.get(f"{BASE_URL}/api/content?active_only=true")
+        assert all_items.headers["ETag"] != active.headers["ETag"]
+
+    def test_write_changes_etag(self, auth_headers):
+        """Verify a create invalidates the previous ETag"""
+        etag = requests.get(f"{BASE_URL}/api/announcements").headers["ETag"]
+        created = requests.post(f"{BASE_URL}/api/announcements",
+                                json={"title": "TEST_etag", "content": "TEST_etag"}, headers=auth_headers).json()
+        try:
+            response = requests.get(f"{BASE_URL}/api/announcements", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+        finally:
+            requests.delete(f"{BASE_URL}/api/announcements/{created['id']}", headers=auth_headers)
+
+
+class TestDisplayStream:
+    """Server-Sent Events push channel tests"""
+
+    def test_stream_starts_with_snapshot(self):
+        """Verify /api/display/stream sends the full snapshot on connect"""
+        with requests.get(f"{BASE_URL}/api/display/stream", stream=True, timeout=30) as response:
+            assert response.status_code == 200
+            assert response.headers["Content-Type"].startswith("text/event-stream")
+
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line.split(":", 1)[1].strip()
+                if line.startswith("data:"):
+                    assert event == "snapshot"
+                    assert '"prayer_times"' in line
+                    break
+
+
+class TestUpstreamHealth:
+    """Circuit breaker state exposed on the health check"""
+
+    def test_health_reports_hisabmu_breaker(self):
+        """Verify /api/health includes the hisabmu circuit breaker"""
+        response = requests.get(f"{BASE_URL}/api/health")
+        assert response.status_code == 200
+
+        breaker = response.json()["upstreams"]["hisabmu"]
+        assert breaker["state"] in ("closed", "open", "half_open")
+        assert 0 < breaker["timeout_seconds"] <= 30
+
+
+class TestUploads:
+    """Content-addressed upload storage"""
+
+    def test_upload_returns_hashed_url(self, auth_headers):
+        """Verify uploads are stored by sha256 and not returned as data URLs"""
+        payload = b"GIF89a" + os.urandom(32)
+        files = {"file": ("pixel.gif", payload, "image/gif")}
+        response = requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["url"] == f"/api/uploads/{hashlib.sha256(payload).hexdigest()}.gif"
+        assert not data["url"].startswith("data:")
+
+    def test_same_content_is_deduplicated(self, auth_headers):
+        """Verify uploading identical bytes twice yields the same file"""
+        payload = PNG_HEADER + os.urandom(64)
+        urls = [
+            requests.post(f"{BASE_URL}/api/upload", files={"file": (name, payload, "image/png")},
+                          headers=auth_headers).json()["url"]
+            for name in ("a.png", "b.png")
+        ]
+        assert urls[0] == urls[1]
+
+    def test_served_with_immutable_cache(self, auth_headers):
+        """Verify uploaded files are served with long-lived immutable caching"""
+        payload = PNG_HEADER + os.urandom(64)
+        url = requests.post(f"{BASE_URL}/api/upload", files={"file": ("x.png", payload, "image/png")},
+                            headers=auth_headers).json()["url"]
+
+        response = requests.get(f"{BASE_URL}{url}")
+        assert response.status_code == 200
+        assert response.content == payload
+        assert "immutable" in response.headers["Cache-Control"]
+
+    def test_unknown_upload_is_404(self):
+        """Verify invalid or missing names are rejected"""
+        assert requests.get(f"{BASE_URL}/api/uploads/{'0' * 64}.png").status_code == 404
+        assert requests.get(f"{BASE_URL}/api/uploads/..%2Fserver.py").status_code == 404
+
+    def test_type_is_sniffed_not_trusted(self, auth_headers):
+        """Verify the stored type comes from the file content, not the client"""
+        payload = PNG_HEADER + os.urandom(64)
+        response = requests.post(f"{BASE_URL}/api/upload", files={"file": ("photo.jpg", payload, "image/jpeg")},
+                                 headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["content_type"] == "image/png"
+        assert response.json()["url"].endswith(".png")
+
+    def test_unknown_type_is_rejected(self, auth_headers):
+        """Verify files that are not media are refused with 415"""
+        files = {"file": ("script.png", b"#!/bin/sh\necho hi\n", "image/png")}
+        response = requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers)
+        assert response.status_code == 415
+
+    def test_non_mp4_ftyp_is_rejected(self, auth_headers):
+        """Verify HEIC images are not stored and served as MP4 video"""
+        payload = b"\x00\x00\x00\x18ftypheic" + os.urandom(64)
+        files = {"file": ("photo.mp4", payload, "video/mp4")}
+        response = requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers)
+        assert response.status_code == 415
+
+
+class TestResumableUpload:
+    """Chunked upload sessions"""
+
+    def test_chunked_upload_and_resume(self, auth_headers):
+        """Verify chunks can be sent separately, with a wrong offset answered by the real one"""
+        payload = PNG_HEADER + os.urandom(3000)
+        session = requests.post(f"{BASE_URL}/api/upload/sessions", json={"filename": "big.png", "size": len(payload)},
+                                headers=auth_headers).json()
+        assert session["offset"] == 0
+
+        first = requests.put(f"{BASE_URL}/api/upload/sessions/{session['id']}", params={"offset": 0},
+                             data=payload[:1000], headers=auth_headers)
+        assert first.json()["offset"] == 1000
+
+        stale = requests.put(f"{BASE_URL}/api/upload/sessions/{session['id']}", params={"offset": 0},
+                             data=payload[:1000], headers=auth_headers)
+        assert stale.status_code == 409
+        assert stale.headers["Upload-Offset"] == "1000"
+
+        state = requests.get(f"{BASE_URL}/api/upload/sessions/{session['id']}", headers=auth_headers).json()
+        requests.put(f"{BASE_URL}/api/upload/sessions/{session['id']}", params={"offset": state["offset"]},
+                     data=payload[state["offset"]:], headers=auth_headers)
+
+        done = requests.post(f"{BASE_URL}/api/upload/sessions/{session['id']}/complete", headers=auth_headers)
+        assert done.status_code == 200
+        assert done.json()["url"] == f"/api/uploads/{hashlib.sha256(payload).hexdigest()}.png"
+
+    def test_concurrent_chunks_at_same_offset(self, auth_headers):
+        """Verify two PUTs racing for one offset leave a single, uncorrupted chunk"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        first, second = PNG_HEADER + b"A" * 200000, PNG_HEADER + b"B" * 200000
+        session = requests.post(f"{BASE_URL}/api/upload/sessions", json={"filename": "race.png", "size": len(first)},
+                                headers=auth_headers).json()
+        url = f"{BASE_URL}/api/upload/sessions/{session['id']}"
+        with ThreadPoolExecutor(2) as pool:
+            responses = list(pool.map(
+                lambda body: requests.put(url, params={"offset": 0}, data=body, headers=auth_headers), (first, second)
+            ))
+        assert sorted(r.status_code for r in responses) == [200, 409]
+
+        done = requests.post(f"{url}/complete", headers=auth_headers).json()
+        winner = first if responses[0].status_code == 200 else second
+        assert done["url"] == f"/api/uploads/{hashlib.sha256(winner).hexdigest()}.png"
+
+    def test_incomplete_upload_cannot_complete(self, auth_headers):
+        """Verify completing before all bytes arrived is refused"""
+        session = requests.post(f"{BASE_URL}/api/upload/sessions", json={"filename": "a.png", "size": 100},
+                                headers=auth_headers).json()
+        response = requests.post(f"{BASE_URL}/api/upload/sessions/{session['id']}/complete", headers=auth_headers)
+        assert response.status_code == 409
+        requests.delete(f"{BASE_URL}/api/upload/sessions/{session['id']}", headers=auth_headers)
+
+    def test_oversized_session_is_rejected(self, auth_headers):
+        """Verify the size limit applies before any bytes are sent"""
+        response = requests.post(f"{BASE_URL}/api/upload/sessions",
+                                 json={"filename": "huge.mp4", "size": 100 * 1024 ** 3}, headers=auth_headers)
+        assert response.status_code == 413
+
+
+class TestImageVariants:
+    """WebP thumbnail / medium / display derivatives"""
+
+    def _upload_photo(self, auth_headers):
+        buffer = io.BytesIO()
+        Image.new("RGB", (2400, 1600), tuple(os.urandom(3))).save(buffer, "JPEG")
+        files = {"file": ("photo.jpg", buffer.getvalue(), "image/jpeg")}
+        response = requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_upload_returns_variant_urls(self, auth_headers):
+        """Verify each variant is served as a downscaled WebP"""
+        uploaded = self._upload_photo(auth_headers)
+        assert set(uploaded["variants"]) == {"thumb", "medium", "display"}
+
+        response = requests.get(f"{BASE_URL}{uploaded['variants']['thumb']}")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == "image/webp"
+        assert max(Image.open(io.BytesIO(response.content)).size) <= 320
+
+    def test_gallery_list_includes_variants(self, auth_headers):
+        """Verify list endpoints return variant URLs next to the original"""
+        uploaded = self._upload_photo(auth_headers)
+        item = requests.post(f"{BASE_URL}/api/gallery", json={"title": "TEST_variants", "image_url": uploaded["url"]},
+                             headers=auth_headers).json()
+        try:
+            items = requests.get(f"{BASE_URL}/api/gallery").json()
+            listed = next(i for i in items if i["id"] == item["id"])
+            assert listed["image_variants"] == uploaded["variants"]
+        finally:
+            requests.delete(f"{BASE_URL}/api/gallery/{item['id']}", headers=auth_headers)
+
+    def test_external_urls_have_no_variants(self, auth_headers):
+        """Verify images hosted elsewhere are passed through untouched"""
+        item = requests.post(f"{BASE_URL}/api/gallery",
+                             json={"title": "TEST_external", "image_url": "https://example.com/a.jpg"},
+                             headers=auth_headers).json()
+        try:
+            items = requests.get(f"{BASE_URL}/api/gallery").json()
+            assert next(i for i in items if i["id"] == item["id"])["image_variants"] is None
+        finally:
+            requests.delete(f"{BASE_URL}/api/gallery/{item['id']}", headers=auth_headers)
+
+    def test_variant_of_missing_source_is_404(self):
+        """Verify a variant of an unknown hash is a plain 404"""
+        response = requests.get(f"{BASE_URL}/api/uploads/{'0' * 64}-thumb.webp")
+        assert response.status_code == 404
+
+
+class TestMediaServing:
+    """Range requests and validators on /api/uploads"""
+
+    def _upload_video(self, auth_headers):
+        payload = b"\x00\x00\x00\x18ftypisom" + os.urandom(50000)
+        files = {"file": ("promo.mp4", payload, "video/mp4")}
+        return payload, requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers).json()["url"]
+
+    def test_range_request(self, auth_headers):
+        """Verify a byte range is answered with 206 and only those bytes"""
+        payload, url = self._upload_video(auth_headers)
+        response = requests.get(f"{BASE_URL}{url}", headers={"Range": "bytes=1000-1999"})
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == f"bytes 1000-1999/{len(payload)}"
+        assert response.content == payload[1000:2000]
+        assert response.headers["Accept-Ranges"] == "bytes"
+
+    def test_etag_is_content_hash(self, auth_headers):
+        """Verify the ETag is the sha256 and revalidation returns 304"""
+        payload, url = self._upload_video(auth_headers)
+        response = requests.get(f"{BASE_URL}{url}")
+        assert response.headers["ETag"] == f'"{hashlib.sha256(payload).hexdigest()}"'
+        assert "Last-Modified" in response.headers
+
+        revalidated = requests.get(f"{BASE_URL}{url}", headers={"If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+        since = requests.get(f"{BASE_URL}{url}", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+        assert since.status_code == 304
+
+    def test_uploads_never_render_as_documents(self, auth_headers):
+        """Verify nosniff and a sandboxing CSP on every upload, and that SVG is a download"""
+        _, url = self._upload_video(auth_headers)
+        response = requests.get(f"{BASE_URL}{url}")
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert "sandbox" in response.headers["Content-Security-Policy"]
+        assert "Content-Disposition" not in response.headers
+
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        files = {"file": ("logo.svg", svg, "image/svg+xml")}
+        svg_url = requests.post(f"{BASE_URL}/api/upload", files=files, headers=auth_headers).json()["url"]
+        response = requests.get(f"{BASE_URL}{svg_url}")
+        assert response.headers["Content-Disposition"].startswith("attachment")
+        assert "sandbox" in response.headers["Content-Security-Policy"]
+
+
+class TestZISRollups:
+    """zis_monthly_rollups kept in step with ZIS and expenditure writes"""
+
+    YEAR = 2093
+
+    def _summary(self, month):
+        return requests.get(f"{BASE_URL}/api/zis/summary", params={"month": month, "year": self.YEAR}).json()
+
+    def test_create_update_delete_moves_totals(self, auth_headers):
+        """Verify summary and chart follow a report through create, update and delete"""
+        before = self._summary(3)["infaq"]
+        report = requests.post(f"{BASE_URL}/api/zis", json={"type": "infaq", "amount": 125000, "date": f"{self.YEAR}-03-10"},
+                               headers=auth_headers).json()
+        try:
+            after_create = self._summary(3)["infaq"]
+            assert after_create["total"] == before["total"] + 125000
+            assert after_create["count"] == before["count"] + 1
+
+            requests.put(f"{BASE_URL}/api/zis/{report['id']}", json={"amount": 50000, "date": f"{self.YEAR}-04-01"},
+                         headers=auth_headers)
+            assert self._summary(3)["infaq"] == before
+            chart = requests.get(f"{BASE_URL}/api/zis/monthly-chart", params={"year": self.YEAR}).json()
+            assert chart[3]["infaq"] >= 50000
+        finally:
+            requests.delete(f"{BASE_URL}/api/zis/{report['id']}", headers=auth_headers)
+        assert self._summary(4)["infaq"]["count"] == 0
+
+    def test_expenditure_summary_uses_rollups(self, auth_headers):
+        """Verify expenditure categories follow writes"""
+        item = requests.post(f"{BASE_URL}/api/expenditure",
+                             json={"category": "dakwah", "amount": 75000, "date": f"{self.YEAR}-05-02"},
+                             headers=auth_headers).json()
+        try:
+            summary = requests.get(f"{BASE_URL}/api/expenditure/summary", params={"month": 5, "year": self.YEAR}).json()
+            assert summary["categories"]["dakwah"]["total"] >= 75000
+        finally:
+            requests.delete(f"{BASE_URL}/api/expenditure/{item['id']}", headers=auth_headers)
+        summary = requests.get(f"{BASE_URL}/api/expenditure/summary", params={"month": 5, "year": self.YEAR}).json()
+        assert "dakwah" not in summary["categories"]
+
+    def test_rebuild_finds_no_drift(self, auth_headers):
+        """Verify the rebuild command reconciles and reports nothing to fix after normal writes"""
+        assert requests.post(f"{BASE_URL}/api/zis/rollups/rebuild").status_code in [401, 403]
+        requests.post(f"{BASE_URL}/api/zis/rollups/rebuild", headers=auth_headers)
+        response = requests.post(f"{BASE_URL}/api/zis/rollups/rebuild", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["corrected"] == 0
+
+
+class TestFinanceDashboard:
+    """/api/finance/dashboard"""
+
+    def test_dashboard_matches_individual_endpoints(self, auth_headers):
+        """Verify the combined payload equals the separate summary/chart endpoints"""
+        params = {"month": 3, "year": 2026}
+        response = requests.get(f"{BASE_URL}/api/finance/dashboard", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["zis"]["summary"] == requests.get(f"{BASE_URL}/api/zis/summary", params=params).json()
+        assert data["zis"]["chart"] == requests.get(f"{BASE_URL}/api/zis/monthly-chart", params={"year": 2026}).json()
+        assert data["expenditure"]["summary"] == requests.get(f"{BASE_URL}/api/expenditure/summary", params=params).json()
+        assert len(data["zis"]["reports"]) == len(requests.get(f"{BASE_URL}/api/zis", params=params).json())
+
+    def test_write_invalidates_dashboard(self, auth_headers):
+        """Verify a new report is visible in the next dashboard read"""
+        params = {"month": 6, "year": 2094}
+        before = requests.get(f"{BASE_URL}/api/finance/dashboard", params=params, headers=auth_headers).json()
+        report = requests.post(f"{BASE_URL}/api/zis", json={"type": "zakat", "amount": 10000, "date": "2094-06-15"},
+                               headers=auth_headers).json()
+        try:
+            after = requests.get(f"{BASE_URL}/api/finance/dashboard", params=params, headers=auth_headers).json()
+            assert after["zis"]["summary"]["zakat"]["count"] == before["zis"]["summary"]["zakat"]["count"] + 1
+            assert any(r["id"] == report["id"] for r in after["zis"]["reports"])
+        finally:
+            requests.delete(f"{BASE_URL}/api/zis/{report['id']}", headers=auth_headers)
+
+
+class TestLedgerPagination:
+    """Cursor pagination on /api/zis and /api/expenditure"""
+
+    YEAR = 2095
+
+    @pytest.fixture
+    def reports(self, auth_headers):
+        created = [
+            requests.post(f"{BASE_URL}/api/zis", json={
+                "type": "infaq", "amount": amount, "date": f"{self.YEAR}-01-0{day}", "donor_name": donor,
+            }, headers=auth_headers).json()
+            for day, amount, donor in [(1, 1000, "Hamba Allah"), (2, 2000, "Pak Budi"), (2, 3000, "Bu Siti")]
+        ]
+        yield created
+        for report in created:
+            requests.delete(f"{BASE_URL}/api/zis/{report['id']}", headers=auth_headers)
+
+    def test_pages_cover_every_row_once(self, reports):
+        """Verify following the cursor walks all rows in (date, id) order without overlap"""
+        seen = []
+        params = {"year": self.YEAR, "limit": 2}
+        while True:
+            response = requests.get(f"{BASE_URL}/api/zis", params=params)
+            assert response.status_code == 200
+            assert len(response.json()) <= 2
+            seen.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            params["after"] = cursor
+
+        assert sorted(r["id"] for r in seen) == sorted(r["id"] for r in reports)
+        keys = [(r["date"], r["id"]) for r in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_filters_and_projection(self, reports):
+        """Verify donor/amount/date filters and that only table columns are returned"""
+        by_donor = requests.get(f"{BASE_URL}/api/zis", params={"year": self.YEAR, "donor": "budi"}).json()
+        assert [r["amount"] for r in by_donor] == [2000]
+        assert set(by_donor[0]) <= {"id", "date", "type", "donor_name", "amount", "description"}
+
+        by_amount = requests.get(f"{BASE_URL}/api/zis", params={"year": self.YEAR, "min_amount": 1500}).json()
+        assert sorted(r["amount"] for r in by_amount) == [2000, 3000]
+
+        by_date = requests.get(f"{BASE_URL}/api/zis", params={
+            "start_date": f"{self.YEAR}-01-01", "end_date": f"{self.YEAR}-01-01",
+        }).json()
+        assert [r["amount"] for r in by_date] == [1000]
+
+    def test_invalid_cursor(self):
+        """Verify a malformed cursor is a 400, not a server error"""
+        response = requests.get(f"{BASE_URL}/api/expenditure", params={"after": "!!!"})
+        assert response.status_code == 400
+
+
+class TestLedgerExport:
+    """CSV / XLSX downloads of /api/zis/export and /api/expenditure/export"""
+
+    YEAR = 2094
+
+    @pytest.fixture
+    def reports(self, auth_headers):
+        created = [
+            requests.post(f"{BASE_URL}/api/zis", json={
+                "type": "zakat", "amount": amount, "date": f"{self.YEAR}-03-0{day}", "donor_name": donor,
+            }, headers=auth_headers).json()
+            for day, amount, donor in [(2, 2500, "Pak Budi"), (1, 1500, None)]
+        ]
+        yield created
+        for report in created:
+            requests.delete(f"{BASE_URL}/api/zis/{report['id']}", headers=auth_headers)
+
+    def test_csv_rows_oldest_first(self, reports, auth_headers):
+        """Verify the CSV has a header row and one row per report in date order"""
+        response = requests.get(f"{BASE_URL}/api/zis/export", params={"year": self.YEAR, "format": "csv"},
+                                headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/csv")
+        assert f'filename="zis-{self.YEAR}.csv"' in response.headers["Content-Disposition"]
+
+        lines = response.content.decode("utf-8-sig").splitlines()
+        assert lines[0] == "Tanggal,Jenis,Donatur,Jumlah (Rp),Keterangan"
+        assert lines[1:] == [f"{self.YEAR}-03-01,Zakat,Anonim,1500,", f"{self.YEAR}-03-02,Zakat,Pak Budi,2500,"]
+
+    def test_xlsx_download(self, reports, auth_headers):
+        """Verify the XLSX export is a spreadsheet (zip container)"""
+        response = requests.get(f"{BASE_URL}/api/zis/export", params={"year": self.YEAR, "format": "xlsx"},
+                                headers=auth_headers)
+        assert response.status_code == 200
+        assert "spreadsheetml" in response.headers["Content-Type"]
+        assert response.content[:2] == b"PK"
+
+    def test_expenditure_csv_header(self, auth_headers):
+        """Verify the expenditure export works on an empty period"""
+        response = requests.get(f"{BASE_URL}/api/expenditure/export", params={"year": self.YEAR},
+                                headers=auth_headers)
+        assert response.status_code == 200
+        assert response.content.decode("utf-8-sig").strip() == "Tanggal,Kategori,Jumlah (Rp),Keterangan"
+
+    def test_requires_auth_and_known_format(self, auth_headers):
+        """Verify exports need a login and reject unknown formats"""
+        assert requests.get(f"{BASE_URL}/api/zis/export").status_code in (401, 403)
+        response = requests.get(f"{BASE_URL}/api/zis/export", params={"format": "pdf"}, headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestSheetsSyncJobs:
+    """Google Sheets sync queued as a background job"""
+
+    def test_sync_returns_job_immediately(self, auth_headers):
+        """Verify the sync endpoint queues a job (or rejects a missing config) instead of blocking"""
+        response = requests.post(f"{BASE_URL}/api/zis/sync-to-sheets", headers=auth_headers)
+        if response.status_code == 400:
+            pytest.skip("Google Sheets not configured")
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ("queued", "running")
+
+        # While it is active, asking again returns the same job
+        again = requests.post(f"{BASE_URL}/api/zis/sync-to-sheets", headers=auth_headers).json()
+        if again["status"] in ("queued", "running"):
+            assert again["id"] == job["id"]
+
+        deadline = time.time() + 120
+        while job["status"] in ("queued", "running") and time.time() < deadline:
+            time.sleep(1)
+            job = requests.get(f"{BASE_URL}/api/zis/sync-jobs/{job['id']}", headers=auth_headers).json()
+        assert job["status"] in ("done", "failed")
+        if job["status"] == "done":
+            assert {"zis_rows", "expenditure_rows", "synced_at"} <= set(job["result"])
+        else:
+            assert job["error"]
+
+    def test_job_listing(self, auth_headers):
+        """Verify recent jobs are listed and unknown jobs are a 404"""
+        response = requests.get(f"{BASE_URL}/api/zis/sync-jobs", headers=auth_headers)
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+
+        response = requests.get(f"{BASE_URL}/api/zis/sync-jobs/does-not-exist", headers=auth_headers)
+        assert response.status_code == 404
+
+    def test_requires_auth(self):
+        """Verify job status needs a login"""
+        assert requests.get(f"{BASE_URL}/api/zis/sync-jobs").status_code in (401, 403)
@@ -0,0 +1,92 @@
+"""
+TTLCache loads racing with writes:
+- a load that was in flight when the key was invalidated is returned but not cached
+- a write-through value is not overwritten by a load that read the old document
+- per-key load locks do not outlive the load
+"""
+
+import asyncio
+
+from cache import TTLCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestGetOrLoad:
+
+    def test_load_overlapping_clear_is_not_cached(self):
+        """Verify a read started before a finance write is not cached after the write clears the cache"""
+        async def scenario():
+            cache = TTLCache()
+            reading = asyncio.Event()
+            release = asyncio.Event()
+
+            async def stale_loader():
+                reading.set()
+                await release.wait()
+                return "before write"
+
+            load = asyncio.create_task(cache.get_or_load(("2026", "10"), stale_loader))
+            await reading.wait()
+            cache.clear()
+            release.set()
+            assert await load == "before write"
+            return cache.get(("2026", "10"))
+
+        assert run(scenario()) is None
+
+    def test_load_overlapping_write_through_keeps_new_value(self):
+        """Verify a settings read in flight during a PUT cannot overwrite the write-through value"""
+        async def scenario():
+            cache = TTLCache()
+            reading = asyncio.Event()
+            release = asyncio.Event()
+
+            async def stale_loader():
+                reading.set()
+                await release.wait()
+                return {"name": "old"}
+
+            load = asyncio.create_task(cache.get_or_load("mosque_identity", stale_loader))
+            await reading.wait()
+            cache.set("mosque_identity", {"name": "new"})
+            release.set()
+            assert await load == {"name": "old"}
+            return cache.get("mosque_identity")
+
+        assert run(scenario()) == {"name": "new"}
+
+    def test_load_after_clear_is_cached(self):
+        """Verify a load that starts after the write fills the cache as usual"""
+        async def scenario():
+            cache = TTLCache()
+            cache.clear()
+
+            async def loader():
+                return 42
+
+            await cache.get_or_load(("2026", "10"), loader)
+            return cache.get(("2026", "10"))
+
+        assert run(scenario()) == 42
+
+    def test_locks_released_after_load(self):
+        """Verify concurrent misses share one load and leave no lock behind"""
+        async def scenario():
+            cache = TTLCache()
+            calls = []
+
+            async def loader():
+                calls.append(1)
+                await asyncio.sleep(0)
+                return "value"
+
+            results = await asyncio.gather(*(cache.get_or_load(month, loader) for month in [1, 1, 1, 2]))
+            return cache, calls, results
+
+        cache, calls, results = run(scenario())
+        assert results == ["value"] * 4
+        assert len(calls) == 2
+        assert cache._locks == {}
@@ -19,6 +19,7 @@ import { AuthProvider } from "@/context/AuthContext";
 import { ProtectedRoute } from "@/components/ProtectedRoute";
 import { useEffect } from "react";
 import { mosqueAPI } from "@/lib/api";
+import { loadKHGTCalendar } from "@/lib/khgtCalendar";
 
 // Favicon & Title Updater
 function FaviconUpdater() {
@@ -47,6 +48,8 @@ function FaviconUpdater() {
             }
         };
         updateFaviconAndTitle();
+        // Tabel KHGT dari server, dipakai oleh semua halaman yang menampilkan tanggal Hijriyah
+        loadKHGTCalendar();
     }, []);
 
     return null;
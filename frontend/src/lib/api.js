@@ -11,18 +11,45 @@ const api = axios.create({
     },
 });
 
+// Uploads are stored as backend-relative paths (/api/uploads/<sha256>.<ext>)
+const UPLOAD_PATH = '/api/uploads/';
+const UPLOAD_URL = `${BACKEND_URL}${UPLOAD_PATH}`;
+
+const mapStrings = (value, fn) => {
+    if (typeof value === 'string') return fn(value);
+    if (Array.isArray(value)) return value.map((item) => mapStrings(item, fn));
+    if (value && typeof value === 'object' && value.constructor === Object) {
+        return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, mapStrings(item, fn)]));
+    }
+    return value;
+};
+
+// Absolute URL for an uploaded file (the backend may live on another origin)
+export const mediaUrl = (url) => (url && url.startsWith(UPLOAD_PATH) ? `${BACKEND_URL}${url}` : url);
+// Pick a server-generated WebP size (thumb / medium / display), falling back to the original
+export const imageVariant = (url, variants, size) => variants?.[size] || url;
+export const resolveMediaUrls = (data) => (BACKEND_URL ? mapStrings(data, mediaUrl) : data);
+const relativeMediaUrls = (data) => (BACKEND_URL
+    ? mapStrings(data, (url) => (url.startsWith(UPLOAD_URL) ? url.slice(BACKEND_URL.length) : url))
+    : data);
+
 // Add auth token to requests
 api.interceptors.request.use((config) => {
     const token = localStorage.getItem('auth_token');
     if (token) {
         config.headers.Authorization = `Bearer ${token}`;
     }
+    // Keep stored upload URLs independent of where the backend is hosted
+    config.data = relativeMediaUrls(config.data);
     return config;
 });
 
 // Handle auth errors
 api.interceptors.response.use(
-    (response) => response,
+    (response) => {
+        response.data = resolveMediaUrls(response.data);
+        return response;
+    },
     (error) => {
         if (error.response?.status === 401) {
             localStorage.removeItem('auth_token');
@@ -52,6 +79,20 @@ export const mosqueAPI = {
 export const prayerAPI = {
     getTimes: (date) => api.get('/prayer-times', { params: { date } }),
     getMonthly: (month, year) => api.get('/prayer-times/monthly', { params: { month, year } }),
+    getRange: (start, end) => api.get('/prayer-times/range', { params: { start, end } }),
+};
+
+// Hijri Calendar API (KHGT, computed on the server)
+export const hijriAPI = {
+    getDate: (date) => api.get('/hijri', { params: { date } }),
+    getRange: (start, end) => api.get('/hijri/range', { params: { start, end } }),
+};
+
+// Display API (TV clients)
+export const displayAPI = {
+    bootstrap: () => api.get('/display/bootstrap'),
+    timeline: (date) => api.get('/display/timeline', { params: { date } }),
+    streamUrl: `${API_BASE}/display/stream`,
 };
 
 // Settings API
@@ -88,8 +129,35 @@ export const runningTextAPI = {
 };
 
 // Upload API
+// Files above this size go through a resumable chunked upload session
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const CHUNK_RETRIES = 3;
+
+const uploadChunked = async (file) => {
+    const { data: session } = await api.post('/upload/sessions', { filename: file.name, size: file.size });
+    let { offset } = session;
+    let failures = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + session.chunk_size);
+        try {
+            const res = await api.put(`/upload/sessions/${session.id}`, chunk, {
+                params: { offset },
+                headers: { 'Content-Type': 'application/octet-stream' },
+            });
+            offset = res.data.offset;
+            failures = 0;
+        } catch (error) {
+            if (++failures > CHUNK_RETRIES || [413, 404].includes(error.response?.status)) throw error;
+            // Resume from whatever the server actually stored
+            offset = (await api.get(`/upload/sessions/${session.id}`)).data.offset;
+        }
+    }
+    return api.post(`/upload/sessions/${session.id}/complete`);
+};
+
 export const uploadAPI = {
     upload: (file) => {
+        if (file.size > CHUNKED_UPLOAD_THRESHOLD) return uploadChunked(file);
         const formData = new FormData();
         formData.append('file', file);
         return api.post('/upload', formData, {
@@ -105,28 +173,39 @@ export const statsAPI = {
 
 // ZIS (Zakat, Infaq, Shodaqoh) API
 export const zisAPI = {
-    getAll: (month, year, type) => api.get('/zis', { params: { month, year, type } }),
+    // Newest first, one page at a time; the next page cursor comes back in the X-Next-Cursor header
+    getAll: (month, year, type, after) => api.get('/zis', { params: { month, year, type, after } }),
     getSummary: (month, year) => api.get('/zis/summary', { params: { month, year } }),
     getMonthlyChart: (year) => api.get('/zis/monthly-chart', { params: { year } }),
     create: (data) => api.post('/zis', data),
     update: (id, data) => api.put(`/zis/${id}`, data),
     delete: (id) => api.delete(`/zis/${id}`),
+    // format: 'csv' | 'xlsx'; whole period, streamed by the server
+    export: (format, month, year) => api.get('/zis/export', { params: { format, month, year }, responseType: 'blob' }),
 };
 
 // Expenditure (Pengeluaran Dana) API
 export const expenditureAPI = {
-    getAll: (month, year) => api.get('/expenditure', { params: { month, year } }),
+    getAll: (month, year, after) => api.get('/expenditure', { params: { month, year, after } }),
     getSummary: (month, year) => api.get('/expenditure/summary', { params: { month, year } }),
     create: (data) => api.post('/expenditure', data),
     update: (id, data) => api.put(`/expenditure/${id}`, data),
     delete: (id) => api.delete(`/expenditure/${id}`),
+    export: (format, month, year) => api.get('/expenditure/export', { params: { format, month, year }, responseType: 'blob' }),
+};
+
+// Finance dashboard (ZIS + expenditure reports, summaries and chart in one call)
+export const financeAPI = {
+    dashboard: (month, year) => api.get('/finance/dashboard', { params: { month, year } }),
 };
 
 // Google Sheets API
 export const sheetsAPI = {
     getConfig: () => api.get('/zis/sheets-config'),
     saveConfig: (data) => api.post('/zis/sheets-config', data),
-    sync: () => api.post('/zis/sync-to-sheets'),
+    // Queues a background job; poll job(id) for progress
+    sync: (full = false) => api.post('/zis/sync-to-sheets', null, { params: { full } }),
+    job: (id) => api.get(`/zis/sync-jobs/${id}`),
 };
 
 // Announcements API
@@ -1,18 +1,74 @@
-// Konversi tanggal Hijriyah berdasarkan KHGT Muhammadiyah 1447 H
-// Data diambil dari https://hisabmu.com/khgt/
+// Konversi tanggal Hijriyah berdasarkan KHGT Muhammadiyah
+// Tabel lengkap (banyak tahun) dihitung server dan dimuat lewat loadKHGTCalendar();
+// tabel 1447 H di bawah hanya cadangan selama tabel server belum termuat.
+import { hijriAPI } from './api';
 
-// Tabel konversi bulan-bulan Hijriyah 1447 H ke Masehi
-// Sumber: https://hisabmu.com/khgt/ - KHGT Muhammadiyah
-// Tanggal 18/1 pada tabel jadwal sholat berarti 18 Feb = 1 Ramadan
+const DAY_MS = 24 * 60 * 60 * 1000;
+const toDayNumber = (year, month, day) => Math.floor(Date.UTC(year, month - 1, day) / DAY_MS);
+const isoToDayNumber = (iso) => {
+    const [year, month, day] = iso.split('-').map(Number);
+    return toDayNumber(year, month, day);
+};
+
+// Bulan-bulan dari /api/hijri/range, terurut menurut tanggal awal bulan
+let serverMonths = [];
+let serverMonthStarts = [];
+let loadingPromise = null;
+
+export function loadKHGTCalendar() {
+    if (!loadingPromise) {
+        loadingPromise = hijriAPI.getRange()
+            .then(({ data }) => {
+                serverMonths = data.months;
+                serverMonthStarts = data.months.map((month) => isoToDayNumber(month.start));
+            })
+            .catch((error) => {
+                console.error('Error loading KHGT calendar:', error);
+                loadingPromise = null;
+            });
+    }
+    return loadingPromise;
+}
+
+// Binary search bulan terakhir yang dimulai pada/sebelum dayNumber
+function lookupServerCalendar(dayNumber) {
+    let low = 0;
+    let high = serverMonthStarts.length - 1;
+    let found = -1;
+    while (low <= high) {
+        const mid = (low + high) >> 1;
+        if (serverMonthStarts[mid] <= dayNumber) {
+            found = mid;
+            low = mid + 1;
+        } else {
+            high = mid - 1;
+        }
+    }
+    if (found < 0) return null;
+
+    const month = serverMonths[found];
+    const day = dayNumber - serverMonthStarts[found] + 1;
+    if (day > month.length) return null;
+    return {
+        day,
+        month: month.month,
+        year: month.year,
+        monthName: month.month_name,
+        monthNameAr: month.month_name_ar,
+        isRamadan: month.is_ramadan,
+    };
+}
+
+// Tabel cadangan bulan-bulan Hijriyah 1447 H ke Masehi, dipakai sebelum /api/hijri/range termuat
+// Harus sama dengan tabel KHGT yang dihitung server (backend/hijri_calendar.py)
 export const KHGT_1447_CALENDAR = {
     // Format: [startGregorianDate, endGregorianDate] (inclusive)
-    // Berdasarkan hisabmu.com/khgt: 1 Ramadan 1447 = 18 Feb 2026
-    1: { name: 'Muharram', nameAr: 'محرم', start: '2025-06-27', end: '2025-07-26' },
-    2: { name: 'Shafar', nameAr: 'صفر', start: '2025-07-27', end: '2025-08-24' },
-    3: { name: 'Rabiul Awal', nameAr: 'ربيع الأول', start: '2025-08-25', end: '2025-09-23' },
-    4: { name: 'Rabiul Akhir', nameAr: 'ربيع الآخر', start: '2025-09-24', end: '2025-10-22' },
-    5: { name: 'Jumadil Awal', nameAr: 'جمادى الأولى', start: '2025-10-23', end: '2025-11-21' },
-    6: { name: 'Jumadil Akhir', nameAr: 'جمادى الآخرة', start: '2025-11-22', end: '2025-12-20' },
+    1: { name: 'Muharram', nameAr: 'محرم', start: '2025-06-26', end: '2025-07-25' },
+    2: { name: 'Shafar', nameAr: 'صفر', start: '2025-07-26', end: '2025-08-23' },
+    3: { name: 'Rabiul Awal', nameAr: 'ربيع الأول', start: '2025-08-24', end: '2025-09-22' },
+    4: { name: 'Rabiul Akhir', nameAr: 'ربيع الآخر', start: '2025-09-23', end: '2025-10-22' },
+    5: { name: 'Jumadil Awal', nameAr: 'جمادى الأولى', start: '2025-10-23', end: '2025-11-20' },
+    6: { name: 'Jumadil Akhir', nameAr: 'جمادى الآخرة', start: '2025-11-21', end: '2025-12-20' },
     7: { name: 'Rajab', nameAr: 'رجب', start: '2025-12-21', end: '2026-01-19' },
     8: { name: 'Syakban', nameAr: 'شعبان', start: '2026-01-20', end: '2026-02-17' },
     9: { name: 'Ramadan', nameAr: 'رمضان', start: '2026-02-18', end: '2026-03-19' },
@@ -21,6 +77,23 @@ export const KHGT_1447_CALENDAR = {
     12: { name: 'Zulhijah', nameAr: 'ذو الحجة', start: '2026-05-18', end: '2026-06-15' },
 };
 
+export const KHGT_1448_CALENDAR = {
+    1: { name: 'Muharram', nameAr: 'محرم', start: '2026-06-16', end: '2026-07-14' },
+    2: { name: 'Shafar', nameAr: 'صفر', start: '2026-07-15', end: '2026-08-13' },
+    3: { name: 'Rabiul Awal', nameAr: 'ربيع الأول', start: '2026-08-14', end: '2026-09-11' },
+    4: { name: 'Rabiul Akhir', nameAr: 'ربيع الآخر', start: '2026-09-12', end: '2026-10-11' },
+    5: { name: 'Jumadil Awal', nameAr: 'جمادى الأولى', start: '2026-10-12', end: '2026-11-09' },
+    6: { name: 'Jumadil Akhir', nameAr: 'جمادى الآخرة', start: '2026-11-10', end: '2026-12-09' },
+    7: { name: 'Rajab', nameAr: 'رجب', start: '2026-12-10', end: '2027-01-08' },
+    8: { name: 'Syakban', nameAr: 'شعبان', start: '2027-01-09', end: '2027-02-07' },
+    9: { name: 'Ramadan', nameAr: 'رمضان', start: '2027-02-08', end: '2027-03-08' },
+    10: { name: 'Syawal', nameAr: 'شوال', start: '2027-03-09', end: '2027-04-07' },
+    11: { name: 'Zulkaidah', nameAr: 'ذو القعدة', start: '2027-04-08', end: '2027-05-06' },
+    12: { name: 'Zulhijah', nameAr: 'ذو الحجة', start: '2027-05-07', end: '2027-06-05' },
+};
+
+const FALLBACK_CALENDARS = { 1447: KHGT_1447_CALENDAR, 1448: KHGT_1448_CALENDAR };
+
 // Fungsi untuk menghitung tanggal Hijriyah KHGT dari tanggal Masehi
 // Menggunakan timezone WIB (UTC+7) untuk Indonesia
 export function getKHGTHijriDate(gregorianDate = new Date(), timezoneOffset = 7) {
@@ -32,43 +105,49 @@ export function getKHGTHijriDate(gregorianDate = new Date(), timezoneOffset = 7)
     const month = localTime.getMonth(); // 0-indexed
     const day = localTime.getDate();
     
+    if (serverMonthStarts.length) {
+        const fromServer = lookupServerCalendar(toDayNumber(year, month + 1, day));
+        if (fromServer) return fromServer;
+    }
+    
     // Buat tanggal untuk perbandingan (tanpa timezone issues)
     const targetDate = new Date(year, month, day, 12, 0, 0); // noon untuk avoid timezone issues
     
     // Cari bulan yang sesuai
-    for (const [monthNum, monthData] of Object.entries(KHGT_1447_CALENDAR)) {
-        const startParts = monthData.start.split('-').map(Number);
-        const endParts = monthData.end.split('-').map(Number);
+    for (const [hijriYear, calendar] of Object.entries(FALLBACK_CALENDARS)) {
+        for (const [monthNum, monthData] of Object.entries(calendar)) {
+            const startParts = monthData.start.split('-').map(Number);
+            const endParts = monthData.end.split('-').map(Number);
         
-        const startDate = new Date(startParts[0], startParts[1] - 1, startParts[2], 12, 0, 0);
-        const endDate = new Date(endParts[0], endParts[1] - 1, endParts[2], 12, 0, 0);
+            const startDate = new Date(startParts[0], startParts[1] - 1, startParts[2], 12, 0, 0);
+            const endDate = new Date(endParts[0], endParts[1] - 1, endParts[2], 12, 0, 0);
         
-        if (targetDate >= startDate && targetDate <= endDate) {
-            // Hitung hari ke berapa dalam bulan ini
-            // Gunakan kalkulasi yang lebih akurat
-            const diffTime = targetDate.getTime() - startDate.getTime();
-            const diffDays = Math.round(diffTime / (1000 * 60 * 60 * 24));
-            const dayInMonth = diffDays + 1; // +1 karena hari pertama adalah 1, bukan 0
+            if (targetDate >= startDate && targetDate <= endDate) {
+                // Hitung hari ke berapa dalam bulan ini
+                // Gunakan kalkulasi yang lebih akurat
+                const diffTime = targetDate.getTime() - startDate.getTime();
+                const diffDays = Math.round(diffTime / (1000 * 60 * 60 * 24));
+                const dayInMonth = diffDays + 1; // +1 karena hari pertama adalah 1, bukan 0
             
-            return {
-                day: dayInMonth,
-                month: parseInt(monthNum),
-                year: 1447,
-                monthName: monthData.name,
-                monthNameAr: monthData.nameAr,
-                isRamadan: parseInt(monthNum) === 9,
-            };
+                return {
+                    day: dayInMonth,
+                    month: parseInt(monthNum),
+                    year: parseInt(hijriYear),
+                    monthName: monthData.name,
+                    monthNameAr: monthData.nameAr,
+                    isRamadan: parseInt(monthNum) === 9,
+                };
+            }
         }
     }
     
     // Fallback untuk tahun 1446 H (sebelum 1447 H dimulai)
-    const muharram1447 = new Date('2025-06-27T00:00:00');
+    const muharram1447 = new Date('2025-06-26T00:00:00');
     if (targetDate < muharram1447) {
-        // Estimasi untuk 1446 H
-        const zulhijah1446End = new Date('2025-06-26T00:00:00');
+        // Zulhijah 1446 H berakhir sehari sebelum 1 Muharram 1447 H
         const zulhijah1446Start = new Date('2025-05-28T00:00:00');
         
-        if (targetDate >= zulhijah1446Start && targetDate <= zulhijah1446End) {
+        if (targetDate >= zulhijah1446Start) {
             const dayDiff = Math.floor((targetDate - zulhijah1446Start) / (1000 * 60 * 60 * 24)) + 1;
             return {
                 day: dayDiff,
@@ -81,28 +160,6 @@ export function getKHGTHijriDate(gregorianDate = new Date(), timezoneOffset = 7)
         }
     }
     
-    // Fallback untuk tahun 1448 H (setelah 1447 H berakhir)
-    const zulhijah1447End = new Date('2026-06-15T00:00:00');
-    if (targetDate > zulhijah1447End) {
-        const muharram1448Start = new Date('2026-06-16T00:00:00');
-        const dayDiff = Math.floor((targetDate - muharram1448Start) / (1000 * 60 * 60 * 24)) + 1;
-        
-        const monthNum = Math.floor((dayDiff - 1) / 30) + 1;
-        const dayInMonth = ((dayDiff - 1) % 30) + 1;
-        
-        const months = ['Muharram', 'Shafar', 'Rabiul Awal', 'Rabiul Akhir', 'Jumadil Awal', 'Jumadil Akhir', 'Rajab', 'Syakban', 'Ramadan', 'Syawal', 'Zulkaidah', 'Zulhijah'];
-        const monthsAr = ['محرم', 'صفر', 'ربيع الأول', 'ربيع الآخر', 'جمادى الأولى', 'جمادى الآخرة', 'رجب', 'شعبان', 'رمضان', 'شوال', 'ذو القعدة', 'ذو الحجة'];
-        
-        return {
-            day: dayInMonth,
-            month: monthNum,
-            year: 1448,
-            monthName: months[monthNum - 1] || 'Muharram',
-            monthNameAr: monthsAr[monthNum - 1] || 'محرم',
-            isRamadan: monthNum === 9,
-        };
-    }
-    
     // Default fallback
     return {
         day: 1,
@@ -145,13 +202,13 @@ export function getRamadanDay(date = new Date()) {
 // Daftar hari besar Islam dengan perhitungan KHGT 1447 H
 export function getIslamicEvents1447() {
     return [
-        { name: 'Tahun Baru Hijriyah 1447 H', date: '2025-06-27', hijri: '1 Muharram 1447 H' },
-        { name: 'Asyura', date: '2025-07-06', hijri: '10 Muharram 1447 H' },
-        { name: 'Maulid Nabi Muhammad SAW', date: '2025-09-06', hijri: '12 Rabiul Awal 1447 H' },
-        { name: 'Isra Mi\'raj', date: '2026-01-17', hijri: '27 Rajab 1447 H' },
-        { name: 'Nisfu Sya\'ban', date: '2026-02-04', hijri: '15 Syakban 1447 H' },
+        { name: 'Tahun Baru Hijriyah 1447 H', date: '2025-06-26', hijri: '1 Muharram 1447 H' },
+        { name: 'Asyura', date: '2025-07-05', hijri: '10 Muharram 1447 H' },
+        { name: 'Maulid Nabi Muhammad SAW', date: '2025-09-04', hijri: '12 Rabiul Awal 1447 H' },
+        { name: 'Isra Mi\'raj', date: '2026-01-16', hijri: '27 Rajab 1447 H' },
+        { name: 'Nisfu Sya\'ban', date: '2026-02-03', hijri: '15 Syakban 1447 H' },
         { name: 'Awal Ramadan 1447 H', date: '2026-02-18', hijri: '1 Ramadan 1447 H' },
-        { name: 'Nuzulul Quran', date: '2026-03-07', hijri: '17 Ramadan 1447 H' },
+        { name: 'Nuzulul Quran', date: '2026-03-06', hijri: '17 Ramadan 1447 H' },
         { name: 'Lailatul Qadr (malam 27)', date: '2026-03-16', hijri: '27 Ramadan 1447 H' },
         { name: 'Idul Fitri 1447 H', date: '2026-03-20', hijri: '1 Syawal 1447 H' },
         { name: 'Idul Adha 1447 H', date: '2026-05-27', hijri: '10 Zulhijah 1447 H' },
@@ -1,14 +1,13 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import Marquee from 'react-fast-marquee';
 import { Clock, MapPin, Bell, Calendar, ChevronRight } from 'lucide-react';
-import { prayerAPI, mosqueAPI, settingsAPI, contentAPI, specialEventAPI, runningTextAPI } from '../lib/api';
+import { displayAPI, resolveMediaUrls } from '../lib/api';
 import {
     formatTime,
     formatCountdown,
     getCurrentAndNextPrayer,
     parseTimeToday,
-    getTimeDiffSeconds,
     formatDateIndonesian,
     PRAYER_NAMES,
     playNotificationSound,
@@ -124,6 +123,18 @@ const ContentSlideshow = ({ contents }) => {
                             className="max-w-full max-h-full object-contain rounded-lg"
                         />
                     )}
+                    {current.type === 'video' && current.content_url && (
+                        // Served with Range + immutable caching, so the loop replays from the browser cache
+                        <video
+                            src={current.content_url}
+                            className="max-w-full max-h-full object-contain rounded-lg"
+                            autoPlay
+                            muted
+                            loop
+                            playsInline
+                            preload="auto"
+                        />
+                    )}
                     {current.type === 'announcement' && (
                         <div className="text-center p-8">
                             <h3 className="font-heading text-3xl lg:text-4xl text-gold-400 mb-4">{current.title}</h3>
@@ -364,46 +375,57 @@ export default function TVDisplay() {
     const [countdownSeconds, setCountdownSeconds] = useState(0);
     const [countdownMode, setCountdownMode] = useState('adzan'); // 'adzan', 'jeda_adzan', 'iqomah', 'sholat'
     const [countdownLabel, setCountdownLabel] = useState('');
-    const [soundsPlayed, setSoundsPlayed] = useState({
-        preAdzan: false,
-        adzan: false,
-        preIqamah: false,
-        iqamah: false,
-    });
+    const [timeline, setTimeline] = useState(null);
+    const lastTransitionRef = useRef(null);
     const [loading, setLoading] = useState(true);
 
+    // Apply (a subset of) the display payload sections
+    const applySections = useCallback((data) => {
+        if ('prayer_times' in data) setPrayerTimes(data.prayer_times);
+        if ('timeline' in data) setTimeline(data.timeline);
+        if ('mosque' in data) setMosqueIdentity(data.mosque);
+        if ('prayer_settings' in data) setPrayerSettings(data.prayer_settings);
+        if ('layout' in data) setLayoutSettings(data.layout);
+        if ('contents' in data) setContents(data.contents);
+        if ('special_events' in data) setAgendas(data.special_events);
+        if ('running_texts' in data) setRunningTexts(data.running_texts);
+    }, []);
+
     // Fetch all data
     const fetchData = useCallback(async () => {
         try {
-            const [prayerRes, mosqueRes, prayerSettingsRes, layoutRes, contentRes, agendaRes, textRes] = await Promise.all([
-                prayerAPI.getTimes(),
-                mosqueAPI.getIdentity(),
-                settingsAPI.getPrayer(),
-                settingsAPI.getLayout(),
-                contentAPI.getAll(true),
-                specialEventAPI.getAll(true, true),
-                runningTextAPI.getAll(true),
-            ]);
-
-            setPrayerTimes(prayerRes.data);
-            setMosqueIdentity(mosqueRes.data);
-            setPrayerSettings(prayerSettingsRes.data);
-            setLayoutSettings(layoutRes.data);
-            setContents(contentRes.data);
-            setAgendas(agendaRes.data);
-            setRunningTexts(textRes.data);
+            const { data } = await displayAPI.bootstrap();
+            applySections(data);
         } catch (error) {
             console.error('Error fetching data:', error);
         } finally {
             setLoading(false);
         }
-    }, []);
+    }, [applySections]);
 
     useEffect(() => {
         fetchData();
-        const interval = setInterval(fetchData, 5 * 60 * 1000);
-        return () => clearInterval(interval);
-    }, [fetchData]);
+
+        // Push updates: the server sends only the sections that changed
+        let source = null;
+        if (window.EventSource) {
+            source = new EventSource(displayAPI.streamUrl);
+            const onMessage = (event) => {
+                const data = JSON.parse(event.data);
+                applySections(resolveMediaUrls(data.sections || data));
+                setLoading(false);
+            };
+            source.addEventListener('snapshot', onMessage);
+            source.addEventListener('update', onMessage);
+        }
+
+        // Polling stays as a slow safety net (e.g. proxies that drop the stream)
+        const interval = setInterval(fetchData, (source ? 30 : 5) * 60 * 1000);
+        return () => {
+            clearInterval(interval);
+            if (source) source.close();
+        };
+    }, [fetchData, applySections]);
 
     // Update clock
     useEffect(() => {
@@ -413,111 +435,42 @@ export default function TVDisplay() {
         return () => clearInterval(timer);
     }, []);
 
-    // Calculate countdown with calibration settings
+    // Countdown from the server-built phase timeline (pre-adzan -> adzan -> iqomah -> sholat)
     useEffect(() => {
-        if (!prayerTimes || !prayerSettings) return;
-
-        const { nextPrayer, nextPrayerTime } = getCurrentAndNextPrayer(prayerTimes);
-        if (!nextPrayerTime || !nextPrayer) return;
-
-        // Get calibration for this prayer
-        const calibration = prayerSettings[`calibration_${nextPrayer}`] || {
-            pre_adzan: 1,
-            jeda_adzan: 3,
-            pre_iqamah: prayerSettings[`iqomah_${nextPrayer}`] || 10,
-            jeda_sholat: 10,
-        };
-
-        const diff = getTimeDiffSeconds(nextPrayerTime, currentTime);
-        const preAdzanSeconds = calibration.pre_adzan * 60;
-        const jedaAdzanSeconds = calibration.jeda_adzan * 60;
-        const preIqamahSeconds = calibration.pre_iqamah * 60;
-        const prayerName = PRAYER_NAMES[nextPrayer]?.id || nextPrayer;
-
-        // Timeline: PreAdzan -> Adzan -> JedaAdzan -> Iqamah -> Sholat
-
-        if (diff > preAdzanSeconds) {
-            // Before pre-adzan warning
-            setCountdownMode('adzan');
-            setCountdownSeconds(diff);
-            setCountdownLabel(`Menuju ${prayerName}`);
-
-            // Reset sounds for new prayer cycle - use callback to avoid stale closure
-            if (diff > preAdzanSeconds + 60) {
-                setSoundsPlayed(prev => {
-                    if (prev.preAdzan || prev.adzan || prev.preIqamah || prev.iqamah) {
-                        return { preAdzan: false, adzan: false, preIqamah: false, iqamah: false };
-                    }
-                    return prev;
-                });
-            }
-        } else if (diff > 0 && diff <= preAdzanSeconds) {
-            // Pre-adzan warning period
-            setCountdownMode('adzan');
-            setCountdownSeconds(diff);
-            setCountdownLabel(`⏰ ${prayerName} Sebentar Lagi`);
-
-            // Play pre-adzan sound once - use callback to check current state
-            if (prayerSettings.sound_pre_adzan !== false) {
-                setSoundsPlayed(prev => {
-                    if (!prev.preAdzan) {
-                        playNotificationSound(SOUND_TYPES.PRE_ADZAN);
-                        return { ...prev, preAdzan: true };
-                    }
-                    return prev;
-                });
-            }
-        } else if (diff <= 0 && diff > -jedaAdzanSeconds) {
-            // Adzan time / Jeda adzan
-            setCountdownMode('jeda_adzan');
-            setCountdownSeconds(jedaAdzanSeconds + diff);
-            setCountdownLabel(`🔊 Adzan ${prayerName}`);
-
-            // Play adzan sound once - use callback to check current state
-            if (prayerSettings.sound_adzan !== false) {
-                setSoundsPlayed(prev => {
-                    if (!prev.adzan) {
-                        playNotificationSound(SOUND_TYPES.ADZAN);
-                        return { ...prev, adzan: true };
-                    }
-                    return prev;
-                });
-            }
-        } else if (diff <= -jedaAdzanSeconds && diff > -(jedaAdzanSeconds + preIqamahSeconds)) {
-            // Iqamah countdown
-            const iqamahRemaining = preIqamahSeconds + jedaAdzanSeconds + diff;
-            setCountdownMode('iqomah');
-            setCountdownSeconds(Math.max(0, iqamahRemaining));
-            setCountdownLabel(`Iqomah ${prayerName}`);
-
-            // Play pre-iqamah sound when 1 minute left - use callback
-            if (iqamahRemaining <= 60 && iqamahRemaining > 58 && prayerSettings.sound_pre_iqamah !== false) {
-                setSoundsPlayed(prev => {
-                    if (!prev.preIqamah) {
-                        playNotificationSound(SOUND_TYPES.PRE_IQAMAH);
-                        return { ...prev, preIqamah: true };
-                    }
-                    return prev;
-                });
+        const transitions = timeline?.transitions;
+        if (!transitions?.length) return;
+
+        // Binary search for the last transition that has already started
+        const now = currentTime.getTime();
+        let low = 0;
+        let high = transitions.length - 1;
+        let index = -1;
+        while (low <= high) {
+            const mid = (low + high) >> 1;
+            if (transitions[mid].ts <= now) {
+                index = mid;
+                low = mid + 1;
+            } else {
+                high = mid - 1;
             }
+        }
+        if (index < 0) return;
+
+        const current = transitions[index];
+        setCountdownMode(current.mode);
+        setCountdownLabel(current.label);
+        setCountdownSeconds(
+            current.phase === 'sholat' || !current.until_ts ? 0 : Math.max(0, Math.floor((current.until_ts - now) / 1000))
+        );
 
-            // Play iqamah sound when countdown ends - use callback
-            if (iqamahRemaining <= 2 && prayerSettings.sound_iqamah !== false) {
-                setSoundsPlayed(prev => {
-                    if (!prev.iqamah) {
-                        playNotificationSound(SOUND_TYPES.IQAMAH);
-                        return { ...prev, iqamah: true };
-                    }
-                    return prev;
-                });
+        // Each transition plays its sound once, and only when it was just reached
+        if (lastTransitionRef.current !== current.ts) {
+            lastTransitionRef.current = current.ts;
+            if (current.sound && now - current.ts < 5000) {
+                playNotificationSound(current.sound);
             }
-        } else {
-            // After iqamah - waiting for next prayer
-            setCountdownMode('adzan');
-            setCountdownSeconds(0);
-            setCountdownLabel('Sholat Berlangsung');
         }
-    }, [currentTime, prayerTimes, prayerSettings]); // Removed soundsPlayed from dependencies
+    }, [currentTime, timeline]);
 
     if (loading) {
         return (
@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback } from 'react';
-import { Wallet, Plus, Trash2, Edit2, TrendingUp, DollarSign, Heart, RefreshCw, Sheet, CheckCircle, AlertCircle, ArrowDownCircle, ArrowUpCircle, Copy, ExternalLink } from 'lucide-react';
-import { zisAPI, expenditureAPI, sheetsAPI } from '../../lib/api';
+import { Wallet, Plus, Trash2, Edit2, TrendingUp, DollarSign, Heart, RefreshCw, Sheet, CheckCircle, AlertCircle, ArrowDownCircle, ArrowUpCircle, Copy, ExternalLink, Download } from 'lucide-react';
+import { zisAPI, expenditureAPI, financeAPI, sheetsAPI } from '../../lib/api';
 import { Button } from '../../components/ui/button';
 import { Input } from '../../components/ui/input';
 import { Textarea } from '../../components/ui/textarea';
@@ -28,12 +28,25 @@ const EXPENDITURE_CATEGORIES = [
 const formatCurrency = (amount) =>
     new Intl.NumberFormat('id-ID', { style: 'currency', currency: 'IDR', minimumFractionDigits: 0 }).format(amount || 0);
 
+// Download an export (blob response) under the given file name
+const saveBlob = (blob, filename) => {
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = filename;
+    link.click();
+    URL.revokeObjectURL(url);
+};
+
+const exportPeriod = (month, year) => `${year}-${String(month).padStart(2, '0')}`;
+
 const monthNames = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni',
     'Juli', 'Agustus', 'September', 'Oktober', 'November', 'Desember'];
 
 // ─── Komponen: Tab Pemasukan ZIS ─────────────────────────────────────────────
 function PemasukanTab() {
     const [reports, setReports] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [summary, setSummary] = useState(null);
     const [chartData, setChartData] = useState([]);
     const [loading, setLoading] = useState(true);
@@ -48,20 +61,32 @@ function PemasukanTab() {
     const fetchData = useCallback(async () => {
         setLoading(true);
         try {
-            const [rRes, sRes, cRes] = await Promise.all([
-                zisAPI.getAll(filterMonth, filterYear),
-                zisAPI.getSummary(filterMonth, filterYear),
-                zisAPI.getMonthlyChart(filterYear),
-            ]);
-            setReports(rRes.data);
-            setSummary(sRes.data);
-            setChartData(cRes.data);
+            const { data } = await financeAPI.dashboard(filterMonth, filterYear);
+            setReports(data.zis.reports);
+            setNextCursor(data.zis.next_cursor);
+            setSummary(data.zis.summary);
+            setChartData(data.zis.chart);
         } catch { toast.error('Gagal memuat data ZIS'); }
         finally { setLoading(false); }
     }, [filterMonth, filterYear]);
 
     useEffect(() => { fetchData(); }, [fetchData]);
 
+    const loadMore = async () => {
+        try {
+            const res = await zisAPI.getAll(filterMonth, filterYear, undefined, nextCursor);
+            setReports((prev) => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch { toast.error('Gagal memuat data ZIS'); }
+    };
+
+    const handleExport = async (format) => {
+        try {
+            const res = await zisAPI.export(format, filterMonth, filterYear);
+            saveBlob(res.data, `zis-${exportPeriod(filterMonth, filterYear)}.${format}`);
+        } catch { toast.error('Gagal mengekspor data ZIS'); }
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         if (!formData.amount || !formData.date) { toast.error('Jumlah dan tanggal harus diisi'); return; }
@@ -95,9 +120,13 @@ function PemasukanTab() {
                     <ArrowDownCircle className="w-5 h-5 text-emerald-400" />
                     <span className="text-white font-semibold">Pemasukan ZIS</span>
                 </div>
-                <Button onClick={() => { setEditingItem(null); setFormData(emptyForm); setDialogOpen(true); }} className="bg-emerald-600 hover:bg-emerald-700" size="sm">
-                    <Plus className="w-4 h-4 mr-1" /> Tambah Pemasukan
-                </Button>
+                <div className="flex items-center gap-2">
+                    <Button variant="outline" size="sm" onClick={() => handleExport('csv')} className="border-slate-700"><Download className="w-4 h-4 mr-1" /> CSV</Button>
+                    <Button variant="outline" size="sm" onClick={() => handleExport('xlsx')} className="border-slate-700"><Download className="w-4 h-4 mr-1" /> Excel</Button>
+                    <Button onClick={() => { setEditingItem(null); setFormData(emptyForm); setDialogOpen(true); }} className="bg-emerald-600 hover:bg-emerald-700" size="sm">
+                        <Plus className="w-4 h-4 mr-1" /> Tambah Pemasukan
+                    </Button>
+                </div>
             </div>
 
             {/* Summary Cards */}
@@ -182,6 +211,11 @@ function PemasukanTab() {
                         ))}
                     </tbody>
                 </table>
+                {nextCursor && (
+                    <div className="p-4 text-center border-t border-slate-700">
+                        <Button variant="outline" size="sm" onClick={loadMore} className="border-slate-700">Muat lebih banyak</Button>
+                    </div>
+                )}
             </div>
 
             {/* Dialog */}
@@ -226,6 +260,7 @@ function PemasukanTab() {
 // ─── Komponen: Tab Pengeluaran Dana ──────────────────────────────────────────
 function PengeluaranTab() {
     const [reports, setReports] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [summary, setSummary] = useState(null);
     const [loading, setLoading] = useState(true);
     const [dialogOpen, setDialogOpen] = useState(false);
@@ -239,18 +274,24 @@ function PengeluaranTab() {
     const fetchData = useCallback(async () => {
         setLoading(true);
         try {
-            const [rRes, sRes] = await Promise.all([
-                expenditureAPI.getAll(filterMonth, filterYear),
-                expenditureAPI.getSummary(filterMonth, filterYear),
-            ]);
-            setReports(rRes.data);
-            setSummary(sRes.data);
+            const { data } = await financeAPI.dashboard(filterMonth, filterYear);
+            setReports(data.expenditure.reports);
+            setNextCursor(data.expenditure.next_cursor);
+            setSummary(data.expenditure.summary);
         } catch { toast.error('Gagal memuat data pengeluaran'); }
         finally { setLoading(false); }
     }, [filterMonth, filterYear]);
 
     useEffect(() => { fetchData(); }, [fetchData]);
 
+    const loadMore = async () => {
+        try {
+            const res = await expenditureAPI.getAll(filterMonth, filterYear, nextCursor);
+            setReports((prev) => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch { toast.error('Gagal memuat data pengeluaran'); }
+    };
+
     const handleSubmit = async (e) => {
         e.preventDefault();
         if (!formData.amount || !formData.date) { toast.error('Jumlah dan tanggal harus diisi'); return; }
@@ -268,6 +309,13 @@ function PengeluaranTab() {
         setDialogOpen(true);
     };
 
+    const handleExport = async (format) => {
+        try {
+            const res = await expenditureAPI.export(format, filterMonth, filterYear);
+            saveBlob(res.data, `pengeluaran-${exportPeriod(filterMonth, filterYear)}.${format}`);
+        } catch { toast.error('Gagal mengekspor data pengeluaran'); }
+    };
+
     const handleDelete = async (id) => {
         if (!confirm('Yakin hapus data pengeluaran ini?')) return;
         try { await expenditureAPI.delete(id); toast.success('Dihapus'); fetchData(); }
@@ -287,9 +335,13 @@ function PengeluaranTab() {
                     <ArrowUpCircle className="w-5 h-5 text-red-400" />
                     <span className="text-white font-semibold">Pengeluaran Dana</span>
                 </div>
-                <Button onClick={() => { setEditingItem(null); setFormData(emptyForm); setDialogOpen(true); }} className="bg-red-700 hover:bg-red-800" size="sm">
-                    <Plus className="w-4 h-4 mr-1" /> Tambah Pengeluaran
-                </Button>
+                <div className="flex items-center gap-2">
+                    <Button variant="outline" size="sm" onClick={() => handleExport('csv')} className="border-slate-700"><Download className="w-4 h-4 mr-1" /> CSV</Button>
+                    <Button variant="outline" size="sm" onClick={() => handleExport('xlsx')} className="border-slate-700"><Download className="w-4 h-4 mr-1" /> Excel</Button>
+                    <Button onClick={() => { setEditingItem(null); setFormData(emptyForm); setDialogOpen(true); }} className="bg-red-700 hover:bg-red-800" size="sm">
+                        <Plus className="w-4 h-4 mr-1" /> Tambah Pengeluaran
+                    </Button>
+                </div>
             </div>
 
             {/* Summary */}
@@ -364,6 +416,11 @@ function PengeluaranTab() {
                         ))}
                     </tbody>
                 </table>
+                {nextCursor && (
+                    <div className="p-4 text-center border-t border-slate-700">
+                        <Button variant="outline" size="sm" onClick={loadMore} className="border-slate-700">Muat lebih banyak</Button>
+                    </div>
+                )}
             </div>
 
             {/* Dialog */}
@@ -404,6 +461,9 @@ function PengeluaranTab() {
 }
 
 // ─── Komponen: Tab Google Sheets ──────────────────────────────────────────────
+const SYNC_POLL_MS = 1500;
+const SHEET_LABELS = { zis: 'Pemasukan ZIS', expenditure: 'Pengeluaran Dana' };
+
 function GoogleSheetsTab() {
     const [config, setConfig] = useState({ spreadsheet_id: '', has_credentials: false });
     const [spreadsheetId, setSpreadsheetId] = useState('');
@@ -411,6 +471,7 @@ function GoogleSheetsTab() {
     const [syncing, setSyncing] = useState(false);
     const [saving, setSaving] = useState(false);
     const [syncResult, setSyncResult] = useState(null);
+    const [syncProgress, setSyncProgress] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -440,15 +501,23 @@ function GoogleSheetsTab() {
     const handleSync = async () => {
         setSyncing(true);
         setSyncResult(null);
+        setSyncProgress(null);
         try {
-            const r = await sheetsAPI.sync();
-            setSyncResult({ success: true, ...r.data });
-            toast.success(`Sinkronisasi berhasil! ${r.data.zis_rows} baris ZIS, ${r.data.expenditure_rows} baris Pengeluaran`);
+            let { data: job } = await sheetsAPI.sync();
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_MS));
+                ({ data: job } = await sheetsAPI.job(job.id));
+                setSyncProgress(job.progress);
+            }
+            if (job.status !== 'done') throw new Error(job.error || 'Gagal sinkronisasi');
+            setSyncResult({ success: true, ...job.result });
+            setConfig(prev => ({ ...prev, last_sync: job.result.synced_at }));
+            toast.success(`Sinkronisasi berhasil! ${job.result.zis_rows} baris ZIS, ${job.result.expenditure_rows} baris Pengeluaran`);
         } catch (err) {
-            const msg = err.response?.data?.detail || 'Gagal sinkronisasi';
+            const msg = err.response?.data?.detail || err.message || 'Gagal sinkronisasi';
             setSyncResult({ success: false, message: msg });
             toast.error(msg);
-        } finally { setSyncing(false); }
+        } finally { setSyncing(false); setSyncProgress(null); }
     };
 
     if (loading) return <div className="flex justify-center h-40 items-center"><div className="animate-spin w-8 h-8 border-4 border-green-500 border-t-transparent rounded-full" /></div>;
@@ -516,7 +585,7 @@ function GoogleSheetsTab() {
             <div className="bg-slate-800/50 border border-slate-700 rounded-xl p-5">
                 <h4 className="text-white font-medium mb-2">Sinkronisasi ke Google Sheets</h4>
                 <p className="text-sm text-slate-400 mb-4">
-                    Data Pemasukan ZIS dan Pengeluaran Dana akan disalin ke dua sheet terpisah: <strong className="text-white">"Pemasukan ZIS"</strong> dan <strong className="text-white">"Pengeluaran Dana"</strong>.
+                    Data Pemasukan ZIS dan Pengeluaran Dana akan disalin ke dua sheet terpisah: <strong className="text-white">"Pemasukan ZIS"</strong> dan <strong className="text-white">"Pengeluaran Dana"</strong>. Hanya baris yang berubah sejak sinkronisasi terakhir yang dikirim.
                 </p>
                 <Button
                     onClick={handleSync}
@@ -525,6 +594,14 @@ function GoogleSheetsTab() {
                 >
                     {syncing ? <><RefreshCw className="w-4 h-4 mr-2 animate-spin" />Menyinkronkan...</> : <><RefreshCw className="w-4 h-4 mr-2" />Sync ke Google Sheets</>}
                 </Button>
+                {syncProgress && (
+                    <p className="text-xs text-slate-400 mt-2">
+                        {SHEET_LABELS[syncProgress.sheet]}: {syncProgress.done} / {syncProgress.total} baris berubah terkirim
+                    </p>
+                )}
+                {config.last_sync && !syncing && (
+                    <p className="text-xs text-slate-500 mt-2">Terakhir sinkron: {new Date(config.last_sync).toLocaleString('id-ID')}</p>
+                )}
 
                 {syncResult && (
                     <div className={`mt-4 p-4 rounded-lg border ${syncResult.success ? 'bg-green-900/20 border-green-700' : 'bg-red-900/20 border-red-700'}`}>
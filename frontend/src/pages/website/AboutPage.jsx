@@ -20,7 +20,7 @@ import {
     Image,
     FileText
 } from 'lucide-react';
-import { mosqueAPI, announcementAPI, pengurusAPI, galleryAPI } from '../../lib/api';
+import { mosqueAPI, announcementAPI, pengurusAPI, galleryAPI, imageVariant } from '../../lib/api';
 import { Button } from '../../components/ui/button';
 import { Input } from '../../components/ui/input';
 import { Textarea } from '../../components/ui/textarea';
@@ -302,7 +302,7 @@ const PengurusSection = ({ pengurusList }) => {
                     <div key={pengurus.id || idx} className="flex items-center gap-3 p-2 rounded-lg hover:bg-gray-50 transition-colors">
                         <div className="w-10 h-10 rounded-full bg-gray-100 flex items-center justify-center flex-shrink-0 overflow-hidden">
                             {pengurus.photo_url ? (
-                                <img src={pengurus.photo_url} alt={pengurus.name} className="w-full h-full object-cover" />
+                                <img src={imageVariant(pengurus.photo_url, pengurus.photo_variants, 'thumb')} alt={pengurus.name} className="w-full h-full object-cover" />
                             ) : (
                                 <span className="text-gray-500 font-medium">{pengurus.name?.charAt(0) || 'P'}</span>
                             )}
@@ -383,7 +383,7 @@ const GalleryPreview = ({ galleries }) => {
                         className="aspect-square rounded-lg overflow-hidden bg-gray-100"
                     >
                         <img
-                            src={item.image_url}
+                            src={imageVariant(item.image_url, item.image_variants, 'thumb')}
                             alt={item.title || `Galeri ${idx + 1}`}
                             className="w-full h-full object-cover hover:scale-105 transition-transform"
                         />
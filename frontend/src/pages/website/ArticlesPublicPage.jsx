@@ -2,7 +2,7 @@ import { useState, useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Newspaper, Calendar, User, ChevronLeft, Search, Tag, XCircle, X, BookOpen } from 'lucide-react';
-import { articleAPI, mosqueAPI } from '../../lib/api';
+import { articleAPI, mosqueAPI, imageVariant } from '../../lib/api';
 import { WebsiteNavigation, WebsiteFooter } from '../../components/WebsiteNavigation';
 
 const CATEGORY_OPTIONS = [
@@ -143,7 +143,7 @@ export default function ArticlesPublicPage() {
                                     {/* Image */}
                                     <div className="relative h-48 overflow-hidden bg-gray-100 flex-shrink-0">
                                         {article.image_url ? (
-                                            <img src={article.image_url} alt={article.title}
+                                            <img src={imageVariant(article.image_url, article.image_variants, 'medium')} alt={article.title}
                                                 className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300" />
                                         ) : (
                                             <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-emerald-50 to-teal-50">
@@ -224,7 +224,7 @@ export default function ArticlesPublicPage() {
                             {/* Modal image */}
                             {selectedArticle.image_url ? (
                                 <div className="h-56 overflow-hidden -mt-16">
-                                    <img src={selectedArticle.image_url} alt={selectedArticle.title}
+                                    <img src={imageVariant(selectedArticle.image_url, selectedArticle.image_variants, 'display')} alt={selectedArticle.title}
                                         className="w-full h-full object-cover" />
                                 </div>
                             ) : (
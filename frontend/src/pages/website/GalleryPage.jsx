@@ -5,7 +5,7 @@ import {
     Images, Calendar, X, ChevronLeft, ChevronRight,
     Search, Tag, XCircle, ZoomIn,
 } from 'lucide-react';
-import { galleryAPI, mosqueAPI } from '../../lib/api';
+import { galleryAPI, mosqueAPI, imageVariant } from '../../lib/api';
 import { WebsiteNavigation, WebsiteFooter } from '../../components/WebsiteNavigation';
 
 const CATEGORY_OPTIONS = [
@@ -192,7 +192,8 @@ export default function GalleryPage() {
                                 {/* Image */}
                                 <div className="relative aspect-[4/3] overflow-hidden bg-gray-100">
                                     <img
-                                        src={item.image_url}
+                                        src={imageVariant(item.image_url, item.image_variants, 'medium')}
+                                        loading="lazy"
                                         alt={item.title || `Foto ${idx + 1}`}
                                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                                     />
@@ -290,7 +291,7 @@ export default function GalleryPage() {
                             onClick={(e) => e.stopPropagation()}
                         >
                             <img
-                                src={lightboxItem.image_url}
+                                src={imageVariant(lightboxItem.image_url, lightboxItem.image_variants, 'display')}
                                 alt={lightboxItem.title || 'Galeri'}
                                 className="max-h-[75vh] w-full object-contain rounded-xl shadow-2xl"
                             />
@@ -336,7 +337,7 @@ export default function GalleryPage() {
                                             className={`flex-shrink-0 w-12 h-12 rounded-lg overflow-hidden border-2 transition-all ${realIdx === lightboxIndex ? 'border-emerald-400 scale-110' : 'border-transparent opacity-50 hover:opacity-80'
                                                 }`}
                                         >
-                                            <img src={item.image_url} alt="" className="w-full h-full object-cover" />
+                                            <img src={imageVariant(item.image_url, item.image_variants, 'thumb')} alt="" className="w-full h-full object-cover" />
                                         </button>
                                     );
                                 })}
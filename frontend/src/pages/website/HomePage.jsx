@@ -2,7 +2,7 @@ import { useState, useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { Clock, MapPin, Calendar, Phone, ChevronRight, Moon, BookOpen, Users, ArrowRight, Heart, QrCode, Quote, Menu, X, Image, ExternalLink, User, Mic, Newspaper } from 'lucide-react';
-import { prayerAPI, mosqueAPI, specialEventAPI, zisAPI, quoteAPI, galleryAPI, articleAPI } from '../../lib/api';
+import { prayerAPI, mosqueAPI, specialEventAPI, zisAPI, quoteAPI, galleryAPI, articleAPI, imageVariant } from '../../lib/api';
 import { formatCountdown, getCurrentAndNextPrayer, PRAYER_NAMES } from '../../lib/utils';
 import { getKHGTHijriDate, isRamadan } from '../../lib/khgtCalendar';
 import { Sheet, SheetContent, SheetTrigger, SheetTitle, SheetDescription } from '../../components/ui/sheet';
@@ -351,7 +351,8 @@ const GallerySlider = ({ galleries }) => {
                                     onClick={() => openLightbox(idx)}
                                 >
                                     <img
-                                        src={item.image_url}
+                                        src={imageVariant(item.image_url, item.image_variants, 'medium')}
+                                        loading="lazy"
                                         alt={item.title || `Galeri ${idx + 1}`}
                                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                                     />
@@ -400,7 +401,7 @@ const GallerySlider = ({ galleries }) => {
                     )}
                     {/* Image */}
                     <div className="flex flex-col items-center max-w-4xl w-full px-16" onClick={(e) => e.stopPropagation()}>
-                        <img src={lightboxItem.image_url} alt={lightboxItem.title || 'Galeri'}
+                        <img src={imageVariant(lightboxItem.image_url, lightboxItem.image_variants, 'display')} alt={lightboxItem.title || 'Galeri'}
                             className="max-h-[75vh] w-full object-contain rounded-xl shadow-2xl" />
                         <div className="mt-4 text-center text-white">
                             <h3 className="font-bold text-lg">{lightboxItem.title || 'Kegiatan Masjid'}</h3>
@@ -812,7 +813,7 @@ export default function HomePage() {
                                         <div className="relative h-48 overflow-hidden bg-gray-100">
                                             {article.image_url ? (
                                                 <img
-                                                    src={article.image_url}
+                                                    src={imageVariant(article.image_url, article.image_variants, 'medium')}
                                                     alt={article.title}
                                                     className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                                                 />